@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Deployment Rules Benchmark
+==========================
+
+Times the Deployment Checker rule engine on synthetic manifests as the rule
+set grows: rules spread over many Kubernetes kinds (as an in-house policy
+pack would be), checked with the kind index against testing every rule on
+every document.
+
+Usage:
+    python benchmarks/deploy_rules_bench.py [--documents N] [--rules N ...]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.deploy_rules import BUILTIN_RULES_FILE, Rule, RuleSet
+
+KINDS = ["Deployment", "StatefulSet", "DaemonSet", "Job", "CronJob", "Pod", "Service", "Ingress",
+         "ConfigMap", "Secret", "Role", "RoleBinding", "ClusterRole", "ServiceAccount", "NetworkPolicy",
+         "PersistentVolumeClaim", "HorizontalPodAutoscaler", "PodDisruptionBudget", "Namespace", "LimitRange"]
+
+
+def in_house_rules(count):
+    """``count`` rules: path checks, missing-field checks and key checks, round-robin over kinds."""
+    rules = []
+    for i in range(count):
+        kind = KINDS[i % len(KINDS)]
+        if i % 3 == 0:
+            rule = Rule(f"house-{i}", "k8s", "{kind} label {path} = {value}", kind=kind,
+                        path=f"metadata.labels.team{i}", value="^legacy$")
+        elif i % 3 == 1:
+            rule = Rule(f"house-{i}", "k8s", "{kind} container {name} lacks an image", kind=kind,
+                        each="spec.template.spec.containers[]", missing="image")
+        else:
+            rule = Rule(f"house-{i}", "k8s", "{kind} sets {path}", kind=kind, key=f"^internal{i}Token$")
+        rules.append(rule)
+    return rules
+
+
+def documents(count):
+    docs = []
+    for i in range(count):
+        kind = KINDS[i % len(KINDS)]
+        docs.append({
+            "apiVersion": "apps/v1", "kind": kind,
+            "metadata": {"name": f"app{i}", "labels": {"app": f"app{i}", "tier": "backend"}},
+            "spec": {"replicas": 2, "template": {"spec": {"containers": [
+                {"name": "app", "image": "registry.local/app:1.2.3",
+                 "env": [{"name": "MODE", "value": "production"}, {"name": "DB_PASSWORD", "value": "changeme"}],
+                 "resources": {"limits": {"cpu": "1", "memory": "1Gi"}}},
+                {"name": "sidecar", "image": "registry.local/proxy:2.0", "args": ["--port", "8080"]}
+            ]}}}
+        })
+    return docs
+
+
+def naive(rule_set, docs):
+    """Every rule on every document, as without the kind index."""
+    from tools.deploy_rules import _string_keys
+    found = 0
+    for doc in docs:
+        for rule in rule_set.rules:
+            if rule.target != "k8s":
+                continue
+            if rule.key is not None:
+                found += sum(1 for _, key, value in _string_keys(doc) if rule.match_key(key, value))
+            elif rule.kinds == ("*",) or doc["kind"] in rule.kinds:
+                found += sum(1 for _ in rule.match_object(doc, "bench.yaml", {"kind": doc["kind"]}))
+    return found
+
+
+def indexed(rule_set, docs):
+    return sum(len(rule_set.check_k8s("bench.yaml", doc)) for doc in docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=5000, help="Number of manifest documents")
+    parser.add_argument("--rules", type=int, nargs="+", default=[0, 50, 200, 800],
+                        help="In-house rule counts to time (on top of the built-in rules)")
+    args = parser.parse_args()
+
+    docs = documents(args.documents)
+    builtin = RuleSet.from_files([BUILTIN_RULES_FILE]).rules
+    print(f"{args.documents} documents, {len(builtin)} built-in rules")
+    for count in args.rules:
+        rule_set = RuleSet(builtin + in_house_rules(count))
+        timings = []
+        for check in (naive, indexed):
+            started = time.perf_counter()
+            check(rule_set, docs)
+            timings.append(time.perf_counter() - started)
+        print(f"{len(rule_set):5d} rules  every rule {timings[0]:7.3f}s  by kind {timings[1]:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Deployment Walk Benchmark
+=========================
+
+Times the traversal behind the Deployment Checker Tool on a synthetic
+monorepo: the previous approach (one ``os.walk`` over the whole tree for
+``.env`` files, one per Kubernetes directory, and fixed-path probes) against
+the single pruned ``os.scandir`` walk shared by all checks.
+
+Most of the synthetic files live under ``node_modules`` and ``.git``, and a
+``.gitignore`` excludes a build output directory, as in a typical JS/Python
+monorepo.
+
+Usage:
+    python benchmarks/deploy_walk_bench.py [--files N] [--tree PATH]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.tree_walker import walk
+
+COMMON_FILES = ['docker-compose.yml', 'docker-compose.yaml', 'Dockerfile', 'k8s/', 'kubernetes/',
+                'deployment.yaml', 'service.yaml', 'ingress.yaml', '.env', 'config/', 'manifests/']
+
+
+def generate_tree(root, files, seed=42):
+    """Create ``files`` empty files; ~60% node_modules, ~25% .git, ~5% ignored build output."""
+    rng = random.Random(seed)
+    areas = [("node_modules", 0.60), (".git/objects", 0.25), ("dist", 0.05), ("services", 0.10)]
+    with open(os.path.join(root, ".gitignore"), 'w') as f:
+        f.write("node_modules/\ndist/\n*.log\n")
+    with open(os.path.join(root, "Dockerfile"), 'w') as f:
+        f.write("FROM python:latest\n")
+    os.makedirs(os.path.join(root, "k8s"))
+    with open(os.path.join(root, "k8s", "deployment.yaml"), 'w') as f:
+        f.write("kind: Deployment\nspec:\n  containers:\n  - name: app\n")
+    created = 0
+    for area, share in areas:
+        count = int(files * share)
+        per_dir = 40
+        for d in range(0, count, per_dir):
+            directory = os.path.join(root, area, f"pkg{d // per_dir % 500}", f"sub{d // per_dir}")
+            os.makedirs(directory, exist_ok=True)
+            for i in range(min(per_dir, count - d)):
+                name = ".env" if area == "services" and i == 0 else f"f{i}.{rng.choice(['js', 'py', 'json'])}"
+                open(os.path.join(directory, name), 'w').close()
+                created += 1
+    return created
+
+
+def baseline(root):
+    """The traversal the checker used to do."""
+    found = [item for item in COMMON_FILES if os.path.exists(os.path.join(root, item))]
+    env_files = [os.path.join(r, f) for r, _, fs in os.walk(root) for f in fs if f.startswith('.env')]
+    k8s_files = []
+    for k8s in ('k8s', 'kubernetes', 'manifests'):
+        path = os.path.join(root, k8s)
+        if os.path.exists(path):
+            k8s_files += [os.path.join(r, f) for r, _, fs in os.walk(path) for f in fs
+                          if f.endswith(('.yaml', '.yml'))]
+    return found, env_files, k8s_files
+
+
+def shared_walk(root):
+    found, env_files, k8s_files = set(), [], []
+    for rel_path, entry in walk(root):
+        if '/' not in rel_path:
+            found.add(rel_path + '/' if entry.is_dir() else rel_path)
+        if entry.is_dir(follow_symlinks=False):
+            continue
+        if entry.name.startswith('.env'):
+            env_files.append(entry.path)
+        elif rel_path.split('/', 1)[0] in ('k8s', 'kubernetes', 'manifests') and entry.name.endswith(('.yaml', '.yml')):
+            k8s_files.append(entry.path)
+    return [item for item in COMMON_FILES if item in found], env_files, k8s_files
+
+
+def timed(label, func, root):
+    started = time.perf_counter()
+    found, env_files, k8s_files = func(root)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<14} {elapsed:8.3f}s  {len(env_files)} .env files, {len(k8s_files)} manifests, "
+          f"{len(found)} known paths")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200000, help="Number of files in the synthetic tree")
+    parser.add_argument("--tree", help="Benchmark an existing tree instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.tree
+        if root is None:
+            root = tmp
+            started = time.perf_counter()
+            created = generate_tree(root, args.files)
+            print(f"Generated {created} files in {time.perf_counter() - started:.1f}s")
+        old = timed("os.walk x4", baseline, root)
+        new = timed("shared walk", shared_walk, root)
+        print(f"Speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
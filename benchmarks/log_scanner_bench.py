@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Log Scanner Benchmark
+=====================
+
+Compares the single-pass LogScanner with the per-pattern ``re.search`` loop the
+Log Analyzer Tool used before, on a synthetic log file.
+
+Usage:
+    python benchmarks/log_scanner_bench.py [--lines N] [--log-file PATH]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.log_scanner import DEFAULT_ERROR_PATTERNS, LogScanner
+
+LEVELS = ["INFO"] * 90 + ["DEBUG"] * 5 + ["WARNING"] * 3 + ["ERROR"] * 2
+
+
+def generate_log(path, lines, seed=42):
+    """Write a synthetic service log with a realistic level mix."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            level = rng.choice(LEVELS)
+            if level == "ERROR" and i % 3 == 0:
+                message = f"Connection refused to 10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}:5432"
+            else:
+                message = (f"request id={rng.randint(1, 10**6)} user=u{rng.randint(1, 999)} "
+                           f"took {rng.random() * 100:.2f}ms path=/api/v1/items/{rng.randint(1, 5000)}")
+            f.write(f"2026-10-18T03:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z "
+                    f"{level} svc.worker[{rng.randint(1, 64)}] {message}\n")
+
+
+def legacy_scan(path, patterns):
+    """The original per-pattern loop, kept verbatim for comparison."""
+    errors = warnings = 0
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        for line in file:
+            for pattern in patterns:
+                if re.search(pattern, line, re.IGNORECASE):
+                    errors += 1
+            if re.search(r"WARNING", line, re.IGNORECASE):
+                warnings += 1
+    return errors, warnings
+
+
+def scanner_scan(path, patterns):
+    scanner = LogScanner(patterns)
+    errors = warnings = 0
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        for line in file:
+            matched, is_warning = scanner.scan_line(line)
+            errors += len(matched)
+            warnings += is_warning
+    return errors, warnings
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LogScanner against the legacy loop')
+    parser.add_argument('--lines', type=int, default=500_000, help='Lines in the synthetic log')
+    parser.add_argument('--log-file', help='Benchmark an existing log file instead')
+    args = parser.parse_args()
+
+    path = args.log_file
+    if not path:
+        fd, path = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        generate_log(path, args.lines)
+
+    try:
+        size_mb = os.path.getsize(path) / 2**20
+        legacy, legacy_time = timed(legacy_scan, path, DEFAULT_ERROR_PATTERNS)
+        scanned, scanner_time = timed(scanner_scan, path, DEFAULT_ERROR_PATTERNS)
+
+        print(f"Log file: {path} ({size_mb:.1f} MiB)")
+        print(f"legacy loop : {legacy_time:8.2f}s  {size_mb / legacy_time:8.1f} MiB/s  {legacy}")
+        print(f"LogScanner  : {scanner_time:8.2f}s  {size_mb / scanner_time:8.1f} MiB/s  {scanned}")
+        print(f"speedup     : {legacy_time / scanner_time:8.1f}x")
+        if legacy != scanned:
+            print("MISMATCH: scanner results differ from the legacy loop")
+            return 1
+    finally:
+        if not args.log_file:
+            os.unlink(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Structured Log Benchmark
+========================
+
+Compares the regex text scan with the structured JSON-lines mode on a synthetic
+JSON-lines log: counting ``level=error`` records, grouping them by service and
+computing latency percentiles.
+
+Usage:
+    python benchmarks/structured_bench.py [--size-mb N] [--workers N] [--log-file PATH]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+from tools.log_structured import StructuredQuery, scan_structured_file
+
+LEVELS = ["info"] * 90 + ["debug"] * 5 + ["warning"] * 3 + ["error"] * 2
+SERVICES = ["auth", "api", "billing", "search"]
+
+
+def generate_log(path, size_mb, seed=42):
+    """Write synthetic JSON-lines records until the file reaches ``size_mb``."""
+    rng = random.Random(seed)
+    limit = size_mb * 2**20
+    written = i = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < limit:
+            level = rng.choice(LEVELS)
+            record = {
+                "ts": f"2026-10-18T03:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z",
+                "level": level,
+                "service": rng.choice(SERVICES),
+                "latency_ms": round(rng.expovariate(1 / 40), 2),
+                "msg": "request failed" if level == "error" else "request handled",
+                "request_id": f"{rng.getrandbits(128):032x}"
+            }
+            line = json.dumps(record) + "\n"
+            f.write(line)
+            written += len(line)
+            i += 1
+
+
+def regex_scan(path):
+    """Text mode: a level pattern that also fires on keys and messages."""
+    scanner = LogScanner([r'"level": "error"'], multiline=False)
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        summary = scan_lines(scanner, file, ScanSummary())
+    return summary.errors.count
+
+
+def structured_scan(path, workers):
+    query = StructuredQuery(["level=error"], ["service"], ["latency_ms"])
+    summary = scan_structured_file(path, query, workers)
+    return summary.matched_lines, summary.numeric["latency_ms"].quantile(0.99)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark structured JSON-lines mode against a regex scan')
+    parser.add_argument('--size-mb', type=int, default=1024, help='Size of the synthetic log in MiB')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes for the structured scan (0 = one per CPU core)')
+    parser.add_argument('--log-file', help='Benchmark an existing JSON-lines file instead')
+    args = parser.parse_args()
+
+    path = args.log_file
+    if not path:
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        generate_log(path, args.size_mb)
+
+    try:
+        size_mb = os.path.getsize(path) / 2**20
+        regex, regex_time = timed(regex_scan, path)
+        serial, serial_time = timed(structured_scan, path, 1)
+        parallel, parallel_time = timed(structured_scan, path, args.workers or None)
+
+        print(f"Log file: {path} ({size_mb:.1f} MiB)")
+        print(f"regex scan          : {regex_time:8.2f}s  {size_mb / regex_time:8.1f} MiB/s  errors={regex}")
+        print(f"structured (serial) : {serial_time:8.2f}s  {size_mb / serial_time:8.1f} MiB/s  "
+              f"errors={serial[0]} p99={serial[1]:.1f}ms")
+        print(f"structured (pool)   : {parallel_time:8.2f}s  {size_mb / parallel_time:8.1f} MiB/s  "
+              f"errors={parallel[0]} p99={parallel[1]:.1f}ms")
+        if serial[0] != parallel[0]:
+            print("MISMATCH: serial and parallel structured scans differ")
+            return 1
+    finally:
+        if not args.log_file:
+            os.unlink(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
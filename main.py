@@ -7,6 +7,7 @@ This script provides a command-line interface to run different crews.
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -25,9 +26,10 @@ def main():
             'code-recommendation',
             'project-planning',
             'code-generation',
-            'full-project-implementation'
+            'full-project-implementation',
+            'capture'
         ],
-        help='Which crew to run'
+        help="Which crew to run ('capture' writes a diagnostic bundle instead)"
     )
     parser.add_argument(
         '--config',
@@ -35,8 +37,64 @@ def main():
         help='Path to the configuration file'
     )
     
+    parser.add_argument(
+        '--bundle',
+        help='Diagnostic bundle to write (capture) or to run the crew against instead of the live host'
+    )
+    parser.add_argument(
+        '--log',
+        action='append',
+        default=[],
+        help='Log file to include in a capture (repeatable; default: the logs under diagnostics in the config)'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=0,
+        help='Serve system and tool metrics in Prometheus/OpenMetrics format on this local port'
+    )
+    parser.add_argument(
+        '--metrics-textfile',
+        help='Also write the metrics to this file for the node_exporter textfile collector'
+    )
+    
     args = parser.parse_args()
     
+    if args.metrics_port or args.metrics_textfile:
+        from tools.metrics_exporter import start_http_server, start_textfile_writer
+        if args.metrics_port:
+            start_http_server(args.metrics_port)
+        if args.metrics_textfile:
+            start_textfile_writer(args.metrics_textfile)
+    
+    if args.crew == 'capture':
+        import yaml
+        from tools.diagnostic_bundle import capture_bundle
+        if not args.bundle:
+            print("capture needs --bundle PATH")
+            sys.exit(1)
+        settings = {}
+        if Path(args.config).exists():
+            with open(args.config) as f:
+                settings = (yaml.safe_load(f) or {}).get('diagnostics', {})
+        manifest = capture_bundle(
+            args.bundle,
+            args.log or settings.get('logs', []),
+            settings.get('tail_bytes', 1024 * 1024),
+            settings.get('top_processes', 25),
+            settings.get('warmup_seconds', 0)
+        )
+        print(f"Captured {args.bundle} in {manifest['capture_seconds']}s "
+              f"from {manifest['samples']} samples"
+              f"{' (anomaly baseline still learning)' if manifest['learning'] else ''} "
+              f"({len(manifest['logs'])} logs, {len(manifest['skipped_logs'])} skipped)")
+        return
+    
+    if args.bundle:
+        # Tools answer from the bundle instead of the live host
+        from tools.diagnostic_bundle import BUNDLE_ENV
+        os.environ[BUNDLE_ENV] = str(Path(args.bundle).resolve())
+    
     if args.crew == 'code-review':
         from crews.code_review import CodeReviewCrew
         crew = CodeReviewCrew()
@@ -0,0 +1,87 @@
+"""
+Tests for the online anomaly detector
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools import anomaly_detector
+from tools.anomaly_detector import AnomalyDetector
+
+
+@pytest.fixture(params=["numpy", "python"])
+def detector(request, monkeypatch):
+    """A detector running either the vectorised or the plain-Python update."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(anomaly_detector, "np", None)
+    return AnomalyDetector()
+
+
+def _steady(detector, samples=60, start=0):
+    for t in range(start, start + samples):
+        detector.update(1700000000 + t, {"cpu.percent": 10.0 + t % 3, "mem.percent": 50.0})
+
+
+def test_spike_is_flagged(detector):
+    """A single large sample after warm-up is reported as an ongoing spike."""
+    _steady(detector)
+    assert detector.anomalies() == []
+
+    detector.update(1700000060, {"cpu.percent": 95.0, "mem.percent": 50.0})
+    found = detector.anomalies()
+    assert len(found) == 1
+    spike = found[0]
+    assert spike["series"] == "cpu.percent"
+    assert spike["kind"] == "spike"
+    assert spike["direction"] == "up"
+    assert spike["ongoing"] is True
+    assert spike["value"] == 95.0
+
+    # The spike is not folded into the baseline, and it ends with the next normal sample
+    detector.update(1700000061, {"cpu.percent": 11.0, "mem.percent": 50.0})
+    assert detector.anomalies()[0]["ongoing"] is False
+    assert detector.anomalies(prefix="mem.") == []
+
+
+def test_nothing_flagged_during_warmup(detector):
+    """The baseline is still being learned for the first ``warmup`` samples."""
+    _steady(detector, samples=detector.warmup - 1)
+    detector.update(1700000100, {"cpu.percent": 95.0})
+    assert detector.anomalies() == []
+
+
+def test_level_shift_is_detected_and_relearned(detector):
+    """A sustained move is reported once as a level shift, then becomes the new normal."""
+    _steady(detector)
+    for t in range(60, 90):
+        detector.update(1700000000 + t, {"cpu.percent": 40.0 + t % 3, "mem.percent": 50.0})
+    kinds = [found["kind"] for found in detector.anomalies(prefix="cpu.")]
+    assert "level_shift" in kinds
+
+    count = len(detector.history)
+    for t in range(90, 150):
+        detector.update(1700000000 + t, {"cpu.percent": 40.0 + t % 3, "mem.percent": 50.0})
+    assert len(detector.history) == count
+
+
+def test_remove_drops_series_and_ends_their_anomalies(detector):
+    _steady(detector)
+    detector.update(1700000060, {"cpu.percent": 95.0, "mem.percent": 500.0})
+    assert len(detector.anomalies()) == 2
+
+    detector.remove(["mem.percent", "missing"])
+    assert detector.names == ["cpu.percent"]
+    assert all(not found["ongoing"] for found in detector.anomalies(prefix="mem."))
+
+    # The remaining series keeps its state and its ongoing spike
+    detector.update(1700000061, {"cpu.percent": 96.0})
+    cpu = detector.anomalies(prefix="cpu.")
+    assert len(cpu) == 1 and cpu[0]["ongoing"] is True
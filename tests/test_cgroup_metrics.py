@@ -0,0 +1,65 @@
+"""
+Tests for cgroup v2 limits, throttling and pressure
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.cgroup_metrics import cgroup_series, group_cgroup_series, read_cgroup
+
+
+def _cgroup(path, usage_usec=1000000, throttled_usec=0, nr_periods=100, nr_throttled=0,
+            rbytes=0, pressure_total=0):
+    files = {
+        "cpu.max": "150000 100000\n",
+        "cpu.stat": (f"usage_usec {usage_usec}\nuser_usec 1\nsystem_usec 1\nnr_periods {nr_periods}\n"
+                     f"nr_throttled {nr_throttled}\nthrottled_usec {throttled_usec}\n"),
+        "memory.current": "268435456\n",
+        "memory.max": "536870912\n",
+        "memory.high": "max\n",
+        "memory.events": "low 0\nhigh 0\nmax 3\noom 0\noom_kill 0\n",
+        "io.stat": f"8:0 rbytes={rbytes} wbytes=0 rios=0 wios=0 dbytes=0 dios=0\n"
+                   f"8:16 rbytes={rbytes} wbytes=0 rios=0 wios=0 dbytes=0 dios=0\n",
+        "cpu.pressure": (f"some avg10=12.50 avg60=3.00 avg300=1.00 total={pressure_total}\n"
+                         f"full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"),
+    }
+    path.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (path / name).write_text(text)
+    return str(path)
+
+
+def test_limits_and_counters_are_read(tmp_path):
+    gauges, counters = read_cgroup(_cgroup(tmp_path / "app"))
+    assert gauges == {"cpu_limit_cores": 1.5, "memory_current_bytes": 268435456.0,
+                      "memory_max_bytes": 536870912.0, "pressure_cpu_some_avg10": 12.5,
+                      "pressure_cpu_full_avg10": 0.0}
+    assert counters["cpu.usage_usec"] == 1000000.0
+    assert counters["memory_events.max"] == 3.0
+    assert counters["pressure.cpu_some_usec"] == 0.0
+
+
+def test_rates_become_series(tmp_path):
+    gauges, before = read_cgroup(_cgroup(tmp_path / "app"))
+    # One second later: 0.75 cores used, 2 of 10 periods throttled
+    _, after = read_cgroup(_cgroup(tmp_path / "app", usage_usec=1750000, throttled_usec=200000,
+                                   nr_periods=110, nr_throttled=2, rbytes=4096,
+                                   pressure_total=250000))
+    rates = {key: after[key] - before[key] for key in after}
+    series = cgroup_series(gauges, rates)
+    assert series["cgroup.cpu_usage_cores"] == 0.75
+    assert series["cgroup.cpu_percent_of_limit"] == 50.0
+    assert series["cgroup.cpu_throttled_seconds_per_sec"] == 0.2
+    assert series["cgroup.cpu_throttled_periods_percent"] == 20.0
+    assert series["cgroup.memory_percent_of_limit"] == 50.0
+    assert series["cgroup.io_read_bytes_per_sec"] == 8192.0
+    assert series["cgroup.pressure_cpu_some_stall_percent"] == 25.0
+
+    sections = group_cgroup_series(series)
+    assert sections["cpu"]["limit_cores"] == 1.5
+    assert sections["memory"]["percent_of_limit"] == 50.0
+    assert sections["pressure"]["cpu_some_stall_percent"] == 25.0
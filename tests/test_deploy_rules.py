@@ -0,0 +1,46 @@
+"""
+Tests for the deployment rule engine
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.deploy_rules import Rule, RuleError, RuleSet
+
+
+def _env_rule(id, key):
+    return Rule(id=id, target="env", description=f"{id}: {{key}}", key=key)
+
+
+def _flagged(rules, text):
+    return [issue["rule"] for issue in RuleSet(rules).check_env(".env", text.splitlines())]
+
+
+def test_key_rules_with_the_same_group_name():
+    rules = [_env_rule("pass", r"(?P<k>PASS)"), _env_rule("token", r"(?P<k>TOKEN)")]
+    assert _flagged(rules, "DB_PASS=x\nAPI_TOKEN=y\nHOST=z\n") == ["pass", "token"]
+
+
+def test_key_rule_with_a_backreference():
+    rules = [_env_rule("other", r"(A)"), _env_rule("double", r"(B)\1"), _env_rule("plain", "HOST")]
+    assert _flagged(rules, "BB=1\nHOST=2\nBC=3\n") == ["double", "plain"]
+
+
+def test_key_rule_inline_flags_are_kept():
+    rules = [_env_rule("ascii", r"(?a)^\w+_KEY$"), _env_rule("case", r"(?i)secret"),
+             _env_rule("verbose", "(?x) ^ DEBUG  # debug switches")]
+    assert _flagged(rules, "API_KEY=1\nCLÉ_KEY=2\nMy_Secret=3\nDEBUG=1\n") == ["ascii", "case", "verbose"]
+
+
+def test_uncombinable_rules_raise_rule_error(monkeypatch):
+    import tools.deploy_rules as deploy_rules
+
+    monkeypatch.setattr(deploy_rules, "_scoped", lambda regex: "(")
+    with pytest.raises(RuleError):
+        RuleSet([_env_rule("pass", "PASS")])
@@ -0,0 +1,45 @@
+"""
+Tests for the Deployment Checker Tool as a whole
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+# Old enough to be outside the racy window of the findings cache
+PAST = time.time() - 3600
+
+
+def _write(path, text, mtime=PAST):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_cached_findings_do_not_hide_secrets(tmp_path):
+    """A run without secret scanning must not fill the cache for one with it"""
+    pytest.importorskip("crewai_tools")
+    from tools.deployment_checker import DeploymentCheckerTool
+
+    tree = tmp_path / "deploy"
+    _write(tree / ".env", "AWS_ACCESS_KEY_ID=AKIAZ7QW3E5R7T9Y1U3I\n")
+    _write(tree / "Dockerfile", "FROM alpine:3.20\nENV DB_PASSWORD=Vq8kP2mZ7xR4tL9w\n")
+    cache_file = str(tmp_path / "cache.json")
+    tool = DeploymentCheckerTool()
+
+    result = tool._run(deployment_path=str(tree), cache_file=cache_file, scan_secrets=False)
+    assert not [issue for issue in result["issues"] if issue["type"] == "Hardcoded Secret"]
+    result = tool._run(deployment_path=str(tree), cache_file=cache_file, scan_secrets=True)
+    assert sorted(issue["rule"] for issue in result["issues"] if issue["type"] == "Hardcoded Secret") == [
+        "secret-aws-access-key", "secret-generic-secret"]
+    result = tool._run(deployment_path=str(tree), cache_file=cache_file, scan_secrets=True)
+    assert result["cache"]["unchanged_files"] == 2
+    assert len([issue for issue in result["issues"] if issue["type"] == "Hardcoded Secret"]) == 2
@@ -0,0 +1,54 @@
+"""
+Tests for diagnostic bundle capture and replay
+"""
+
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+pytest.importorskip("crewai_tools")
+pytest.importorskip("psutil")
+
+from tools.diagnostic_bundle import DiagnosticBundle, capture_bundle
+
+
+def test_capture_round_trips(tmp_path):
+    """A capture returns at once and reads back through DiagnosticBundle"""
+    log = tmp_path / "app.log"
+    log.write_text("".join(f"line {n}\n" for n in range(1000)))
+    path = str(tmp_path / "incident.zip")
+
+    started = time.monotonic()
+    manifest = capture_bundle(path, [str(log), str(tmp_path / "missing.log")], tail_bytes=100, top_n=5)
+    assert time.monotonic() - started < 10
+    assert isinstance(manifest["learning"], bool)
+    assert list(manifest["skipped_logs"]) == [str(tmp_path / "missing.log")]
+
+    bundle = DiagnosticBundle(path)
+    assert bundle.manifest == manifest
+    assert bundle.metric("cpu") is not None
+    assert bundle.log_files() == [str(log)]
+    tail = Path(bundle.log_path(str(log))).read_text()
+    # Cut at a line boundary, ending with the last line
+    assert tail.startswith("line ") and tail.endswith("line 999\n") and len(tail) <= 100
+    assert bundle.log_path(str(tmp_path / "other.log")) is None
+
+
+def test_failed_capture_leaves_no_files(tmp_path, monkeypatch):
+    log = tmp_path / "app.log"
+    log.write_text("line\n")
+
+    def fail(self, name, data, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(zipfile.ZipFile, "writestr", fail)
+    with pytest.raises(OSError):
+        capture_bundle(str(tmp_path / "incident.zip"), [str(log)], top_n=5)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["app.log"]
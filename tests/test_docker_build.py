@@ -0,0 +1,90 @@
+"""
+Tests for the build-performance analysis of Dockerfiles and build contexts
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.docker_build import CONTEXT_MAX_AGE_NS, analyze_dockerfile, build_context, context_changed
+from tools.dockerfile_parser import Dockerfile
+
+# Old enough to be outside the racy window of the findings cache
+PAST = time.time() - 3600
+
+
+SLOW_DOCKERFILE = """\
+FROM node:20 AS assets
+COPY . .
+RUN npm ci && npm run build
+
+FROM python:3.12-slim
+COPY . /app
+RUN pip install -r /app/requirements.txt
+RUN apt-get update
+RUN apt-get install -y curl
+RUN useradd app
+COPY --from=assets /dist /app/static
+"""
+
+
+def _write(path, text, mtime=PAST):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_slow_build_patterns_are_reported():
+    issues = analyze_dockerfile(Dockerfile.parse(SLOW_DOCKERFILE))
+    assert sorted((issue["rule"], issue["line"]) for issue in issues) == [
+        ("build-apt-lists", 9), ("build-apt-update-split", 8), ("build-consecutive-runs", 7),
+        ("build-copy-before-install", 3), ("build-copy-before-install", 7), ("build-pip-cache", 7)]
+
+
+def test_build_context_reused_until_a_directory_changes(tmp_path):
+    _write(tmp_path / "Dockerfile", "FROM alpine\nCOPY . .\n")
+    _write(tmp_path / "src" / "app.py", "print('hi')\n")
+    for directory in (tmp_path / "src", tmp_path):
+        os.utime(directory, (PAST, PAST))
+    dockerfile = str(tmp_path / "Dockerfile")
+
+    context = build_context(str(tmp_path), dockerfile)
+    assert context["files"] == 2
+    assert not context_changed(context, dockerfile)
+
+    _write(tmp_path / "src" / "extra.py", "x = 1\n")
+    assert context_changed(context, dockerfile)
+
+    for directory in (tmp_path / "src", tmp_path):
+        os.utime(directory, (PAST, PAST))
+    context = build_context(str(tmp_path), dockerfile)
+    assert context["files"] == 3
+    assert not context_changed(context, dockerfile)
+    _write(tmp_path / ".dockerignore", "src\n")
+    assert context_changed(context, dockerfile)
+    assert build_context(str(tmp_path), dockerfile)["files"] == 2
+
+
+def test_build_context_estimate_expires(tmp_path):
+    """A file growing in place leaves its directory alone; the estimate still ages out"""
+    _write(tmp_path / "Dockerfile", "FROM alpine\nCOPY . .\n")
+    build_log = _write(tmp_path / "build.log", "x\n")
+    os.utime(tmp_path, (PAST, PAST))
+    dockerfile = str(tmp_path / "Dockerfile")
+
+    context = build_context(str(tmp_path), dockerfile)
+    assert context["estimated_at"].endswith("Z")
+    with open(build_log, 'a') as f:
+        f.write("y" * 1000)
+    os.utime(tmp_path, (PAST, PAST))
+    assert not context_changed(context, dockerfile)
+
+    context["state"]["checked_ns"] -= CONTEXT_MAX_AGE_NS + 1
+    assert context_changed(context, dockerfile)
+    assert build_context(str(tmp_path), dockerfile)["bytes"] == context["bytes"] + 1000
@@ -0,0 +1,64 @@
+"""
+Tests for the Dockerfile parser
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.dockerfile_parser import Dockerfile
+
+
+def test_dockerfile_line_continuations():
+    dockerfile = Dockerfile.parse(
+        "FROM python:3.12 AS base\n"
+        "RUN apt-get update && \\\n"
+        "    # comments inside a continuation are dropped\n"
+        "\n"
+        "    apt-get install -y curl \\\n"
+        "    && rm -rf /var/lib/apt/lists/*\n"
+        "ENV APP_HOME=/app \\\n"
+        "    PORT=8000\n"
+        "WORKDIR $APP_HOME\n")
+    run, env, workdir = dockerfile.instructions[1:]
+    assert (run.line, run.end_line) == (2, 6)
+    assert run.arguments == "apt-get update && apt-get install -y curl && rm -rf /var/lib/apt/lists/*"
+    assert (env.line, env.end_line) == (7, 8)
+    assert dockerfile.final_stage.environment() == {"APP_HOME": "/app", "PORT": "8000"}
+    assert dockerfile.resolved_arguments(workdir) == "/app"
+
+
+def test_dockerfile_escape_directive():
+    dockerfile = Dockerfile.parse("# escape=`\nFROM windows/servercore\nRUN dir `\n    c:\\\n")
+    assert [instruction.keyword for instruction in dockerfile.instructions] == ["FROM", "RUN"]
+    assert dockerfile.instructions[1].arguments == "dir c:\\"
+
+
+def test_dockerfile_heredocs():
+    dockerfile = Dockerfile.parse(
+        "FROM alpine:3.20\n"
+        "RUN <<EOF\n"
+        "apk add --no-cache curl\n"
+        "FROM is not an instruction here\n"
+        "EOF\n"
+        "RUN <<-'SETUP' cat <<CONF\n"
+        "\techo tabs are stripped\n"
+        "\tSETUP\n"
+        "key=value\n"
+        "CONF\n"
+        "COPY <<EOF /etc/app.conf\n"
+        "port=80\n"
+        "EOF\n"
+        "USER app\n")
+    keywords = [instruction.keyword for instruction in dockerfile.instructions]
+    assert keywords == ["FROM", "RUN", "RUN", "COPY", "USER"]
+    first, second, copy = dockerfile.instructions[1:4]
+    assert first.heredocs == [("EOF", "apk add --no-cache curl\nFROM is not an instruction here")]
+    assert (first.line, first.end_line) == (2, 5)
+    assert second.heredocs == [("SETUP", "echo tabs are stripped"), ("CONF", "key=value")]
+    assert "apk add" in first.script
+    assert copy.sources() == []
+    assert len(dockerfile.stages) == 1
@@ -0,0 +1,105 @@
+"""
+Tests for the deployment findings cache and its rules fingerprint
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.deploy_rules import RuleSet
+from tools.findings_cache import FindingsCache, rules_fingerprint
+
+# Old enough to be outside the racy window of the findings cache
+PAST = time.time() - 3600
+
+PYTHON_RULES = """\
+rules:
+  - id: custom-check
+    target: k8s
+    python: custom_matchers:check
+    description: "{kind} fails the custom check"
+"""
+
+
+def _write(path, text, mtime=PAST):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_findings_cache_invalidation(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    target = _write(tmp_path / ".env", "KEY=one\n")
+    findings = [{"type": "Test", "file": str(target)}]
+
+    cache = FindingsCache(cache_file, "rules-a")
+    assert cache.get(str(target), target.stat()) is None
+    cache.put(str(target), target.stat(), findings)
+    cache.save()
+
+    # Unchanged: reused after one stat
+    cache = FindingsCache(cache_file, "rules-a")
+    assert cache.get(str(target), target.stat()) == findings
+
+    # Touched but identical: the content hash decides
+    os.utime(target, (PAST + 60, PAST + 60))
+    assert cache.get(str(target), target.stat()) == findings
+
+    # Same size, new content
+    _write(target, "KEY=two\n", PAST + 120)
+    assert cache.get(str(target), target.stat()) is None
+
+    # Another rule set drops everything
+    _write(target, "KEY=one\n")
+    cache = FindingsCache(cache_file, "rules-a")
+    cache.put(str(target), target.stat(), findings)
+    cache.save()
+    assert FindingsCache(cache_file, "rules-b").get(str(target), target.stat()) is None
+
+
+def test_findings_cache_drops_files_not_seen(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    kept = _write(tmp_path / "kept.env", "A=1\n")
+    removed = _write(tmp_path / "removed.env", "B=2\n")
+    cache = FindingsCache(cache_file, "rules")
+    for path in (kept, removed):
+        cache.put(str(path), path.stat(), [])
+    cache.put_value("context:x", {"files": 1})
+    cache.save()
+
+    cache = FindingsCache(cache_file, "rules")
+    assert cache.get(str(kept), kept.stat()) == []
+    cache.save()
+    cache = FindingsCache(cache_file, "rules")
+    assert cache.get(str(removed), removed.stat()) is None
+    assert cache.get_value("context:x") is None
+
+
+def test_rules_fingerprint_covers_sources_and_options(tmp_path):
+    rules_file = _write(tmp_path / "rules.yaml", "rules: []\n")
+    base = rules_fingerprint(1, [str(rules_file)])
+    assert rules_fingerprint(1, [str(rules_file)]) == base
+    assert rules_fingerprint(2, [str(rules_file)]) != base
+    assert rules_fingerprint(1, [str(rules_file)], ["scan_secrets=False"]) != base
+    _write(rules_file, "rules: [] # edited\n")
+    assert rules_fingerprint(1, [str(rules_file)]) != base
+
+
+def test_rules_fingerprint_covers_python_matchers(tmp_path, monkeypatch):
+    """Editing a ``python: module:function`` matcher invalidates cached findings"""
+    matcher = _write(tmp_path / "custom_matchers.py", "def check(obj, path):\n    return []\n")
+    rules_file = _write(tmp_path / "rules.yaml", PYTHON_RULES)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "custom_matchers", raising=False)
+    rules = RuleSet.from_files([str(rules_file)])
+    assert rules.python_sources() == (str(matcher),)
+
+    base = rules_fingerprint(1, [str(rules_file)] + list(rules.python_sources()))
+    _write(matcher, "def check(obj, path):\n    yield {}\n")
+    assert rules_fingerprint(1, [str(rules_file)] + list(rules.python_sources())) != base
@@ -0,0 +1,89 @@
+"""
+Tests for loading multi-document Kubernetes manifests
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.deploy_rules import load_rules
+from tools.k8s_manifests import load_manifest, load_manifests
+
+MULTI_DOCUMENT_MANIFEST = """\
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: api
+spec:
+  template:
+    spec:
+      containers:
+        - name: api
+          image: example/api:1.2
+---
+# Nothing but a comment
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: api
+spec:
+  ports:
+    - port: 80
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: worker
+spec:
+  template:
+    spec:
+      containers:
+        - name: worker
+          image: example/worker:1.2
+          resources:
+            limits:
+              cpu: "1"
+              memory: 512Mi
+"""
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_every_document_of_a_manifest_is_checked(tmp_path):
+    manifest = _write(tmp_path / "k8s" / "app.yaml", MULTI_DOCUMENT_MANIFEST)
+    path, documents, error = load_manifest(str(manifest))
+    assert error is None
+    # Empty documents are skipped but keep their place in the numbering
+    assert [(index, document["kind"]) for index, document in documents] == [
+        (0, "Deployment"), (2, "Service"), (3, "Deployment")]
+
+    rules = load_rules([])
+    flagged = [document["metadata"]["name"] for _, document in documents
+               if any(issue["rule"] == "k8s-workload-resource-limits"
+                      for issue in rules.check_k8s(path, document))]
+    assert flagged == ["api"]
+
+
+def test_manifest_syntax_error_keeps_earlier_documents(tmp_path):
+    broken = _write(tmp_path / "broken.yaml", "kind: Service\n---\nkind: [Deployment\n")
+    ok = _write(tmp_path / "ok.yaml", "kind: Service\n")
+    (_, documents, error), (_, ok_documents, ok_error) = load_manifests([str(broken), str(ok)], workers=1)
+    assert documents == [(0, {"kind": "Service"})] and error is not None
+    assert ok_documents == [(0, {"kind": "Service"})] and ok_error is None
+
+
+def test_manifests_come_back_in_input_order(tmp_path):
+    paths = [str(_write(tmp_path / f"m{n:02d}.yaml", f"kind: Service\nmetadata: {{name: s{n}}}\n"))
+             for n in range(40)]
+    manifests = load_manifests(paths, workers=2)
+    assert [path for path, _, _ in manifests] == paths
+    assert [documents[0][1]["metadata"]["name"] for _, documents, _ in manifests] == [
+        f"s{n}" for n in range(40)]
@@ -0,0 +1,47 @@
+"""
+Tests for bounded aggregation of matched log lines
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_aggregation import MAX_CONTENT_LENGTH, SampleStats, clip_content
+
+
+def test_sample_stats_merge_matches_serial():
+    """Merging the stats of consecutive sections equals one pass over all of them"""
+    items = [{"line_number": n, "content": f"line {n}"} for n in range(1, 101)]
+    serial = SampleStats(first_n=5, last_n=5, reservoir_n=3)
+    for item in items:
+        serial.add(item)
+
+    merged = SampleStats(first_n=5, last_n=5, reservoir_n=3)
+    for start, end in ((0, 3), (3, 37), (37, 38), (38, 100)):
+        section = SampleStats(first_n=5, last_n=5, reservoir_n=3)
+        for item in items[start:end]:
+            section.add(dict(item, line_number=item["line_number"] - start))
+        merged.merge(section, start)
+
+    assert merged.count == serial.count == 100
+    assert merged.first_seen_line == 1 and merged.last_seen_line == 100
+    assert merged.first == serial.first
+    assert list(merged.last) == list(serial.last)
+    # The reservoir is random, but only ever holds items past the first N
+    assert len(merged.reservoir) == 3
+    assert all(5 < item["line_number"] <= 100 for item in merged.reservoir)
+
+
+def test_sample_stats_stay_bounded():
+    stats = SampleStats(first_n=3, last_n=3, reservoir_n=4, seed=1)
+    for n in range(1, 100001):
+        stats.add({"line_number": n, "content": clip_content("x" * 5000)})
+    data = stats.to_dict()
+    assert data["count"] == 100000
+    assert [item["line_number"] for item in data["first"]] == [1, 2, 3]
+    assert [item["line_number"] for item in data["last"]] == [99998, 99999, 100000]
+    assert len(data["sample"]) == 4
+    assert len(data["first"][0]["content"]) == MAX_CONTENT_LENGTH + 3
@@ -0,0 +1,61 @@
+"""
+Tests for indexed log scans: index lookups must find what reading the whole
+log finds.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_index import scan_indexed
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+
+
+def _write_log(path, records=3000, seed=7):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(records):
+        timestamp = f"2025-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+        r = rng.random()
+        if r < 0.04:
+            lines.append(f"{timestamp} ERROR [main] handler crashed\n")
+            lines.append("Caused by: java.io.IOException: disk full\n")
+        elif r < 0.1:
+            lines.append(f"{timestamp} ERROR Timeout talking to db-{i % 7}\n")
+        elif r < 0.12:
+            lines.append(f"{timestamp} ERROR Connection refused by cache-{i % 3}\n")
+        else:
+            lines.append(f"{timestamp} INFO served request {i}\n")
+    path.write_text("".join(lines))
+    return path
+
+
+def _serial(path, scanner):
+    with open(path, 'r', encoding='utf-8') as f:
+        return scan_lines(scanner, f, ScanSummary()).to_dict()
+
+
+def test_indexed_scan_matches_full_scan(tmp_path):
+    """Index lookups find the same matches as reading the whole log"""
+    log = _write_log(tmp_path / "app.log", records=12000)
+    index_file = str(tmp_path / "app.idx")
+    for patterns in (["Connection refused"], ["Timeout", r"cache-\d"], [r"IOException"]):
+        scanner = LogScanner(patterns, warning_pattern=None)
+        full = _serial(log, scanner)
+        indexed, info = scan_indexed(str(log), scanner, index_file)
+        indexed = indexed.to_dict()
+        assert info["blocks_total"] > 1
+        for key in ("total_lines", "errors_found", "pattern_counts", "error_details"):
+            assert indexed[key] == full[key], (patterns, key)
+
+    # Lines appended after indexing are found as well
+    with open(log, 'a', encoding='utf-8') as f:
+        f.write("2025-01-02T00:00:00Z ERROR Connection refused by cache-9\n")
+    scanner = LogScanner(["Connection refused"], warning_pattern=None)
+    indexed, _ = scan_indexed(str(log), scanner, index_file)
+    full = _serial(log, scanner)
+    assert indexed.to_dict()["pattern_counts"] == full["pattern_counts"]
@@ -0,0 +1,125 @@
+"""
+Tests for parallel log scanning: merged ranges must report what a serial
+scan of the whole file reports.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_multiline import starts_record
+from tools.log_parallel import scan_file_parallel, split_ranges
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+
+# Parts of the summary that do not depend on how the log was split
+COMPARED_KEYS = ("total_lines", "errors_found", "warnings_found", "pattern_counts",
+                 "error_details", "exception_groups")
+
+PYTHON_TRACEBACK = [
+    "Traceback (most recent call last):\n",
+    '  File "app.py", line 3, in handle\n',
+    "    load()\n",
+    '  File "store.py", line 9, in load\n',
+    "    raise ValueError(key)\n",
+    "ValueError: bad value 12\n",
+]
+CHAINED_TRACEBACK = [
+    "\n",
+    "During handling of the above exception, another exception occurred:\n",
+    "\n",
+    "Traceback (most recent call last):\n",
+    '  File "app.py", line 5, in handle\n',
+    "KeyError: 'session'\n",
+]
+JAVA_STACK = [
+    "java.lang.IllegalStateException: worker stopped\n",
+    "\tat com.example.Worker.run(Worker.java:10)\n",
+    "\tat com.example.Pool.go(Pool.java:20)\n",
+    "Caused by: java.io.IOException: disk full\n",
+    "\tat com.example.Disk.write(Disk.java:5)\n",
+    "\t... 3 more\n",
+]
+
+
+def _write_log(path, records=3000, seed=7):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(records):
+        timestamp = f"2025-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+        r = rng.random()
+        if r < 0.05:
+            lines.append(f"{timestamp} ERROR request {i} failed\n")
+            lines.extend(PYTHON_TRACEBACK)
+            if rng.random() < 0.3:
+                lines.extend(CHAINED_TRACEBACK)
+        elif r < 0.09:
+            lines.append(f"{timestamp} ERROR [main] handler crashed\n")
+            lines.extend(JAVA_STACK)
+        elif r < 0.15:
+            lines.append(f"{timestamp} WARNING slow response from db-{i % 7}\n")
+        elif r < 0.2:
+            lines.append(f"{timestamp} ERROR Timeout talking to db-{i % 7}\n")
+        elif r < 0.22:
+            lines.append(f"{timestamp} ERROR Connection refused by cache-{i % 3}\n")
+        else:
+            lines.append(f"{timestamp} INFO served request {i}\n")
+    path.write_text("".join(lines))
+    return path
+
+
+def _serial(path, scanner):
+    with open(path, 'r', encoding='utf-8') as f:
+        return scan_lines(scanner, f, ScanSummary()).to_dict()
+
+
+def _compared(result):
+    return {key: result[key] for key in COMPARED_KEYS}
+
+
+def test_parallel_scan_matches_serial(tmp_path):
+    """Splitting the log into ranges changes nothing, even inside stack traces"""
+    log = _write_log(tmp_path / "app.log")
+    scanner = LogScanner()
+    serial = _serial(log, scanner)
+    assert serial["exception_groups"]["distinct"] >= 3
+    for chunk_size in (700, 1531, 4096, 20000):
+        parallel = scan_file_parallel(str(log), scanner, workers=1, chunk_size=chunk_size).to_dict()
+        assert _compared(parallel) == _compared(serial), chunk_size
+    parallel = scan_file_parallel(str(log), scanner, workers=2, chunk_size=5000).to_dict()
+    assert _compared(parallel) == _compared(serial)
+
+
+def test_parallel_scan_with_record_start_pattern(tmp_path):
+    log = _write_log(tmp_path / "app.log", seed=11)
+    scanner = LogScanner(record_start_pattern=r"^\d{4}-\d{2}-\d{2}T")
+    serial = _serial(log, scanner)
+    for chunk_size in (900, 5000):
+        parallel = scan_file_parallel(str(log), scanner, workers=1, chunk_size=chunk_size).to_dict()
+        assert _compared(parallel) == _compared(serial), chunk_size
+
+
+def test_record_boundary_search_is_capped(tmp_path):
+    """A rare record start does not make the split read the whole file"""
+    log = tmp_path / "app.log"
+    log.write_text("2025-01-01T00:00:00Z ERROR boot\n"
+                   + "".join(f"    continuation {n}\n" for n in range(20000)))
+    calls = []
+
+    def boundary(previous, line):
+        calls.append(line)
+        return starts_record(previous, line, record_start_pattern=r"^\d{4}-")
+
+    ranges = split_ranges(str(log), chunk_size=10000, boundary=boundary, align_limit=2000)
+    assert len(ranges) > 20
+    assert ranges[0][0] == 0 and ranges[-1][1] == log.stat().st_size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    # At most a line past the limit is read for each range
+    assert len(calls) <= len(ranges) * (2000 // 20 + 1)
+
+    scanner = LogScanner(record_start_pattern=r"^\d{4}-")
+    parallel = scan_file_parallel(str(log), scanner, workers=1, chunk_size=10000).to_dict()
+    assert parallel["total_lines"] == _serial(log, scanner)["total_lines"]
@@ -0,0 +1,62 @@
+"""
+Tests for rotated and compressed log sets
+"""
+
+import bz2
+import gzip
+import lzma
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+from tools.log_sources import open_log, resolve_log_files, scan_log_set
+
+
+def _lines(day, count=50):
+    return "".join(f"2025-01-{day:02d}T00:00:{n:02d}Z {'ERROR disk full' if n % 7 == 0 else 'INFO ok'}\n"
+                   for n in range(count))
+
+
+def _rotated_set(tmp_path):
+    base = tmp_path / "app.log"
+    base.write_text(_lines(4))
+    (tmp_path / "app.log.1").write_text(_lines(3))
+    with gzip.open(tmp_path / "app.log.2.gz", 'wt') as f:
+        f.write(_lines(2))
+    with lzma.open(tmp_path / "app.log.10.xz", 'wt') as f:
+        f.write(_lines(1))
+    (tmp_path / "other.log").write_text("unrelated\n")
+    return base
+
+
+def test_rotated_set_resolves_oldest_first(tmp_path):
+    base = _rotated_set(tmp_path)
+    assert [Path(path).name for path in resolve_log_files(str(base), include_rotated=True)] == [
+        "app.log.10.xz", "app.log.2.gz", "app.log.1", "app.log"]
+    assert resolve_log_files(str(base)) == [str(base)]
+    assert len(resolve_log_files(str(tmp_path / "*.log"))) == 2
+
+
+def test_compressed_files_stream_as_text(tmp_path):
+    with bz2.open(tmp_path / "app.log.bz2", 'wt') as f:
+        f.write(_lines(1, 3))
+    with open_log(str(tmp_path / "app.log.bz2")) as f:
+        assert f.read() == _lines(1, 3)
+
+
+def test_log_set_scan_numbers_lines_across_files(tmp_path):
+    paths = resolve_log_files(str(_rotated_set(tmp_path)), include_rotated=True)
+    scanner = LogScanner()
+    serial = scan_lines(scanner, "".join(_lines(day) for day in (1, 2, 3, 4)).splitlines(True),
+                        ScanSummary()).to_dict()
+    for workers in (1, 2):
+        summary, files = scan_log_set(paths, scanner, workers=workers)
+        assert [(Path(f["path"]).name, f["first_line"], f["lines"]) for f in files] == [
+            ("app.log.10.xz", 1, 50), ("app.log.2.gz", 51, 50), ("app.log.1", 101, 50), ("app.log", 151, 50)]
+        result = summary.to_dict()
+        for key in ("total_lines", "errors_found", "pattern_counts", "error_details"):
+            assert result[key] == serial[key], (workers, key)
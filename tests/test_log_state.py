@@ -0,0 +1,107 @@
+"""
+Tests for incremental log scans and their persisted offsets
+"""
+
+import multiprocessing
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+from tools.log_state import (STATE_EXAMPLE_LINES, STATE_EXCEPTION_GROUPS, LogOffsetStore,
+                             persisted_summary, scan_incremental)
+
+
+def _lines(start, count):
+    return "".join(f"2025-01-01T00:00:{n % 60:02d}Z ERROR request {n} failed\n"
+                   if n % 5 == 0 else f"2025-01-01T00:00:{n % 60:02d}Z INFO ok {n}\n"
+                   for n in range(start, start + count))
+
+
+def _serial(text, scanner):
+    return scan_lines(scanner, text.splitlines(True), ScanSummary()).to_dict()
+
+
+def test_scan_resumes_after_append(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text(_lines(0, 100))
+    store = LogOffsetStore(str(tmp_path / "state.json"))
+    scanner = LogScanner()
+
+    summary, info = scan_incremental(str(log), scanner, store)
+    assert info["full_rescan"] and summary.total_lines == 100
+    size = log.stat().st_size
+
+    # The unterminated last line is left for the next call
+    with open(log, 'a') as f:
+        f.write(_lines(100, 50) + "2025-01-01T00:01:00Z ERROR half")
+    summary, info = scan_incremental(str(log), scanner, store)
+    assert not info["full_rescan"]
+    assert info["scanned_from_byte"] == size
+    assert summary.to_dict()["errors_found"] == _serial(_lines(0, 150), scanner)["errors_found"]
+    assert summary.total_lines == 150
+
+    with open(log, 'a') as f:
+        f.write(" written\n")
+    summary, info = scan_incremental(str(log), scanner, store)
+    assert info["bytes_scanned"] == len("2025-01-01T00:01:00Z ERROR half written\n")
+    serial = _serial(log.read_text(), scanner)
+    for key in ("total_lines", "errors_found", "pattern_counts", "error_details"):
+        assert summary.to_dict()[key] == serial[key], key
+
+
+def test_scan_restarts_after_rotation(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text(_lines(0, 100))
+    store = LogOffsetStore(str(tmp_path / "state.json"))
+    scanner = LogScanner()
+    scan_incremental(str(log), scanner, store)
+
+    # Renamed away and recreated
+    log.rename(tmp_path / "app.log.1")
+    log.write_text(_lines(0, 10) + _lines(10, 10))
+    summary, info = scan_incremental(str(log), scanner, store)
+    assert info["rescan_reason"] == "log file replaced (inode changed)"
+    assert summary.total_lines == 20
+
+    # Truncated in place (copytruncate)
+    with open(log, 'w') as f:
+        f.write(_lines(500, 5))
+    summary, info = scan_incremental(str(log), scanner, store)
+    assert info["rescan_reason"] == "log file truncated"
+    assert summary.total_lines == 5
+
+
+def _put_many(state_file, prefix):
+    store = LogOffsetStore(state_file)
+    for n in range(30):
+        store.put(f"{prefix}{n}", {"offset": n})
+
+
+def test_concurrent_scans_keep_each_others_offsets(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    writers = [multiprocessing.Process(target=_put_many, args=(state_file, prefix)) for prefix in "ab"]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert len(LogOffsetStore(state_file)._load()) == 60
+
+
+def test_persisted_summary_is_capped():
+    summary = ScanSummary()
+    for n in range(STATE_EXCEPTION_GROUPS + 20):
+        summary.exceptions.add_group(f"group-{n}", {
+            "exception": f"Error{n}", "count": 1 + (n < STATE_EXCEPTION_GROUPS),
+            "first_seen_line": n, "last_seen_line": n, "stack_lines": 40,
+            "example": [f"frame {i}\n" for i in range(40)]})
+    state = persisted_summary(summary)
+    groups = state["exception_groups"]
+    assert len(groups["top"]) == STATE_EXCEPTION_GROUPS
+    assert groups["evicted_events"] == 20
+    assert all(len(group["example"]) == STATE_EXAMPLE_LINES for group in groups["top"])
+    restored = ScanSummary.from_dict(state)
+    assert len(restored.exceptions.groups) == STATE_EXCEPTION_GROUPS
@@ -0,0 +1,42 @@
+"""
+Tests for structured (JSON lines) log queries
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_structured import FieldFilter, StructuredQuery, StructuredSummary, scan_records
+
+
+def test_json_literals_match_both_spellings():
+    """``true``/``null`` as printed in group-by output select the same records"""
+    for expression in ("cached=true", "cached=True"):
+        assert FieldFilter(expression).matches({"cached": True})
+        assert not FieldFilter(expression).matches({"cached": False})
+    for expression in ("user=null", "user=None"):
+        assert FieldFilter(expression).matches({"user": None})
+        assert not FieldFilter(expression).matches({"user": "null-user"})
+    # A string field is compared as written
+    assert FieldFilter("flag=true").matches({"flag": "true"})
+    assert not FieldFilter("flag=True").matches({"flag": "true"})
+    assert FieldFilter("user!=null").matches({"user": "alice"})
+
+
+def test_structured_filter_prefilter_keeps_matches():
+    """The byte prefilter never drops a line the filter itself would match"""
+    lines = [
+        '{"city": "Zürich", "latency": 1}\n'.encode('utf-8'),
+        (json.dumps({"city": "Zürich", "latency": 1.0}) + "\n").encode('utf-8'),
+        b'{"city": "Bern", "latency": 2, "cached": true, "user": null}\n',
+        b'{"city": "Basel", "cached": "true", "user": "null"}\n',
+    ]
+    for filters, expected in ((["city=Zürich"], 2), (["latency=1.0"], 2), (["latency=1"], 2),
+                              (["cached=true"], 2), (["cached=True"], 1), (["user=null"], 2),
+                              (["user=None"], 1), (["city=Bern"], 1), (["city=Geneva"], 0)):
+        query = StructuredQuery(filters=filters)
+        assert scan_records(query, lines, StructuredSummary(query)).matched_lines == expected, filters
@@ -0,0 +1,61 @@
+"""
+Tests for the log template miner
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_templates import TemplateMiner, mask_line
+
+LINES = [
+    "2025-01-01T00:00:01Z ERROR Timeout talking to db-1 after 3000 ms",
+    "2025-01-01T00:00:02Z ERROR Connection refused by 10.0.0.7:6379",
+    "2025-01-01T00:00:03Z ERROR Timeout talking to db-4 after 2999 ms",
+    "2025-01-01T00:00:04Z ERROR Connection refused by 10.0.0.9:6379",
+    "2025-01-01T00:00:05Z ERROR Timeout talking to cache after 12 ms",
+    "2025-01-01T00:00:06Z ERROR user 3f2a9c1e-1b2c-4d5e-8f90-a1b2c3d4e5f6 not found",
+]
+
+
+def test_mask_line():
+    assert mask_line(LINES[1]) == "<TS> ERROR Connection refused by <IP>"
+    assert mask_line(LINES[5]) == "<TS> ERROR user <UUID> not found"
+    assert mask_line("crc 0xdeadbeef at offset -12.5") == "crc <HEX> at offset <NUM>"
+
+
+def test_similar_lines_share_a_template():
+    miner = TemplateMiner()
+    for line_number, line in enumerate(LINES, 1):
+        miner.add(line_number, line)
+    top = [(t["template"], t["count"], t["first_seen_line"], t["last_seen_line"]) for t in miner.top()]
+    assert top == [
+        ("<TS> ERROR Timeout talking to <*> after <NUM> ms", 3, 1, 5),
+        ("<TS> ERROR Connection refused by <IP>", 2, 2, 4),
+        ("<TS> ERROR user <UUID> not found", 1, 6, 6),
+    ]
+
+
+def test_merged_sections_match_one_pass():
+    serial = TemplateMiner()
+    for line_number, line in enumerate(LINES, 1):
+        serial.add(line_number, line)
+    merged = TemplateMiner()
+    for start, end in ((0, 2), (2, 6)):
+        section = TemplateMiner()
+        for line_number, line in enumerate(LINES[start:end], 1):
+            section.add(line_number, line)
+        merged.merge(section, start)
+    assert merged.top() == serial.top()
+    assert TemplateMiner.from_dicts(serial.top()).top() == serial.top()
+
+
+def test_template_table_is_bounded():
+    miner = TemplateMiner(max_templates=50)
+    for n in range(1000):
+        miner.add(n, f"event{n} happened")
+    assert len(miner) <= 50
+    assert miner.evicted_lines + sum(t["count"] for t in miner.top(None)) == 1000
@@ -0,0 +1,48 @@
+"""
+Tests for log timestamps and time-window histograms
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.log_timeline import Timeline, TimestampParser
+
+
+def test_timestamp_formats():
+    for line, expected in (("2025-01-01T00:00:10.5+01:00 ERROR x", 1735689610.5 - 3600),
+                           ("10.0.0.1 - - [01/Jan/2025:00:00:10 +0000] \"GET / HTTP/1.1\" 500", 1735689610.0),
+                           ("1735689610123 ERROR x", 1735689610.123)):
+        assert TimestampParser().parse(line) == expected, line
+    assert TimestampParser().parse("no timestamp here") is None
+
+
+def test_timeline_flags_a_spike():
+    """A burst of errors stands out from a steady baseline"""
+    timeline = Timeline(window_seconds=10)
+    start = 1735689600
+    for window in range(60):
+        count = 40 if window == 45 else 2 + window % 2
+        for i in range(count):
+            timeline.add("errors", start + window * 10 + i % 10)
+    anomalies = timeline.anomalies()
+    assert [(a["series"], a["window_start"], a["count"]) for a in anomalies] == [
+        ("errors", "2025-01-01T00:07:30Z", 40)]
+
+    restored = Timeline.from_state(timeline.to_state())
+    assert restored.anomalies() == anomalies
+
+
+def test_timeline_outlier_timestamps_stay_bounded():
+    """A line dated decades away coarsens the windows instead of allocating them"""
+    timeline = Timeline(window_seconds=10, max_windows=1000)
+    for second in range(5000):
+        timeline.add("errors", 1.7e9 + second)
+    timeline.add("errors", 0.0)
+    timeline.add("errors", -62135596800.0)
+    for start, counts in timeline._series.values():
+        assert len(counts) <= 1000
+        assert sum(counts) == 5002
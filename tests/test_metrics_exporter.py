@@ -0,0 +1,152 @@
+"""
+Tests for the Prometheus/OpenMetrics exporter
+"""
+
+import re
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.metrics_exporter import MetricsExporter, render, start_http_server
+from tools.metrics_sampler import MetricsSampler
+from tools.tool_metrics import LATENCY_BUCKETS, ToolMetrics
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*)\})? (\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+_SUFFIXES = {"gauge": ("",), "counter": ("_total",), "histogram": ("_bucket", "_count", "_sum")}
+
+VALUES = {
+    "cpu.percent": 12.5,
+    "disk_dev.sda.read_iops": 3.0,
+    "disk_dev.nvme0n1.read_iops": 7.0,
+    'net_dev.we"ird.bytes_recv_per_sec': 100.0
+}
+
+
+def _tools():
+    tools = ToolMetrics()
+    tools.record("Log Analyzer", 0.02)
+    tools.record("Log Analyzer", 3.0, error=True)
+    tools.record("System Monitor", 0.001)
+    return tools
+
+
+def parse_exposition(text, openmetrics=True):
+    """Check the exposition text line by line; return ``{family: (type, [(name, labels, value)])}``."""
+    assert text.endswith("\n")
+    lines = text[:-1].split("\n")
+    if openmetrics:
+        assert lines.pop() == "# EOF"
+    families, current = {}, None
+    for line in lines:
+        assert line, "blank lines are not allowed"
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, family, kind = line.split(" ")
+            if not openmetrics and kind == "counter":
+                family = family[:-len("_total")]
+            assert family not in families, f"{family} declared twice"
+            families[family] = current = (kind, [])
+            continue
+        match = _SAMPLE.match(line)
+        assert match, f"malformed sample line: {line!r}"
+        name, labels, value = match.groups()
+        assert current is not None, f"sample before any # TYPE: {line!r}"
+        family = next(family for family, entry in families.items() if entry is current)
+        assert any(name == family + suffix for suffix in _SUFFIXES[current[0]]), \
+            f"{name} does not belong to {current[0]} family {family}"
+        current[1].append((name, dict(_LABEL.findall(labels or "")), float(value)))
+    return families
+
+
+def test_render_parses_as_openmetrics():
+    families = parse_exposition(render(VALUES, _tools().snapshot()))
+
+    assert families["crew4ai_cpu_percent"] == ("gauge", [("crew4ai_cpu_percent", {}, 12.5)])
+    kind, samples = families["crew4ai_disk_dev_read_iops"]
+    assert kind == "gauge"
+    assert {labels["device"]: value for _, labels, value in samples} == {"nvme0n1": 7.0, "sda": 3.0}
+    _, samples = families["crew4ai_net_dev_bytes_recv_per_sec"]
+    assert samples[0][1] == {"interface": 'we\\"ird'}
+
+    kind, samples = families["crew4ai_tool_errors"]
+    assert kind == "counter"
+    assert {labels["tool"]: value for _, labels, value in samples} == {"Log Analyzer": 1, "System Monitor": 0}
+
+
+def test_histogram_buckets_are_cumulative():
+    kind, samples = parse_exposition(render({}, _tools().snapshot()))["crew4ai_tool_latency_seconds"]
+    assert kind == "histogram"
+    buckets = [(labels["le"], value) for name, labels, value in samples
+               if name.endswith("_bucket") and labels["tool"] == "Log Analyzer"]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets[-1] == ("+Inf", 2)
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    count = next(value for name, labels, value in samples
+                 if name.endswith("_count") and labels["tool"] == "Log Analyzer")
+    assert count == buckets[-1][1]
+
+
+def test_prometheus_text_format_parses():
+    """The textfile format names counters with _total and has no # EOF."""
+    text = render(VALUES, _tools().snapshot(), openmetrics=False)
+    assert "# EOF" not in text
+    assert "# TYPE crew4ai_tool_calls_total counter" in text
+    families = parse_exposition(text, openmetrics=False)
+    assert families["crew4ai_tool_calls"][0] == "counter"
+
+
+def test_render_parses_with_prometheus_client():
+    parser = pytest.importorskip("prometheus_client.openmetrics.parser")
+    families = {family.name: family for family in
+                parser.text_string_to_metric_families(render(VALUES, _tools().snapshot()))}
+    assert families["crew4ai_tool_calls"].type == "counter"
+    assert families["crew4ai_tool_latency_seconds"].type == "histogram"
+
+
+def _exporter():
+    sampler = MetricsSampler(collectors=[lambda now: dict(VALUES)])
+    sampler.sample()
+    return sampler, MetricsExporter(sampler, _tools())
+
+
+def test_exporter_caches_until_inputs_change():
+    sampler, exporter = _exporter()
+    body = exporter.render()
+    assert exporter.render() is body
+    exporter.tools.record("Log Analyzer", 0.5)
+    assert exporter.render() is not body
+    parse_exposition(exporter.render().decode())
+
+
+def test_write_textfile_is_complete(tmp_path):
+    _, exporter = _exporter()
+    path = tmp_path / "crew4ai.prom"
+    exporter.write_textfile(str(path))
+    parse_exposition(path.read_text(), openmetrics=False)
+    assert [p.name for p in tmp_path.iterdir()] == ["crew4ai.prom"]
+
+
+def test_http_endpoint_negotiates_format():
+    _, exporter = _exporter()
+    server = start_http_server(port=0, exporter=exporter)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text; version=1.0.0"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+            parse_exposition(response.read().decode())
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            parse_exposition(response.read().decode(), openmetrics=False)
+    finally:
+        server.shutdown()
+        server.server_close()
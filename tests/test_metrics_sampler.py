@@ -0,0 +1,101 @@
+"""
+Tests for the background metrics sampler's bookkeeping
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools import metrics_sampler
+from tools.metrics_sampler import TOTALS_PREFIX, CounterRates, MetricsSampler, RingBuffer, group_by_device
+
+
+class _ShortLivedInterfaces:
+    """A steady CPU series plus a new network interface every few samples."""
+
+    def __init__(self):
+        self.samples = 0
+
+    def __call__(self, now):
+        self.samples += 1
+        return {
+            "cpu.percent": 10.0 + self.samples % 3,
+            f"net_dev.veth{self.samples // 5}.bytes_recv_per_sec": 100.0,
+            TOTALS_PREFIX + "net.bytes_recv": 1000.0 * self.samples
+        }
+
+
+def test_ring_buffer_wraps_and_counts_missing():
+    """The oldest values are overwritten and last() reads across the wrap point."""
+    ring = RingBuffer(4)
+    assert len(ring) == 0 and ring.last(3) == []
+    for value in range(1, 7):
+        ring.append(float(value))
+    assert len(ring) == 4
+    assert ring.latest() == 6.0
+    assert ring.last(3) == [4.0, 5.0, 6.0]
+    assert ring.last(10) == [3.0, 4.0, 5.0, 6.0]
+
+    ring.append(float("nan"))
+    ring.append(float("nan"))
+    assert ring.missing == 2
+    ring.append(7.0)
+    assert ring.missing == 0
+
+
+def test_series_of_vanished_devices_are_dropped():
+    sampler = MetricsSampler(capacity=20, collectors=[_ShortLivedInterfaces()])
+    for _ in range(400):
+        sampler.sample()
+    # veth0 .. veth80 came and went; only those seen within one buffer remain
+    names = set(sampler.stats(seconds=3600))
+    assert "cpu.percent" in names
+    assert len(names) <= 1 + 20 // 5 + 1
+    assert sorted(sampler.detector.names) == sorted(names)
+    assert sampler.sampled_at() is not None
+
+
+def test_totals_are_kept_apart_from_series():
+    sampler = MetricsSampler(capacity=20, collectors=[_ShortLivedInterfaces()])
+    for _ in range(3):
+        sampler.sample()
+    assert TOTALS_PREFIX + "net.bytes_recv" not in sampler.latest()
+    latest = sampler.latest(totals=True)
+    assert latest[TOTALS_PREFIX + "net.bytes_recv"] == 3000.0
+    assert not any(name.startswith(TOTALS_PREFIX) for name in sampler.detector.names)
+
+
+def test_counter_rates_skip_resets():
+    rates = CounterRates()
+    assert rates.update({"reads": 100.0}, now=10.0) == {}
+    assert rates.update({"reads": 300.0}, now=12.0) == {"reads": 100.0}
+    # The counter wrapped or the device was re-attached
+    assert rates.update({"reads": 50.0}, now=13.0) == {}
+    assert rates.update({"reads": 80.0}, now=14.0) == {"reads": 30.0}
+
+
+def test_per_disk_rates(monkeypatch):
+    counters = {"reads": 1000, "writes": 500, "read_bytes": 0, "write_bytes": 0,
+                "io_time": 0, "busy_time": 0, "queue_time": 0}
+    readings = iter([
+        {"nvme0n1": dict(counters)},
+        {"nvme0n1": dict(counters, reads=1100, writes=600, read_bytes=4096 * 100, write_bytes=8192 * 100,
+                         io_time=400, busy_time=250, queue_time=1500)},
+    ])
+    monkeypatch.setattr(metrics_sampler, "_disk_counters", lambda: next(readings))
+    collector = metrics_sampler._PerDiskCollector()
+    assert collector(100.0) == {}
+    disk = group_by_device(collector(101.0), "disk_dev.")["nvme0n1"]
+    assert disk == {"read_iops": 100.0, "write_iops": 100.0, "read_bytes_per_sec": 409600.0,
+                    "write_bytes_per_sec": 819200.0, "await_ms": 2.0, "utilization_percent": 25.0,
+                    "avg_queue_size": 1.5}
+
+
+def test_group_by_device_keeps_dotted_names():
+    values = {"net_dev.eth0.100.bytes_recv_per_sec": 1.234, "net_dev.eth0.bytes_recv_per_sec": 2.0,
+              "net.bytes_recv_per_sec": 3.0}
+    assert group_by_device(values, "net_dev.") == {"eth0.100": {"bytes_recv_per_sec": 1.23},
+                                                   "eth0": {"bytes_recv_per_sec": 2.0}}
@@ -0,0 +1,67 @@
+"""
+Tests for the socket connection summary
+"""
+
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+pytest.importorskip("psutil")
+
+from tools import net_connections
+from tools.net_connections import connection_summary
+
+HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt"
+          "   uid  timeout inode\n")
+
+
+def _row(n, local, remote, state):
+    return (f"{n:4d}: {local} {remote} {state} 00000000:00000000 00:00000000 00000000"
+            f"  1000        0 {10000 + n} 1 0000000000000000 100 0 0 10 0\n")
+
+
+def test_proc_tables_are_summarized(tmp_path, monkeypatch):
+    (tmp_path / "tcp").write_text(HEADER + "".join([
+        _row(0, "0100007F:1F90", "00000000:0000", "0A"),
+        _row(1, "0100007F:1F90", "0200000A:D431", "01"),
+        _row(2, "0100007F:1F90", "0200000A:D432", "01"),
+        _row(3, "0100007F:1F90", "0300000A:D433", "06"),
+        _row(4, "0100007F:0016", "00000000:0000", "0A"),
+    ]))
+    (tmp_path / "tcp6").write_text(HEADER + _row(
+        0, "00000000000000000000000000000000:1F90", "0000000000000000FFFF00000200000A:D434", "01"))
+    (tmp_path / "udp").write_text(HEADER + _row(0, "00000000:0035", "00000000:0000", "07"))
+    monkeypatch.setattr(net_connections, "PROC_NET", str(tmp_path))
+
+    summary = connection_summary(top=5)
+    assert summary["source"] == "proc"
+    assert summary["total"] == 7 and summary["udp"]["total"] == 1
+    assert summary["tcp"]["states"] == {"ESTABLISHED": 3, "LISTEN": 2, "TIME_WAIT": 1}
+    assert summary["listening_ports"] == [{"port": 8080, "listeners": 1, "connections": 4},
+                                          {"port": 22, "listeners": 1, "connections": 0}]
+    # The v4-mapped IPv6 peer is the same host as the IPv4 one
+    assert summary["top_remote_peers"] == [{"address": "10.0.0.2", "connections": 3},
+                                           {"address": "10.0.0.3", "connections": 1}]
+
+
+def test_live_connection_is_counted():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    port = server.getsockname()[1]
+    client = socket.create_connection(("127.0.0.1", port))
+    accepted, _ = server.accept()
+    try:
+        summary = connection_summary(top=1000)
+    finally:
+        for sock in (accepted, client, server):
+            sock.close()
+    listening = {entry["port"]: entry for entry in summary["listening_ports"]}
+    assert listening[port]["listeners"] == 1 and listening[port]["connections"] >= 1
+    assert summary["tcp"]["states"].get("ESTABLISHED", 0) >= 2
@@ -0,0 +1,44 @@
+"""
+Tests for two-sample process profiling
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+pytest.importorskip("psutil")
+
+from tools.process_profiler import SORT_COLUMNS, profile_processes
+
+
+def test_busy_process_ranks_first():
+    """CPU usage comes from the window, not from the process lifetime"""
+    busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    try:
+        result = profile_processes(top_n=3, sort_by="cpu_percent", window=0.5)
+    finally:
+        busy.kill()
+        busy.wait()
+    assert result["top"][0]["pid"] == busy.pid
+    assert result["top"][0]["cpu_percent"] > 20
+    assert result["processes_sampled"] >= 2 and not result["truncated"]
+    assert set(result["top"][0]) >= set(SORT_COLUMNS)
+
+
+def test_rows_are_sorted_by_any_column():
+    result = profile_processes(top_n=5, sort_by="rss_bytes", window=0.1)
+    rss = [row["rss_bytes"] for row in result["top"]]
+    assert len(rss) <= 5 and rss == sorted(rss, reverse=True)
+    with pytest.raises(ValueError):
+        profile_processes(sort_by="name")
+
+
+def test_time_budget_bounds_the_profile():
+    result = profile_processes(window=0.2, time_budget=0.2)
+    assert result["elapsed_seconds"] < 2
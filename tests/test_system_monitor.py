@@ -0,0 +1,37 @@
+"""
+Tests for the System Monitor Tool's snapshot sections
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+pytest.importorskip("crewai_tools")
+pytest.importorskip("psutil")
+
+from tools.system_monitor import SystemMonitorTool
+
+
+def test_cpu_is_none_until_sampled():
+    """An idle reading is not confused with no reading at all"""
+    tool = SystemMonitorTool()
+    cpu = tool._snapshot('cpu', {}, {})
+    assert cpu["cpu_percent"] is None and cpu["iowait_percent"] is None
+    cpu = tool._snapshot('cpu', {}, {"cpu.percent": 0.04, "cpu.iowait_percent": 12.345})
+    assert cpu["cpu_percent"] == 0.0 and cpu["iowait_percent"] == 12.3
+
+
+def test_sections_share_one_sample():
+    latest = {"memory.total_bytes": 8e9, "memory.available_bytes": 6e9, "memory.used_bytes": 2e9,
+              "memory.percent": 25.0, "totals.net.bytes_sent": 1234.0}
+    tool = SystemMonitorTool()
+    memory = tool._snapshot('memory', {}, latest)
+    assert memory["virtual_memory"]["total"] == 8000000000
+    result = tool._run(metrics=['cpu', 'memory', 'disk', 'network'])
+    assert set(result) >= {'cpu', 'memory', 'disk', 'network', 'elapsed_seconds'}
+    assert not [name for name in ('cpu', 'memory', 'disk', 'network') if isinstance(result[name], str)]
@@ -0,0 +1,46 @@
+"""
+Tests for the deployment tree walk and its ignore-file handling
+"""
+
+import sys
+from pathlib import Path
+
+# Add the crew4ai directory to the Python path
+crew4ai_path = Path(__file__).parent.parent
+sys.path.insert(0, str(crew4ai_path))
+
+from tools.tree_walker import IgnoreRules, walk
+
+
+def _touch(root, *paths):
+    for path in paths:
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x\n")
+
+
+def test_ignored_directories_are_still_checked(tmp_path):
+    """Only ignored dependency and build output directories are pruned"""
+    _touch(tmp_path, "secrets/.env", ".aws/credentials", "env/prod.env", "dist/bundle.js",
+           "vendor/lib.go", "app.egg-info/PKG-INFO", "node_modules/x/index.js", "k8s/app.yaml",
+           "build/Dockerfile", "src/app.py", "src/debug.log")
+    (tmp_path / ".gitignore").write_text("secrets/\n.aws/\nenv/\ndist/\nvendor/\n*.egg-info/\n*.log\n")
+    (tmp_path / ".dockerignore").write_text("k8s\n")
+
+    files = {rel_path for rel_path, entry in walk(str(tmp_path)) if entry.is_file()}
+    assert files == {".gitignore", ".dockerignore", "secrets/.env", ".aws/credentials", "env/prod.env",
+                     "k8s/app.yaml", "build/Dockerfile", "src/app.py", "src/debug.log"}
+
+    everything = {rel_path for rel_path, _ in walk(str(tmp_path), use_ignore_files=False)}
+    assert {"dist/bundle.js", "vendor/lib.go"} <= everything
+    assert "node_modules/x/index.js" not in everything
+
+
+def test_ignore_rules():
+    rules = IgnoreRules(["*.log", "!keep.log", "/build/", "docs/**/*.tmp"])
+    assert rules.match("a/b/app.log", False) is True
+    assert rules.match("keep.log", False) is False
+    assert rules.match("build", True) is True
+    assert rules.match("build", False) is None
+    assert rules.match("docs/x/y/z.tmp", False) is True
+    assert rules.match("src/main.py", False) is None
@@ -0,0 +1,241 @@
+"""
+Anomaly Detector
+================
+
+Online anomaly detection over every series the metrics sampler collects.
+
+Each series keeps an exponentially weighted mean and variance as its learned
+baseline. A sample whose z-score against that baseline exceeds ``threshold``
+is a spike; a two-sided CUSUM over the (clipped) z-scores detects sustained
+level shifts, after which the baseline is re-learned from the new level.
+Outliers are not folded into the baseline, so a spike does not hide the next
+one.
+
+All series are updated at once as vectors: with NumPy every sample is a
+handful of array operations regardless of the number of series, and Python
+code only runs for the few series that are anomalous. Without NumPy the same
+update runs as a plain loop.
+"""
+import math
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_THRESHOLD = 4.0
+DEFAULT_WARMUP = 30
+
+# CUSUM slack and decision threshold, in standard deviations
+CUSUM_K = 0.5
+CUSUM_H = 8.0
+
+# Idle series have no variance; a relative floor keeps every blip from
+# looking infinitely unusual.
+RELATIVE_STD_FLOOR = 0.05
+MIN_STD = 1e-6
+MAX_SCORE = 100.0
+
+DEFAULT_HISTORY = 200
+
+_STATE_FIELDS = ("mean", "var", "count", "cusum_up", "cusum_down", "up_since", "down_since")
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Anomaly:
+    """A spike or level shift of one series."""
+
+    __slots__ = ("series", "kind", "started_at", "last_seen_at", "baseline", "value", "score", "ongoing")
+
+    def __init__(self, series: str, started_at: float, baseline: float, value: float, score: float):
+        self.series = series
+        self.kind = "spike"
+        self.started_at = started_at
+        self.last_seen_at = started_at
+        self.baseline = baseline
+        self.value = value
+        self.score = score
+        self.ongoing = True
+
+    def observe(self, now: float, value: float, score: float):
+        self.last_seen_at = now
+        if score > self.score:
+            self.value, self.score = value, score
+
+    def to_dict(self) -> dict:
+        size = self.value - self.baseline
+        return {
+            "series": self.series,
+            "kind": self.kind,
+            "direction": "up" if size >= 0 else "down",
+            "started_at": _timestamp(self.started_at),
+            "last_seen_at": _timestamp(self.last_seen_at),
+            "baseline": round(self.baseline, 2),
+            "value": round(self.value, 2),
+            "size": round(size, 2),
+            "relative_size": round(size / abs(self.baseline), 2) if self.baseline else None,
+            "score": round(self.score, 1),
+            "ongoing": self.ongoing
+        }
+
+
+class AnomalyDetector:
+    """EWMA z-score and CUSUM change-point detection over many series at once."""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, threshold: float = DEFAULT_THRESHOLD,
+                 warmup: int = DEFAULT_WARMUP, history: int = DEFAULT_HISTORY):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.names: List[str] = []
+        self._index: Dict[str, int] = {}
+        # Per-series state; *_since is when each CUSUM last left zero, which
+        # is where a detected shift started.
+        self._state = {field: None for field in _STATE_FIELDS}
+        self._active: Dict[int, Anomaly] = {}
+        self.history: Deque[Anomaly] = deque(maxlen=history)
+        self.samples = 0
+
+    def _grow(self, n: int):
+        for field, values in self._state.items():
+            missing = n - (len(values) if values is not None else 0)
+            if np is not None:
+                extra = np.full(missing, 0.0)
+                self._state[field] = extra if values is None else np.concatenate([values, extra])
+            else:
+                self._state[field] = (values or []) + [0.0] * missing
+
+    def update(self, now: float, values: Dict[str, float]):
+        """Feed one sample of every series (series missing from it are skipped)."""
+        for name in values:
+            if name not in self._index:
+                self._index[name] = len(self.names)
+                self.names.append(name)
+        if self._state["mean"] is None or len(self.names) != len(self._state["mean"]):
+            self._grow(len(self.names))
+        sample = [values.get(name, math.nan) for name in self.names]
+        if np is not None:
+            flagged = self._step_numpy(np.array(sample, dtype=float), now)
+        else:
+            flagged = self._step_python(sample, now)
+        self._record(now, sample, flagged)
+        self.samples += 1
+
+    def remove(self, names: Iterable[str]):
+        """Stop tracking ``names`` (series of devices that went away)."""
+        dropped = {self._index[name] for name in names if name in self._index}
+        if not dropped:
+            return
+        keep = [i for i in range(len(self.names)) if i not in dropped]
+        for field, values in self._state.items():
+            if values is not None:
+                self._state[field] = values[keep] if np is not None else [values[i] for i in keep]
+        renumbered = {old: new for new, old in enumerate(keep)}
+        active, self._active = self._active, {}
+        for i, anomaly in active.items():
+            if i in renumbered:
+                self._active[renumbered[i]] = anomaly
+            else:
+                anomaly.ongoing = False
+        self.names = [self.names[i] for i in keep]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def _step_numpy(self, x, now: float) -> list:
+        state = self._state
+        mean, var, count = state["mean"], state["var"], state["count"]
+        valid = ~np.isnan(x)
+        warm = valid & (count >= self.warmup)
+        diff = np.where(valid, x - mean, 0.0)
+        std = np.maximum(np.sqrt(var), np.maximum(RELATIVE_STD_FLOOR * np.abs(mean), MIN_STD))
+        z = diff / std
+        outlier = warm & (np.abs(z) > self.threshold)
+
+        # A single spike cannot push the CUSUM over its threshold on its own
+        clipped = np.clip(z, -self.threshold, self.threshold)
+        up = np.where(warm, np.maximum(0.0, state["cusum_up"] + clipped - CUSUM_K), state["cusum_up"])
+        down = np.where(warm, np.maximum(0.0, state["cusum_down"] - clipped - CUSUM_K), state["cusum_down"])
+        state["up_since"] = np.where((state["cusum_up"] == 0) & (up > 0), now, state["up_since"])
+        state["down_since"] = np.where((state["cusum_down"] == 0) & (down > 0), now, state["down_since"])
+        state["cusum_up"], state["cusum_down"] = up, down
+
+        # Warm-up uses the running average, then a fixed smoothing factor
+        alpha = np.where(valid & ~outlier, np.maximum(self.alpha, 1.0 / (count + 1.0)), 0.0)
+        state["mean"] = mean + alpha * diff
+        state["var"] = (1.0 - alpha) * (var + alpha * diff * diff)
+        state["count"] = count + valid
+
+        shift = (up > CUSUM_H) | (down > CUSUM_H)
+        return [(int(i), float(z[i]), bool(outlier[i]), bool(shift[i]), float(mean[i]), float(std[i]))
+                for i in np.flatnonzero(outlier | shift)]
+
+    def _step_python(self, x: list, now: float) -> list:
+        state = self._state
+        flagged = []
+        for i, value in enumerate(x):
+            if math.isnan(value):
+                continue
+            mean, var, count = state["mean"][i], state["var"][i], state["count"][i]
+            warm = count >= self.warmup
+            diff = value - mean
+            std = max(math.sqrt(var), RELATIVE_STD_FLOOR * abs(mean), MIN_STD)
+            z = diff / std
+            outlier = warm and abs(z) > self.threshold
+            if warm:
+                clipped = max(-self.threshold, min(self.threshold, z))
+                up = max(0.0, state["cusum_up"][i] + clipped - CUSUM_K)
+                down = max(0.0, state["cusum_down"][i] - clipped - CUSUM_K)
+                if state["cusum_up"][i] == 0 and up > 0:
+                    state["up_since"][i] = now
+                if state["cusum_down"][i] == 0 and down > 0:
+                    state["down_since"][i] = now
+                state["cusum_up"][i], state["cusum_down"][i] = up, down
+            if not outlier:
+                alpha = max(self.alpha, 1.0 / (count + 1.0))
+                state["mean"][i] = mean + alpha * diff
+                state["var"][i] = (1.0 - alpha) * (var + alpha * diff * diff)
+            state["count"][i] = count + 1
+            shift = state["cusum_up"][i] > CUSUM_H or state["cusum_down"][i] > CUSUM_H
+            if outlier or shift:
+                flagged.append((i, z, outlier, shift, mean, std))
+        return flagged
+
+    def _record(self, now: float, sample: list, flagged: list):
+        state = self._state
+        seen = set()
+        for i, z, _, shift, baseline, std in flagged:
+            seen.add(i)
+            score = min(abs(z), MAX_SCORE)
+            anomaly = self._active.get(i)
+            if anomaly is None:
+                anomaly = Anomaly(self.names[i], now, baseline, sample[i], score)
+                self._active[i] = anomaly
+                self.history.append(anomaly)
+            else:
+                anomaly.observe(now, sample[i], score)
+            if shift:
+                # A sustained move: report it once and learn the new level
+                since = state["up_since"][i] if state["cusum_up"][i] > CUSUM_H else state["down_since"][i]
+                anomaly.kind = "level_shift"
+                anomaly.started_at = min(anomaly.started_at, float(since))
+                anomaly.value = sample[i]
+                anomaly.score = max(anomaly.score, min(abs(sample[i] - anomaly.baseline) / std, MAX_SCORE))
+                anomaly.ongoing = False
+                del self._active[i]
+                state["mean"][i] = sample[i]
+                state["cusum_up"][i] = state["cusum_down"][i] = 0.0
+        for i in [i for i in self._active if i not in seen]:
+            self._active.pop(i).ongoing = False
+
+    def anomalies(self, prefix: str = "", since: Optional[float] = None, limit: int = 20) -> List[dict]:
+        """Anomalies seen after ``since`` (epoch seconds), strongest first."""
+        found = [anomaly for anomaly in self.history
+                 if anomaly.series.startswith(prefix) and (since is None or anomaly.last_seen_at >= since)]
+        found.sort(key=lambda anomaly: (anomaly.ongoing, anomaly.score), reverse=True)
+        return [anomaly.to_dict() for anomaly in found[:limit]]
@@ -0,0 +1,188 @@
+"""
+Cgroup Metrics
+==============
+
+Container-aware resource metrics read from a cgroup v2 directory.
+
+Inside a container ``psutil`` reports the host: its CPUs, its memory. The
+limits that actually bind are in the cgroup: ``cpu.max``, ``memory.max``,
+and the throttling and stall counters in ``cpu.stat`` and the PSI
+``*.pressure`` files. Counters are turned into rates from the delta between
+two reads: the sampler's previous sample for the current cgroup (see
+``_CgroupCollector`` in the metrics sampler), or two reads ``window`` seconds
+apart for a named one.
+"""
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_WINDOW = 0.5
+
+DEFAULT_MOUNT = "/sys/fs/cgroup"
+
+_PRESSURE_RESOURCES = ("cpu", "memory", "io")
+
+
+def cgroup_mount() -> Optional[str]:
+    """Mount point of the cgroup v2 hierarchy (also found on hybrid hosts)."""
+    try:
+        with open("/proc/self/mountinfo") as f:
+            for line in f:
+                fields = line.split()
+                separator = fields.index("-")
+                if fields[separator + 1] == "cgroup2":
+                    return fields[4]
+    except (OSError, ValueError, IndexError):
+        pass
+    if os.path.exists(os.path.join(DEFAULT_MOUNT, "cgroup.controllers")):
+        return DEFAULT_MOUNT
+    return None
+
+
+def current_cgroup() -> str:
+    """This process's cgroup, relative to the v2 hierarchy root."""
+    with open("/proc/self/cgroup") as f:
+        for line in f:
+            if line.startswith("0::"):
+                return line[3:].strip()
+    return "/"
+
+
+def cgroup_path(name: Optional[str] = None) -> str:
+    """Directory of the named cgroup, or of the one this process runs in."""
+    mount = cgroup_mount()
+    if mount is None:
+        raise FileNotFoundError("cgroup v2 hierarchy is not mounted")
+    relative = name if name else current_cgroup()
+    path = os.path.realpath(os.path.join(mount, relative.strip("/")))
+    if os.path.commonpath([path, os.path.realpath(mount)]) != os.path.realpath(mount):
+        raise ValueError(f"cgroup outside the hierarchy: {name}")
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"cgroup not found: {relative}")
+    return path
+
+
+def _read(path: str) -> Optional[str]:
+    # A controller that is not enabled for the cgroup has no files
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _limit(value: str) -> Optional[float]:
+    value = value.strip()
+    return None if value == "max" else float(value)
+
+
+def read_cgroup(path: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Gauges and monotonically increasing counters of one cgroup, as flat dicts."""
+    gauges: Dict[str, float] = {}
+    counters: Dict[str, float] = {}
+
+    text = _read(os.path.join(path, "cpu.max"))
+    if text is not None:
+        quota, period = text.split()
+        if quota != "max":
+            gauges["cpu_limit_cores"] = float(quota) / float(period)
+    text = _read(os.path.join(path, "cpu.stat"))
+    if text is not None:
+        for line in text.splitlines():
+            key, value = line.split()
+            counters["cpu." + key] = float(value)
+
+    for name in ("memory.current", "memory.max", "memory.high", "memory.swap.current"):
+        text = _read(os.path.join(path, name))
+        if text is not None:
+            value = _limit(text)
+            if value is not None:
+                gauges[name.replace(".", "_") + "_bytes"] = value
+    text = _read(os.path.join(path, "memory.events"))
+    if text is not None:
+        for line in text.splitlines():
+            key, value = line.split()
+            counters["memory_events." + key] = float(value)
+
+    text = _read(os.path.join(path, "io.stat"))
+    if text is not None:
+        # "<major>:<minor> rbytes=.. wbytes=.. rios=.. wios=.. ..." per device
+        for line in text.splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                counters["io." + key] = counters.get("io." + key, 0.0) + float(value)
+
+    for resource in _PRESSURE_RESOURCES:
+        text = _read(os.path.join(path, f"{resource}.pressure"))
+        if text is None:
+            continue
+        # "some avg10=0.00 avg60=0.00 avg300=0.00 total=0"
+        for line in text.splitlines():
+            kind, *fields = line.split()
+            for field in fields:
+                key, _, value = field.partition("=")
+                if key == "total":
+                    counters[f"pressure.{resource}_{kind}_usec"] = float(value)
+                elif key == "avg10":
+                    # The kernel's own 10s average; avg60/avg300 are what trends are for
+                    gauges[f"pressure_{resource}_{kind}_avg10"] = float(value)
+    return gauges, counters
+
+
+def cgroup_series(gauges: Dict[str, float], rates: Dict[str, float]) -> Dict[str, float]:
+    """Flat ``cgroup.*`` series from one read's gauges and the counter rates."""
+    series = {"cgroup." + name: value for name, value in gauges.items()}
+    limit = gauges.get("cpu_limit_cores")
+    if "cpu.usage_usec" in rates:
+        cores = rates["cpu.usage_usec"] / 1e6
+        series["cgroup.cpu_usage_cores"] = cores
+        if limit:
+            series["cgroup.cpu_percent_of_limit"] = 100.0 * cores / limit
+    if "cpu.throttled_usec" in rates:
+        series["cgroup.cpu_throttled_seconds_per_sec"] = rates["cpu.throttled_usec"] / 1e6
+    if rates.get("cpu.nr_periods"):
+        series["cgroup.cpu_throttled_periods_percent"] = (
+            100.0 * rates.get("cpu.nr_throttled", 0.0) / rates["cpu.nr_periods"])
+    memory_max = gauges.get("memory_max_bytes")
+    if memory_max and "memory_current_bytes" in gauges:
+        series["cgroup.memory_percent_of_limit"] = 100.0 * gauges["memory_current_bytes"] / memory_max
+    for event in ("oom", "oom_kill", "max", "high"):
+        if f"memory_events.{event}" in rates:
+            series[f"cgroup.memory_{event}_events_per_sec"] = rates[f"memory_events.{event}"]
+    for key, name in (("rbytes", "read_bytes_per_sec"), ("wbytes", "write_bytes_per_sec"),
+                      ("rios", "read_iops"), ("wios", "write_iops")):
+        if "io." + key in rates:
+            series["cgroup.io_" + name] = rates["io." + key]
+    for name, rate in rates.items():
+        if name.startswith("pressure."):
+            # Stalled microseconds per second, as a percentage of wall time
+            stall = name[len("pressure."):-len("_usec")]
+            series[f"cgroup.pressure_{stall}_stall_percent"] = min(100.0, rate / 1e4)
+    return series
+
+
+def group_cgroup_series(series: Dict[str, float]) -> Dict[str, dict]:
+    """Arrange ``cgroup.*`` series into cpu/memory/io/pressure sections."""
+    sections: Dict[str, dict] = {"cpu": {}, "memory": {}, "io": {}, "pressure": {}}
+    for name, value in sorted(series.items()):
+        if not name.startswith("cgroup."):
+            continue
+        section, _, field = name[len("cgroup."):].partition("_")
+        if section in sections:
+            sections[section][field] = round(value, 2)
+    return sections
+
+
+def cgroup_metrics(name: Optional[str] = None, window: float = DEFAULT_WINDOW) -> dict:
+    """Limits, usage, throttling and pressure of a cgroup over ``window`` seconds."""
+    path = cgroup_path(name)
+    _, before = read_cgroup(path)
+    started = time.monotonic()
+    time.sleep(window)
+    gauges, after = read_cgroup(path)
+    elapsed = time.monotonic() - started
+    rates = {key: (value - before[key]) / elapsed for key, value in after.items()
+             if key in before and value >= before[key]}
+    series = cgroup_series(gauges, rates)
+    return dict({"cgroup": name or current_cgroup(), "path": path, "window_seconds": window},
+                **group_cgroup_series(series))
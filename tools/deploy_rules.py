@@ -0,0 +1,443 @@
+"""
+Deployment Rules
+================
+
+Declarative rule engine behind the Deployment Checker Tool.
+
+A rule names a target and a matcher. Targets are ``dockerfile`` (one
+instruction), ``env`` (one ``KEY=value`` entry), ``k8s`` (one manifest
+document, optionally restricted to some ``kind`` values) and ``compose``
+(one service of a Compose file). Rules are declared in YAML::
+
+    rules:
+      - id: k8s-privileged
+        target: k8s
+        kind: [Pod, Deployment]
+        path: spec.template.spec.containers[].securityContext.privileged
+        equals: true
+        type: Security Issue
+        description: "{kind} runs a privileged container ({path})"
+
+or in Python, as a ``Rule`` whose matcher is a function (or a YAML rule whose
+``python`` key names one as ``module:function``). A Python matcher receives
+the object and the file path and yields one dict of description fields per
+finding.
+
+Declarative matchers:
+
+``key`` (+ ``ignore_keys``, ``min_value_length``)
+    Regex searched in keys: the entry key of an env file, or every mapping key
+    (at any depth) holding a string in a manifest or service.
+``value``
+    Regex searched in the value: of an env entry, of a Dockerfile instruction's
+    arguments (with ``instruction``), or at ``path``.
+``path`` (+ ``value`` or ``equals``)
+    Dotted path into the object; ``[]`` walks every element of a list.
+``each`` + ``missing``
+    Every element at ``each`` that lacks the dotted path ``missing``.
+
+A ``RuleSet`` compiles its rules once and indexes them by target (and by kind
+or instruction), so an object is only tested against the rules that apply to
+it. The ``key`` rules of a target without groups are merged into one
+alternation that every key is tested against first; only keys it matches are
+tested rule by rule.
+Check time therefore follows the number of applicable rules, not the size of
+the rule set.
+"""
+import importlib
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import yaml
+
+TARGETS = ("dockerfile", "env", "k8s", "compose")
+
+# Applies to every k8s kind / Dockerfile instruction
+ANY = "*"
+
+BUILTIN_RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "config", "deployment_rules.yaml")
+
+_MISSING = object()
+
+
+class RuleError(ValueError):
+    """A rule that cannot be compiled."""
+
+
+class _Fields(dict):
+    """Description fields; unknown placeholders are left as they are."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class Rule:
+    """One compiled rule."""
+
+    def __init__(self, id: str, target: str, description: str, type: str = "Policy Violation",
+                 kind: Optional[Sequence[str]] = None, instruction: Optional[str] = None,
+                 key: Optional[str] = None, ignore_keys: Sequence[str] = (), min_value_length: int = 0,
+                 value: Optional[str] = None, path: Optional[str] = None, equals=_MISSING,
+                 each: Optional[str] = None, missing: Optional[str] = None,
+                 python: Optional[Callable[[object, str], Iterable[dict]]] = None):
+        if target not in TARGETS:
+            raise RuleError(f"rule {id}: unknown target {target!r} (expected one of {', '.join(TARGETS)})")
+        self.id = id
+        self.target = target
+        self.description = description
+        self.type = type
+        if isinstance(kind, str):
+            kind = [kind]
+        self.kinds = tuple(kind) if kind else (ANY,)
+        self.instruction = instruction.upper() if instruction else ANY
+        self.python = python
+        try:
+            self.key = re.compile(key) if key else None
+            self.value = re.compile(value) if value is not None else None
+        except re.error as e:
+            raise RuleError(f"rule {id}: invalid regex: {e}")
+        self.ignore_keys = frozenset(ignore_keys)
+        self.min_value_length = min_value_length
+        self.path = _split(path) if path else None
+        self.equals = equals
+        self.each = _split(each) if each else None
+        self.missing = _split(missing) if missing else None
+        if sum(x is not None for x in (self.python, self.key, self.path, self.each)) > 1:
+            raise RuleError(f"rule {id}: combine at most one of key, path, each and python")
+        if (self.each is None) != (self.missing is None):
+            raise RuleError(f"rule {id}: each and missing go together")
+        if target == "dockerfile" and self.key is not None:
+            raise RuleError(f"rule {id}: key does not apply to dockerfile rules")
+        if target in ("dockerfile", "env"):
+            if self.path is not None or self.each is not None:
+                raise RuleError(f"rule {id}: path and each only apply to k8s and compose rules")
+        elif self.key is None and self.path is None and self.each is None and self.python is None:
+            raise RuleError(f"rule {id}: needs one of key, path, each or python")
+        if all(x is None for x in (self.python, self.key, self.value, self.path, self.each)):
+            raise RuleError(f"rule {id}: has no matcher")
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "Rule":
+        spec = dict(spec)
+        for required in ("id", "target", "description"):
+            if required not in spec:
+                raise RuleError(f"rule {spec.get('id', '?')}: missing {required!r}")
+        python = spec.pop("python", None)
+        if isinstance(python, str):
+            module, _, name = python.partition(":")
+            try:
+                spec["python"] = getattr(importlib.import_module(module), name)
+            except (ImportError, AttributeError) as e:
+                raise RuleError(f"rule {spec['id']}: cannot import {python}: {e}")
+        try:
+            return cls(**spec)
+        except TypeError as e:
+            raise RuleError(f"rule {spec['id']}: {e}")
+
+    def _issue(self, file_path: str, fields: dict, line: Optional[int] = None) -> dict:
+        issue = {"type": self.type, "file": file_path}
+        if line is not None:
+            issue["line"] = line
+        issue["description"] = self.description.format_map(_Fields(fields))
+        issue["rule"] = self.id
+        return issue
+
+    def match_object(self, obj: dict, file_path: str, fields: dict) -> Iterator[dict]:
+        """Findings of this rule alone on a manifest document or service (no index involved)."""
+        if self.python is not None:
+            yield from self._python_issues(obj, file_path, fields)
+        elif self.path is not None:
+            for path, value in _resolve(obj, self.path):
+                if self.matches_value(value):
+                    yield self._issue(file_path, {**fields, "path": path, "value": value})
+        elif self.each is not None:
+            for path, element in _resolve(obj, self.each):
+                if self.lacks(element):
+                    yield self._issue(file_path, _element_fields(fields, path, element))
+
+    def _python_issues(self, obj, file_path: str, fields: dict, line: Optional[int] = None) -> Iterator[dict]:
+        for found in self.python(obj, file_path) or ():
+            yield self._issue(file_path, {**fields, **found}, line)
+
+    def matches_value(self, value) -> bool:
+        if self.equals is not _MISSING:
+            return value == self.equals
+        return self.value is None or (value is not None and self.value.search(str(value)) is not None)
+
+    def lacks(self, element) -> bool:
+        return not any(True for _ in _resolve(element, self.missing))
+
+    def match_key(self, key: str, value: str) -> bool:
+        return (key not in self.ignore_keys and len(value) >= self.min_value_length
+                and self.key.search(key) is not None
+                and (self.value is None or self.value.search(value) is not None))
+
+
+def _element_fields(fields: dict, path: str, element) -> dict:
+    name = element.get("name", "unnamed") if isinstance(element, dict) else "unnamed"
+    index = path[path.rfind("[") + 1:-1] if path.endswith("]") else ""
+    return {**fields, "path": path, "index": index, "name": name}
+
+
+def _split(path: str) -> Tuple[str, ...]:
+    parts = []
+    for part in path.split("."):
+        if part.endswith("[]"):
+            parts.extend((part[:-2], "[]") if part[:-2] else ("[]",))
+        else:
+            parts.append(part)
+    return tuple(parts)
+
+
+def _resolve(obj, parts: Tuple[str, ...], prefix: str = "") -> Iterator[Tuple[str, object]]:
+    """``(path, value)`` of everything ``parts`` reaches in ``obj``."""
+    for i, part in enumerate(parts):
+        if part == "[]":
+            if not isinstance(obj, list):
+                return
+            for index, item in enumerate(obj):
+                yield from _resolve(item, parts[i + 1:], f"{prefix}[{index}]")
+            return
+        if not isinstance(obj, dict) or part not in obj:
+            return
+        obj = obj[part]
+        prefix = f"{prefix}.{part}" if prefix else part
+    yield prefix, obj
+
+
+def _string_keys(obj, path: str = "") -> Iterator[Tuple[str, str, str]]:
+    """``(path, key, value)`` of every mapping key holding a string, at any depth."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            current = f"{path}.{key}" if path else str(key)
+            if isinstance(value, str):
+                yield current, str(key), value
+            elif isinstance(value, (dict, list)):
+                yield from _string_keys(value, current)
+    elif isinstance(obj, list):
+        for i, item in enumerate(obj):
+            if isinstance(item, (dict, list)):
+                yield from _string_keys(item, f"{path}[{i}]")
+
+
+_LEADING_FLAGS = re.compile(r"^(?:\(\?[aiLmsux]+\))+")
+_SCOPED_FLAGS = ((re.ASCII, "a"), (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"),
+                 (re.VERBOSE, "x"))
+
+
+def _scoped(regex: re.Pattern) -> str:
+    """``regex`` as a group of an alternation, its global flags made local to it."""
+    pattern = _LEADING_FLAGS.sub("", regex.pattern)
+    flags = "".join(letter for flag, letter in _SCOPED_FLAGS if regex.flags & flag)
+    if regex.flags & re.VERBOSE:
+        # A trailing comment would swallow the closing parenthesis
+        pattern += "\n"
+    return f"(?{flags}:{pattern})"
+
+
+class _KeyRules:
+    """The ``key`` rules of one target, behind one combined prefilter regex.
+
+    A pattern with groups cannot join the alternation: group names would clash
+    and backreferences would point at another rule's groups. Those rules are
+    tested on their own, for every key.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.alone = [rule for rule in rules if rule.key.groups]
+        combined = [rule for rule in rules if not rule.key.groups]
+        self.prefilter = re.compile("|".join(_scoped(rule.key) for rule in combined)) if combined else None
+
+    def matches(self, key: str, value: str) -> Iterator[Rule]:
+        if self.prefilter is not None and self.prefilter.search(key):
+            candidates = self.rules
+        else:
+            candidates = self.alone
+        for rule in candidates:
+            if rule.match_key(key, value):
+                yield rule
+
+
+class _ObjectRules:
+    """The object rules of one kind; rules sharing a path resolve it once."""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.paths: Dict[Tuple[str, ...], List[Rule]] = {}
+        self.each: Dict[Tuple[str, ...], List[Rule]] = {}
+        self.python = [rule for rule in rules if rule.python is not None]
+        for rule in rules:
+            if rule.path is not None:
+                self.paths.setdefault(rule.path, []).append(rule)
+            elif rule.each is not None:
+                self.each.setdefault(rule.each, []).append(rule)
+
+    def check(self, obj: dict, file_path: str, fields: dict) -> List[dict]:
+        issues = []
+        for parts, rules in self.paths.items():
+            for path, value in _resolve(obj, parts):
+                for rule in rules:
+                    if rule.matches_value(value):
+                        issues.append(rule._issue(file_path, {**fields, "path": path, "value": value}))
+        for parts, rules in self.each.items():
+            for path, element in _resolve(obj, parts):
+                for rule in rules:
+                    if rule.lacks(element):
+                        issues.append(rule._issue(file_path, _element_fields(fields, path, element)))
+        for rule in self.python:
+            issues.extend(rule._python_issues(obj, file_path, fields))
+        return issues
+
+
+class _Target:
+    """Rules indexed for one target: object rules and key rules per kind or instruction."""
+
+    def __init__(self, rules: List[Rule], selector: Callable[[Rule], Sequence[str]]):
+        objects: Dict[str, List[Rule]] = {}
+        keys: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            for selected in selector(rule):
+                index = keys if rule.key is not None else objects
+                index.setdefault(selected, []).append(rule)
+        # Rules for every kind are folded into each kind's lists up front
+        wildcard_objects = objects.get(ANY, [])
+        wildcard_keys = keys.get(ANY, [])
+        for selected in set(objects) | set(keys):
+            if selected != ANY:
+                objects[selected] = wildcard_objects + objects.get(selected, [])
+                keys[selected] = wildcard_keys + keys.get(selected, [])
+        self.objects = {selected: _ObjectRules(rules) for selected, rules in objects.items()}
+        self.keys = {selected: _KeyRules(rules) for selected, rules in keys.items()}
+        self._default_objects = self.objects.get(ANY, _ObjectRules([]))
+        self._default_keys = self.keys.get(ANY, _KeyRules([]))
+
+    def object_rules(self, selected: str) -> _ObjectRules:
+        return self.objects.get(selected, self._default_objects)
+
+    def key_rules(self, selected: str) -> _KeyRules:
+        return self.keys.get(selected, self._default_keys)
+
+
+class RuleSet:
+    """Rules compiled once and grouped by target."""
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = list(rules)
+        seen = set()
+        for rule in self.rules:
+            if rule.id in seen:
+                raise RuleError(f"duplicate rule id {rule.id!r}")
+            seen.add(rule.id)
+        by_target: Dict[str, List[Rule]] = {target: [] for target in TARGETS}
+        for rule in self.rules:
+            by_target[rule.target].append(rule)
+        try:
+            self._dockerfile = _Target(by_target["dockerfile"], lambda rule: (rule.instruction,))
+            self._env = _Target(by_target["env"], lambda rule: (ANY,))
+            self._k8s = _Target(by_target["k8s"], lambda rule: rule.kinds)
+            self._compose = _Target(by_target["compose"], lambda rule: (ANY,))
+        except re.error as e:
+            raise RuleError(f"cannot combine key rules: {e}")
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str], extra: Iterable[Rule] = ()) -> "RuleSet":
+        rules = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                spec = yaml.safe_load(f) or {}
+            if not isinstance(spec, dict) or not isinstance(spec.get("rules", []), list):
+                raise RuleError(f"{path}: expected a mapping with a 'rules' list")
+            rules.extend(Rule.from_dict(rule) for rule in spec.get("rules", []))
+        rules.extend(extra)
+        return cls(rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def python_sources(self) -> Tuple[str, ...]:
+        """Source files of the Python matchers, for fingerprinting the rule set."""
+        sources = set()
+        for rule in self.rules:
+            if rule.python is not None:
+                module = sys.modules.get(getattr(rule.python, "__module__", None) or "")
+                source = getattr(module, "__file__", None)
+                if source:
+                    sources.add(source)
+        return tuple(sorted(sources))
+
+    def check_env(self, file_path: str, lines: Iterable[str]) -> List[dict]:
+        """Findings of an env file, one ``KEY=value`` entry at a time."""
+        issues = []
+        rules = self._env.object_rules(ANY).rules
+        key_rules = self._env.key_rules(ANY)
+        for line_num, line in enumerate(lines, 1):
+            if '=' not in line or line.strip().startswith('#'):
+                continue
+            key, value = line.split('=', 1)
+            value = value.strip()
+            fields = {"line": line.strip(), "key": key, "value": value}
+            for rule in rules:
+                if rule.python is not None:
+                    issues.extend(rule._python_issues(fields, file_path, fields, line_num))
+                elif rule.value.search(value):
+                    issues.append(rule._issue(file_path, fields, line_num))
+            for rule in key_rules.matches(key, value):
+                issues.append(rule._issue(file_path, fields, line_num))
+        return issues
+
+    def check_dockerfile(self, file_path: str, instructions: Iterable[Tuple[int, str, str]]) -> List[dict]:
+        """Findings of a Dockerfile, given as ``(line, INSTRUCTION, arguments)``."""
+        issues = []
+        for line_num, instruction, arguments in instructions:
+            fields = {"instruction": instruction, "arguments": arguments, "value": arguments}
+            for rule in self._dockerfile.object_rules(instruction).rules:
+                if rule.python is not None:
+                    issues.extend(rule._python_issues(fields, file_path, fields, line_num))
+                elif rule.value.search(arguments):
+                    issues.append(rule._issue(file_path, fields, line_num))
+        return issues
+
+    def check_k8s(self, file_path: str, document: dict) -> List[dict]:
+        """Findings of one manifest document, against the rules for its kind."""
+        kind = document.get("kind")
+        kind = kind if isinstance(kind, str) else ANY
+        return self._check_object(self._k8s, kind, file_path, document, {"kind": kind})
+
+    def check_compose(self, file_path: str, document: dict) -> List[dict]:
+        """Findings of a Compose file, one service at a time."""
+        issues = []
+        services = document.get("services")
+        if not isinstance(services, dict):
+            return issues
+        for name, service in services.items():
+            if isinstance(service, dict):
+                issues.extend(self._check_object(self._compose, ANY, file_path, service,
+                                                 {"service": name}))
+        return issues
+
+    @staticmethod
+    def _check_object(target: _Target, selected: str, file_path: str, obj: dict, fields: dict) -> List[dict]:
+        issues = []
+        key_rules = target.key_rules(selected)
+        if key_rules.rules:
+            for path, key, value in _string_keys(obj):
+                for rule in key_rules.matches(key, value):
+                    issues.append(rule._issue(file_path, {**fields, "path": path, "key": key}))
+        issues.extend(target.object_rules(selected).check(obj, file_path, fields))
+        return issues
+
+
+_rule_sets: Dict[tuple, RuleSet] = {}
+
+
+def load_rules(paths: Sequence[str] = ()) -> RuleSet:
+    """The built-in rules plus those in ``paths``, compiled once per content version."""
+    paths = (BUILTIN_RULES_FILE,) + tuple(paths)
+    key = tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+    if key not in _rule_sets:
+        _rule_sets[key] = RuleSet.from_files(paths)
+    return _rule_sets[key]
@@ -10,18 +10,48 @@ import yaml
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from crewai_tools import BaseTool
+from tools import deploy_rules, docker_build, dockerfile_parser, k8s_manifests, secret_scanner
+from tools.deploy_rules import BUILTIN_RULES_FILE, RuleError, load_rules
+from tools.docker_build import (analyze_dockerfile, build_context, context_changed, context_issues,
+                                dockerignore_path, summarize)
+from tools.dockerfile_parser import Dockerfile, is_dockerfile_name
+from tools.findings_cache import FindingsCache, default_cache_file, rules_fingerprint
+from tools.k8s_manifests import load_manifest, load_manifests
+from tools.secret_scanner import scan_files, scannable
+from tools.tool_metrics import instrumented
+from tools.tree_walker import walk
+
+# Directories (at the top of the deployment path) holding Kubernetes manifests
+K8S_DIRS = ('k8s', 'kubernetes', 'manifests')
+
+COMPOSE_FILES = ('docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml')
+
+# Bump when a check changes in a way the source fingerprint cannot see
+# (e.g. a dependency's behaviour); cached findings are dropped on change.
+RULES_VERSION = 1
+RULE_SOURCES = (__file__, k8s_manifests.__file__, deploy_rules.__file__, BUILTIN_RULES_FILE,
+                secret_scanner.__file__, dockerfile_parser.__file__, docker_build.__file__)
 
 class DeploymentCheckerToolSchema(BaseModel):
     """Input for DeploymentCheckerTool."""
     deployment_path: str = Field(..., description="Path to the deployment configuration directory")
+    use_cache: bool = Field(default=True, description="Reuse findings of files unchanged since the previous check")
+    cache_file: str = Field(default="", description="Findings cache file (default: one per deployment path under ~/.cache/crew4ai/deploy_findings)")
+    rules_files: list = Field(default=[], description="Additional YAML rule files, checked together with the built-in rules")
+    scan_secrets: bool = Field(default=True, description="Scan every text file in the tree for hardcoded secrets")
 
 class DeploymentCheckerTool(BaseTool):
     name: str = "Deployment Checker Tool"
     description: str = "Checks deployment configurations and identifies potential issues."
     args_schema: Type[BaseModel] = DeploymentCheckerToolSchema
 
+    @instrumented
     def _run(self, **kwargs: Any) -> Any:
         deployment_path = kwargs.get('deployment_path')
+        use_cache = kwargs.get('use_cache', True)
+        cache_file = kwargs.get('cache_file', '')
+        rules_files = kwargs.get('rules_files') or []
+        scan_secrets = kwargs.get('scan_secrets', True)
         
         if not deployment_path:
             return "Error: No deployment path provided"
@@ -29,6 +59,11 @@ class DeploymentCheckerTool(BaseTool):
         if not os.path.exists(deployment_path):
             return f"Error: Deployment directory not found at {deployment_path}"
         
+        try:
+            rules = load_rules(rules_files)
+        except (OSError, RuleError, yaml.YAMLError) as e:
+            return f"Error loading deployment rules: {str(e)}"
+        
         try:
             issues = []
             
@@ -47,219 +82,195 @@ class DeploymentCheckerTool(BaseTool):
                 'manifests/'
             ]
             
-            found_files = []
-            missing_files = []
-            
-            for item in common_files:
-                item_path = os.path.join(deployment_path, item)
-                if os.path.exists(item_path):
-                    found_files.append(item)
-                else:
-                    missing_files.append(item)
-            
-            # Check environment files for secrets
-            env_issues = self._check_env_files(deployment_path)
-            issues.extend(env_issues)
-            
-            # Check Docker files
-            docker_issues = self._check_docker_files(deployment_path)
-            issues.extend(docker_issues)
+            # Every check looks at the files it is interested in during one
+            # shared walk of the tree
+            checkers = [
+                (self._is_env_file, self._check_env_file),
+                (self._is_dockerfile, self._check_dockerfile),
+                (self._is_compose_file, self._check_compose_file)
+            ]
+            cache = None
+            if use_cache:
+                cache = FindingsCache(cache_file or default_cache_file(deployment_path),
+                                      rules_fingerprint(RULES_VERSION,
+                                                        RULE_SOURCES + tuple(rules_files) + rules.python_sources(),
+                                                        [f"scan_secrets={bool(scan_secrets)}"]))
+            # Findings per checked file, in walk order
+            findings = {}
+            # Files checked this run (not cached), and those of them left
+            # for the batched (parallel) checks after the walk
+            checked = {}
+            manifests = []
+            secret_scans = []
+            dockerfiles = []
+            top_level = set()
+            for rel_path, entry in walk(deployment_path):
+                if '/' not in rel_path:
+                    top_level.add(rel_path + '/' if entry.is_dir() else rel_path)
+                if entry.is_dir(follow_symlinks=False):
+                    continue
+                wanted = [check for wants, check in checkers if wants(rel_path, entry.name)]
+                if self._is_dockerfile(rel_path, entry.name):
+                    dockerfiles.append(entry.path)
+                is_manifest = self._is_k8s_file(rel_path, entry.name)
+                if not wanted and not is_manifest and not scan_secrets:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                has_secrets = scan_secrets and scannable(entry.name, stat.st_size)
+                if not wanted and not is_manifest and not has_secrets:
+                    continue
+                cached = cache.get(entry.path, stat) if cache is not None else None
+                if cached is not None:
+                    findings[entry.path] = cached
+                    continue
+                findings[entry.path] = [issue for check in wanted for issue in check(entry.path, rules)]
+                checked[entry.path] = stat
+                if is_manifest:
+                    manifests.append(entry.path)
+                if has_secrets:
+                    secret_scans.append(entry.path)
+            for file_path, found in self._check_k8s_files(manifests, rules):
+                findings[file_path].extend(found)
+            # The scanner hashes what it reads, which saves the cache a second read
+            digests = {}
+            for file_path, found, digest in scan_files(secret_scans):
+                findings[file_path].extend(found)
+                digests[file_path] = digest
+            if cache is not None:
+                for file_path, stat in checked.items():
+                    cache.put(file_path, stat, findings[file_path], digests.get(file_path))
+            for found in findings.values():
+                issues.extend(found)
+            # The build context can change without the Dockerfile changing,
+            # so it is validated on every run
+            builds = self._analyze_builds(dockerfiles, cache)
+            for build in builds:
+                issues.extend(build.pop("issues"))
+            if cache is not None:
+                cache.save()
             
-            # Check Kubernetes files if they exist
-            k8s_issues = self._check_k8s_files(deployment_path)
-            issues.extend(k8s_issues)
+            found_files = [item for item in common_files if item in top_level]
+            missing_files = [item for item in common_files if item not in top_level]
             
-            return {
+            result = {
                 "found_files": found_files,
                 "missing_files": missing_files,
                 "issues_found": len(issues),
                 "issues": issues
             }
+            if builds:
+                result["dockerfiles"] = builds
+            if cache is not None:
+                result["cache"] = {"unchanged_files": cache.hits, "checked_files": cache.misses}
+            return result
         except Exception as e:
             return f"Error checking deployment: {str(e)}"
     
-    def _check_env_files(self, deployment_path):
-        """Check environment files for potential issues."""
-        issues = []
-        
-        # Look for .env files
-        for root, dirs, files in os.walk(deployment_path):
-            for file in files:
-                if file.startswith('.env') or file == '.env':
-                    env_path = os.path.join(root, file)
-                    try:
-                        with open(env_path, 'r') as f:
-                            lines = f.readlines()
-                        
-                        for line_num, line in enumerate(lines, 1):
-                            # Check for unquoted values with spaces
-                            if '=' in line and not line.strip().startswith('#'):
-                                key, value = line.split('=', 1)
-                                value = value.strip()
-                                if ' ' in value and not (value.startswith('"') and value.endswith('"')) and not (value.startswith("'") and value.endswith("'")):
-                                    issues.append({
-                                        "type": "Environment Variable Issue",
-                                        "file": env_path,
-                                        "line": line_num,
-                                        "description": f"Unquoted value with spaces: {line.strip()}"
-                                    })
-                                
-                                # Check for potential secrets
-                                secret_keywords = ['password', 'secret', 'key', 'token', 'api']
-                                if any(keyword in key.lower() for keyword in secret_keywords):
-                                    issues.append({
-                                        "type": "Potential Secret in File",
-                                        "file": env_path,
-                                        "line": line_num,
-                                        "description": f"Potential secret found: {key}"
-                                    })
-                    except Exception as e:
-                        issues.append({
-                            "type": "File Read Error",
-                            "file": env_path,
-                            "description": f"Could not read file: {str(e)}"
-                        })
-        
-        return issues
+    @staticmethod
+    def _is_env_file(rel_path, name):
+        return name.startswith('.env')
     
-    def _check_docker_files(self, deployment_path):
-        """Check Docker files for potential issues."""
-        issues = []
-        
-        # Look for Dockerfile
-        dockerfile_path = os.path.join(deployment_path, 'Dockerfile')
-        if os.path.exists(dockerfile_path):
-            try:
-                with open(dockerfile_path, 'r') as f:
-                    lines = f.readlines()
-                
-                for line_num, line in enumerate(lines, 1):
-                    line = line.strip().upper()
-                    # Check for latest tag
-                    if 'FROM ' in line and ':LATEST' in line:
-                        issues.append({
-                            "type": "Docker Best Practice",
-                            "file": dockerfile_path,
-                            "line": line_num,
-                            "description": "Using 'latest' tag is not recommended for production"
-                        })
-                    
-                    # Check for root user
-                    if 'USER ROOT' in line or (line.startswith('USER') and 'ROOT' in line):
-                        issues.append({
-                            "type": "Security Issue",
-                            "file": dockerfile_path,
-                            "line": line_num,
-                            "description": "Running container as root user is not recommended"
-                        })
-            except Exception as e:
-                issues.append({
-                    "type": "File Read Error",
-                    "file": dockerfile_path,
-                    "description": f"Could not read Dockerfile: {str(e)}"
-                })
-        
-        return issues
+    @staticmethod
+    def _is_dockerfile(rel_path, name):
+        return is_dockerfile_name(name)
     
-    def _check_k8s_files(self, deployment_path):
-        """Check Kubernetes files for potential issues."""
-        issues = []
-        
-        # Look for common k8s directories
-        k8s_paths = [
-            os.path.join(deployment_path, 'k8s'),
-            os.path.join(deployment_path, 'kubernetes'),
-            os.path.join(deployment_path, 'manifests')
-        ]
-        
-        for k8s_path in k8s_paths:
-            if os.path.exists(k8s_path):
-                for root, dirs, files in os.walk(k8s_path):
-                    for file in files:
-                        if file.endswith(('.yaml', '.yml')):
-                            file_path = os.path.join(root, file)
-                            try:
-                                with open(file_path, 'r') as f:
-                                    # Try to parse as YAML
-                                    content = yaml.safe_load(f)
-                                
-                                # Check for common k8s issues
-                                if isinstance(content, dict):
-                                    # Check for hardcoded secrets
-                                    issues.extend(self._check_k8s_secrets(file_path, content))
-                                    
-                                    # Check for resource limits
-                                    issues.extend(self._check_k8s_resources(file_path, content))
-                            except Exception as e:
-                                issues.append({
-                                    "type": "File Parse Error",
-                                    "file": file_path,
-                                    "description": f"Could not parse YAML file: {str(e)}"
-                                })
-        
-        return issues
+    @staticmethod
+    def _is_compose_file(rel_path, name):
+        return rel_path in COMPOSE_FILES
+    
+    @staticmethod
+    def _is_k8s_file(rel_path, name):
+        return rel_path.split('/', 1)[0] in K8S_DIRS and '/' in rel_path and name.endswith(('.yaml', '.yml'))
+    
+    def _check_env_file(self, env_path, rules):
+        """Check an environment file for potential issues."""
+        try:
+            with open(env_path, 'r') as f:
+                lines = f.readlines()
+        except Exception as e:
+            return [{
+                "type": "File Read Error",
+                "file": env_path,
+                "description": f"Could not read file: {str(e)}"
+            }]
+        return rules.check_env(env_path, lines)
+    
+    def _check_dockerfile(self, dockerfile_path, rules):
+        """Check a Dockerfile for potential issues."""
+        try:
+            dockerfile = Dockerfile.from_file(dockerfile_path)
+        except Exception as e:
+            return [{
+                "type": "File Read Error",
+                "file": dockerfile_path,
+                "description": f"Could not read Dockerfile: {str(e)}"
+            }]
+        instructions = [(instruction.line, instruction.keyword, dockerfile.resolved_arguments(instruction))
+                        for instruction in dockerfile.instructions]
+        issues = rules.check_dockerfile(dockerfile_path, instructions) + analyze_dockerfile(dockerfile)
+        return sorted(issues, key=lambda issue: issue.get("line", 0))
+    
+    def _analyze_builds(self, dockerfile_paths, cache=None):
+        """Summary and build-context findings per Dockerfile (context assumed to be its directory)."""
+        builds = []
+        contexts = {}
+        for dockerfile_path in dockerfile_paths:
+            try:
+                build = summarize(Dockerfile.from_file(dockerfile_path))
+            except OSError:
+                continue
+            directory = os.path.dirname(dockerfile_path)
+            # Dockerfiles sharing a directory and ignore file share a context
+            key = f"context:{directory}:{dockerignore_path(directory, dockerfile_path)}"
+            if key not in contexts:
+                context = cache.get_value(key) if cache is not None else None
+                if context is None or context_changed(context, dockerfile_path):
+                    context = build_context(directory, dockerfile_path)
+                    if cache is not None:
+                        cache.put_value(key, context)
+                contexts[key] = context
+            context = contexts[key]
+            build["context"] = {name: value for name, value in context.items() if name != "state"}
+            build["issues"] = context_issues(dockerfile_path, context)
+            builds.append(build)
+        return builds
     
-    def _check_k8s_secrets(self, file_path, content):
-        """Check Kubernetes files for hardcoded secrets."""
+    def _check_compose_file(self, compose_path, rules):
+        """Check the services of a Compose file."""
+        _, documents, error = load_manifest(compose_path)
+        if error is not None:
+            return [{
+                "type": "File Parse Error",
+                "file": compose_path,
+                "description": f"Could not parse YAML file: {error}"
+            }]
         issues = []
-        
-        def check_dict(d, path=""):
-            if isinstance(d, dict):
-                for key, value in d.items():
-                    current_path = f"{path}.{key}" if path else key
-                    
-                    # Check for secret-related keys
-                    secret_keywords = ['password', 'secret', 'key', 'token', 'api']
-                    if any(keyword in key.lower() for keyword in secret_keywords):
-                        if isinstance(value, str) and len(value) > 5:  # Likely a secret value
-                            issues.append({
-                                "type": "Hardcoded Secret",
-                                "file": file_path,
-                                "description": f"Possible hardcoded secret in {current_path}"
-                            })
-                    
-                    # Recursively check nested dictionaries
-                    if isinstance(value, dict):
-                        check_dict(value, current_path)
-                    elif isinstance(value, list):
-                        for i, item in enumerate(value):
-                            if isinstance(item, dict):
-                                check_dict(item, f"{current_path}[{i}]")
-        
-        check_dict(content)
+        for _, content in documents:
+            if isinstance(content, dict):
+                issues.extend(rules.check_compose(compose_path, content))
         return issues
     
-    def _check_k8s_resources(self, file_path, content):
-        """Check Kubernetes files for resource limits."""
-        issues = []
-        
-        def check_resources(obj, obj_type):
-            if isinstance(obj, dict) and 'spec' in obj:
-                spec = obj['spec']
-                if 'containers' in spec:
-                    for i, container in enumerate(spec['containers']):
-                        if 'resources' not in container:
-                            issues.append({
-                                "type": "Missing Resource Limits",
-                                "file": file_path,
-                                "description": f"{obj_type} container[{i}] ({container.get('name', 'unnamed')}) missing resource limits"
-                            })
-                        elif 'limits' not in container['resources']:
-                            issues.append({
-                                "type": "Missing Resource Limits",
-                                "file": file_path,
-                                "description": f"{obj_type} container[{i}] ({container.get('name', 'unnamed')}) missing resource limits"
-                            })
-        
-        # Check different Kubernetes object types
-        if isinstance(content, dict):
-            if content.get('kind') == 'Deployment':
-                check_resources(content, 'Deployment')
-            elif content.get('kind') == 'Pod':
-                check_resources(content, 'Pod')
-            elif content.get('kind') == 'StatefulSet':
-                check_resources(content, 'StatefulSet')
-            elif content.get('kind') == 'DaemonSet':
-                check_resources(content, 'DaemonSet')
-        
-        return issues
\ No newline at end of file
+    def _check_k8s_files(self, file_paths, rules):
+        """Check every document of the Kubernetes manifests; yields (file, issues) per manifest."""
+        for file_path, documents, error in load_manifests(file_paths):
+            issues = []
+            for index, content in documents:
+                if not isinstance(content, dict):
+                    continue
+                # Only the rules for this document's kind
+                found = rules.check_k8s(file_path, content)
+                
+                if len(documents) > 1:
+                    for issue in found:
+                        issue["document"] = index
+                issues.extend(found)
+            if error is not None:
+                issues.append({
+                    "type": "File Parse Error",
+                    "file": file_path,
+                    "description": f"Could not parse YAML file: {error}"
+                })
+            yield file_path, issues
@@ -0,0 +1,179 @@
+"""
+Diagnostic Bundle
+=================
+
+Captures a snapshot of the host into one zip archive, so the troubleshooting
+crew can reason about an incident after it is over.
+
+A capture collects every ``SystemMonitorTool`` metric in one shared pass
+(top processes and the connection summary included), sampler trends over the
+last minute, and the tail of each configured log. Zip members are compressed
+individually, so a reader seeks straight to the member it needs. Both the
+process profile and the log tails are bounded, which keeps a capture to a
+few seconds. A capture never waits for the sampler: it records whatever
+history exists, and ``learning`` in the manifest says whether the anomaly
+detector had its baseline yet. ``warmup_seconds`` opts into sampling for a
+while first.
+
+When ``CREW4AI_BUNDLE`` names a bundle, the System Monitor and Log Analyzer
+tools answer from it instead of the live host.
+"""
+import json
+import os
+import platform
+import socket
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+BUNDLE_ENV = "CREW4AI_BUNDLE"
+BUNDLE_VERSION = 1
+
+DEFAULT_TAIL_BYTES = 1024 * 1024
+DEFAULT_TOP_N = 25
+DEFAULT_TREND_SECONDS = 60
+DEFAULT_WARMUP_SECONDS = 0
+
+DEFAULT_LOGS = ("/var/log/syslog", "/var/log/messages", "/var/log/kern.log")
+
+
+def _tail(path: str, limit: int) -> bytes:
+    """The last ``limit`` bytes of a file, starting at a line boundary."""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - limit)
+        f.seek(start)
+        data = f.read(size - start)
+    if start:
+        newline = data.find(b"\n")
+        data = data[newline + 1:] if newline >= 0 else b""
+    return data
+
+
+def _member_name(path: str) -> str:
+    return "logs/" + os.path.abspath(path).lstrip("/")
+
+
+def _warm_up(seconds: float) -> float:
+    """Let the background sampler build a baseline; return the seconds waited."""
+    from tools.metrics_sampler import get_sampler
+
+    started = time.monotonic()
+    sampler = get_sampler()
+    detector = sampler.detector
+    deadline = started + seconds
+    while detector.samples < detector.warmup and time.monotonic() < deadline:
+        time.sleep(min(sampler.interval, max(0.0, deadline - time.monotonic())))
+    return time.monotonic() - started
+
+
+def capture_bundle(path: str, log_files: Sequence[str] = DEFAULT_LOGS,
+                   tail_bytes: int = DEFAULT_TAIL_BYTES, top_n: int = DEFAULT_TOP_N,
+                   warmup_seconds: float = DEFAULT_WARMUP_SECONDS) -> dict:
+    """Write a diagnostic bundle to ``path`` and return its manifest."""
+    # Imported here: the System Monitor Tool itself reads bundles
+    from tools.metrics_sampler import get_sampler
+    from tools.system_monitor import METRICS, SystemMonitorTool
+
+    warmed_up = _warm_up(warmup_seconds)
+    started = time.monotonic()
+    captured_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    metrics = SystemMonitorTool()._snapshot_many(
+        list(METRICS), {"top_n": top_n, "window_seconds": DEFAULT_TREND_SECONDS})
+    if isinstance(metrics, str):
+        raise RuntimeError(metrics)
+    detector = get_sampler().detector
+
+    logs, skipped = {}, {}
+    for log_file in log_files:
+        try:
+            logs[os.path.abspath(log_file)] = _tail(log_file, tail_bytes)
+        except OSError as e:
+            skipped[log_file] = str(e)
+
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "captured_at": captured_at,
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "metrics": [metric for metric in METRICS if metric in metrics],
+        "logs": {log_file: {"member": _member_name(log_file), "bytes": len(data)}
+                 for log_file, data in logs.items()},
+        "skipped_logs": skipped,
+        "tail_bytes": tail_bytes,
+        "warmup_seconds": round(warmed_up, 1),
+        "samples": detector.samples,
+        # Too few samples for the anomaly baseline; trends cover a short span
+        "learning": detector.samples < detector.warmup
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".bundle.")
+    try:
+        with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr("metrics.json", json.dumps(metrics, default=str))
+            for log_file, data in logs.items():
+                bundle.writestr(_member_name(log_file), data)
+            manifest["capture_seconds"] = round(time.monotonic() - started, 3)
+            # Written last, so its presence marks a complete bundle
+            bundle.writestr("manifest.json", json.dumps(manifest, indent=2))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return manifest
+
+
+class DiagnosticBundle:
+    """Read access to a captured bundle."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.manifest = json.loads(self._zip.read("manifest.json"))
+        self._metrics: Optional[dict] = None
+        self._extracted: Dict[str, str] = {}
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self) -> dict:
+        if self._metrics is None:
+            self._metrics = json.loads(self._zip.read("metrics.json"))
+        return self._metrics
+
+    def metric(self, metric: str):
+        """A metric's section as captured (``None`` if it was not captured)."""
+        return self.metrics.get(metric)
+
+    def log_files(self) -> List[str]:
+        return sorted(self.manifest["logs"])
+
+    def log_path(self, log_file: str) -> Optional[str]:
+        """Local path of the captured tail of ``log_file`` (extracted on first use)."""
+        log_file = os.path.abspath(log_file)
+        entry = self.manifest["logs"].get(log_file)
+        if entry is None:
+            return None
+        with self._lock:
+            if log_file not in self._extracted:
+                if self._tmpdir is None:
+                    self._tmpdir = tempfile.TemporaryDirectory(prefix="crew4ai-bundle-")
+                self._extracted[log_file] = self._zip.extract(entry["member"], self._tmpdir.name)
+            return self._extracted[log_file]
+
+
+_bundles: Dict[str, DiagnosticBundle] = {}
+_bundles_lock = threading.Lock()
+
+
+def active_bundle() -> Optional[DiagnosticBundle]:
+    """The bundle named by ``CREW4AI_BUNDLE``, or ``None`` when tools run live."""
+    path = os.environ.get(BUNDLE_ENV)
+    if not path:
+        return None
+    with _bundles_lock:
+        if path not in _bundles:
+            _bundles[path] = DiagnosticBundle(path)
+        return _bundles[path]
@@ -0,0 +1,270 @@
+"""
+Docker Build Analysis
+=====================
+
+Build-performance checks on parsed Dockerfiles for the Deployment Checker
+Tool, aimed at slow CI image builds:
+
+- cache-busting order: the whole build context copied before dependencies
+  are installed, so every source change re-runs the install
+- package-manager caches (apt lists, pip, apk, yum/dnf) left in the layers
+  of the final image, and ``apt-get update`` cached apart from its install
+- runs of ``RUN`` instructions that each add a layer
+- a build context without ``.dockerignore`` that is large or carries
+  ``.git``/``node_modules``; the context is what every build uploads first
+
+Package caches only count in the final image's stages (a builder stage's
+leftovers never ship); cache-busting counts in every stage. The context is
+estimated with one bounded ``os.scandir`` walk honouring ``.dockerignore``.
+The walk records the mtime of every directory it lists, so a later run can
+reuse the estimate after one ``stat`` per directory (``context_changed``):
+files being added, removed or renamed anywhere in the context, or the ignore
+file changing, trigger a new walk. A file growing in place leaves its
+directory alone, so an estimate is also redone once it is
+``CONTEXT_MAX_AGE_NS`` old; ``estimated_at`` in the report says when it was
+taken.
+"""
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from tools.dockerfile_parser import Dockerfile, Instruction, Stage
+from tools.findings_cache import RACY_WINDOW_NS
+from tools.tree_walker import DEFAULT_SKIP_DIRS, IgnoreRules
+
+# A context this large is worth a .dockerignore even without heavy directories
+LARGE_CONTEXT_BYTES = 100 * 1000 * 1000
+# Upper bound on the entries the context walk visits
+MAX_CONTEXT_ENTRIES = 200000
+# Age after which a context estimate is redone even if no directory changed
+CONTEXT_MAX_AGE_NS = 24 * 3600 * 10**9
+# This many RUN instructions in a row are reported as mergeable
+MIN_MERGEABLE_RUNS = 3
+
+# Context directories that are never needed in an image
+HEAVY_DIRS = DEFAULT_SKIP_DIRS - {".idea", ".mypy_cache", ".pytest_cache", ".ruff_cache"}
+
+DEPENDENCY_INSTALL = re.compile(
+    r"\b(?:(?:pip3?|python3? -m pip) install|poetry install|pipenv (?:install|sync)|uv (?:pip install|sync)"
+    r"|npm (?:ci|install|i)\b|yarn(?: install)?(?:\s|$)|pnpm (?:i|install)\b|bundle install|go mod download"
+    r"|cargo (?:build|fetch)|mvn |gradle |composer install|dotnet restore)")
+WHOLE_CONTEXT = frozenset({".", "./", "*", "./*", "./."})
+
+APT_INSTALL = re.compile(r"\bapt(?:-get)? (?:-\S+ )*install\b")
+APT_UPDATE = re.compile(r"\bapt(?:-get)? (?:-\S+ )*update\b")
+APT_CLEANUP = re.compile(r"rm -r?f?r?f? /var/lib/apt/lists")
+PIP_INSTALL = re.compile(r"\b(?:pip3?|python3? -m pip) install\b")
+APK_ADD = re.compile(r"\bapk (?:-\S+ )*add\b")
+YUM_INSTALL = re.compile(r"\b(?:yum|dnf|microdnf) (?:-\S+ )*install\b")
+YUM_CLEANUP = re.compile(r"\b(?:yum|dnf|microdnf) clean all\b|rm -r?f?r?f? /var/cache/(?:yum|dnf)")
+
+
+def _issue(path: str, rule: str, description: str, line: Optional[int] = None) -> dict:
+    issue = {"type": "Docker Build Performance", "file": path}
+    if line is not None:
+        issue["line"] = line
+    issue["description"] = description
+    issue["rule"] = rule
+    return issue
+
+
+def _cache_mounts(instruction: Instruction) -> str:
+    """Targets of ``--mount=type=cache`` options, joined."""
+    return " ".join(mount for mount in instruction.flags.get("mount", []) if "type=cache" in mount)
+
+
+def _cache_busting(dockerfile: Dockerfile, stage: Stage, issues: List[dict]):
+    copied = None
+    for chained in stage.chain():
+        for instruction in chained.instructions:
+            if (instruction.keyword in ("COPY", "ADD") and "from" not in instruction.flags
+                    and copied is None and WHOLE_CONTEXT & set(instruction.sources())):
+                copied = instruction
+            elif (instruction.keyword == "RUN" and copied is not None and chained is stage
+                  and DEPENDENCY_INSTALL.search(instruction.script)):
+                install = DEPENDENCY_INSTALL.search(instruction.script).group(0).strip()
+                issues.append(_issue(
+                    dockerfile.path, "build-copy-before-install",
+                    f"{copied.keyword} {copied.arguments} (line {copied.line}) comes before '{install}' in stage "
+                    f"{stage.label}: every source change re-runs the install. Copy the dependency manifests "
+                    f"and install first, then copy the rest", instruction.line))
+                return
+
+
+def _package_caches(dockerfile: Dockerfile, stage: Stage, issues: List[dict]):
+    # pip turns its cache off for any PIP_NO_CACHE_DIR value
+    pip_cache_off = "PIP_NO_CACHE_DIR" in stage.environment()
+    for instruction in stage.instructions:
+        if instruction.keyword != "RUN":
+            continue
+        script, mounts = instruction.script, _cache_mounts(instruction)
+        if APT_INSTALL.search(script) and not APT_CLEANUP.search(script) and "/var/lib/apt" not in mounts:
+            issues.append(_issue(dockerfile.path, "build-apt-lists",
+                                 "apt package lists are left in the layer; end the RUN with "
+                                 "'rm -rf /var/lib/apt/lists/*'", instruction.line))
+        if APT_UPDATE.search(script) and not APT_INSTALL.search(script):
+            issues.append(_issue(dockerfile.path, "build-apt-update-split",
+                                 "'apt-get update' in its own RUN is cached apart from the install, which then "
+                                 "uses a stale package index; run update and install in the same RUN",
+                                 instruction.line))
+        if (PIP_INSTALL.search(script) and "--no-cache-dir" not in script and not pip_cache_off
+                and "/root/.cache" not in mounts):
+            issues.append(_issue(dockerfile.path, "build-pip-cache",
+                                 "pip's download cache is left in the layer; use 'pip install --no-cache-dir' "
+                                 "or a cache mount", instruction.line))
+        if APK_ADD.search(script) and "--no-cache" not in script and "/var/cache/apk" not in script + mounts:
+            issues.append(_issue(dockerfile.path, "build-apk-cache",
+                                 "apk's index cache is left in the layer; use 'apk add --no-cache'",
+                                 instruction.line))
+        if YUM_INSTALL.search(script) and not YUM_CLEANUP.search(script) and "/var/cache" not in mounts:
+            issues.append(_issue(dockerfile.path, "build-yum-cache",
+                                 "yum/dnf metadata is left in the layer; end the RUN with 'yum clean all'",
+                                 instruction.line))
+
+
+def _mergeable_runs(dockerfile: Dockerfile, stage: Stage, issues: List[dict]):
+    run: List[Instruction] = []
+    for instruction in stage.instructions + [None]:
+        if instruction is not None and instruction.keyword == "RUN":
+            run.append(instruction)
+            continue
+        if len(run) >= MIN_MERGEABLE_RUNS:
+            issues.append(_issue(dockerfile.path, "build-consecutive-runs",
+                                 f"{len(run)} consecutive RUN instructions (lines {run[0].line}-{run[-1].end_line}) "
+                                 f"each add a layer; combine them", run[0].line))
+        run = []
+
+
+def analyze_dockerfile(dockerfile: Dockerfile) -> List[dict]:
+    """Build-performance findings of one Dockerfile (its build context aside)."""
+    issues: List[dict] = []
+    final = dockerfile.final_stage
+    if final is None:
+        return issues
+    shipped = {id(stage) for stage in final.chain()}
+    for stage in dockerfile.stages:
+        _cache_busting(dockerfile, stage, issues)
+        if id(stage) in shipped:
+            _package_caches(dockerfile, stage, issues)
+            _mergeable_runs(dockerfile, stage, issues)
+    return issues
+
+
+def summarize(dockerfile: Dockerfile) -> dict:
+    final = dockerfile.final_stage
+    return {
+        "file": dockerfile.path,
+        "stages": [stage.label for stage in dockerfile.stages],
+        "base_images": dockerfile.base_images(),
+        "layers": final.layers() if final is not None else 0,
+        "instructions": len(dockerfile.instructions)
+    }
+
+
+def dockerignore_path(directory: str, dockerfile_path: str) -> Optional[str]:
+    """The ignore file a build of ``dockerfile_path`` in ``directory`` uses (BuildKit's per-Dockerfile one first)."""
+    for candidate in (dockerfile_path + ".dockerignore", os.path.join(directory, ".dockerignore")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _mtime_ns(path: Optional[str]) -> Optional[int]:
+    if path is None:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def build_context(directory: str, dockerfile_path: str, max_entries: int = MAX_CONTEXT_ENTRIES) -> dict:
+    """Estimated size of the build context ``directory``, as sent to the builder.
+
+    ``state`` holds what ``context_changed`` needs and is not part of the report.
+    """
+    checked_ns = time.time_ns()
+    ignore_file = dockerignore_path(directory, dockerfile_path)
+    rules = IgnoreRules.from_file(ignore_file, always_anchored=True) if ignore_file else None
+    files = size = entries = 0
+    heavy = set()
+    truncated = False
+    # rel_dir -> mtime of every directory listed
+    directories = {}
+    stack = [(directory, "")]
+    while stack and not truncated:
+        path, rel_dir = stack.pop()
+        try:
+            # Before listing, so that a change during the listing shows later
+            directories[rel_dir] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    entries += 1
+                    if entries > max_entries:
+                        truncated = True
+                        break
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if rules is not None and rules.match(rel_path, is_dir):
+                            continue
+                        if is_dir:
+                            if entry.name in HEAVY_DIRS:
+                                heavy.add(entry.name)
+                            stack.append((entry.path, rel_path))
+                        else:
+                            files += 1
+                            size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return {
+        "directory": directory,
+        "dockerignore": ignore_file,
+        "files": files,
+        "bytes": size,
+        "heavy_dirs": sorted(heavy),
+        "truncated": truncated,
+        "estimated_at": datetime.fromtimestamp(checked_ns / 1e9, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "state": {
+            "checked_ns": checked_ns,
+            "dockerignore_mtime_ns": _mtime_ns(ignore_file),
+            "directories": directories
+        }
+    }
+
+
+def context_changed(context: dict, dockerfile_path: str) -> bool:
+    """True if a context estimated by ``build_context`` may be out of date."""
+    state = context.get("state")
+    directory = context["directory"]
+    ignore_file = dockerignore_path(directory, dockerfile_path)
+    if (state is None or ignore_file != context["dockerignore"]
+            or _mtime_ns(ignore_file) != state["dockerignore_mtime_ns"]
+            or time.time_ns() - state["checked_ns"] > CONTEXT_MAX_AGE_NS):
+        return True
+    for rel_dir, mtime_ns in state["directories"].items():
+        # As for cached findings, a change in the same mtime tick as the walk is not trusted
+        if (_mtime_ns(os.path.join(directory, rel_dir) if rel_dir else directory) != mtime_ns
+                or state["checked_ns"] - mtime_ns < RACY_WINDOW_NS):
+            return True
+    return False
+
+
+def context_issues(dockerfile_path: str, context: dict) -> List[dict]:
+    """Findings on the build context estimated by ``build_context``."""
+    size = f"{'over ' if context['truncated'] else ''}{context['bytes'] / 1e6:.1f} MB ({context['files']} files)"
+    heavy = f", including {', '.join(context['heavy_dirs'])}" if context["heavy_dirs"] else ""
+    if context["dockerignore"] is None:
+        if not heavy and context["bytes"] < LARGE_CONTEXT_BYTES:
+            return []
+        return [_issue(dockerfile_path, "build-no-dockerignore",
+                       f"No .dockerignore: every build sends {context['directory']} to the builder, {size}{heavy}")]
+    if not heavy:
+        return []
+    return [_issue(dockerfile_path, "build-large-context",
+                   f"The build context of {context['directory']} is {size}{heavy}, despite "
+                   f"{os.path.basename(context['dockerignore'])}")]
@@ -0,0 +1,281 @@
+"""
+Dockerfile Parser
+=================
+
+Parses Dockerfiles into stages and instructions for the Deployment Checker
+Tool, following the BuildKit frontend's rules closely enough for static
+checks:
+
+- the ``# escape=`` parser directive and line continuations, with comment
+  and blank lines inside a continuation dropped
+- heredocs (``RUN <<EOF``, ``<<-EOF``, quoted delimiters, several per
+  instruction)
+- leading ``--flag=value`` options (``--from``, ``--mount``, ``--platform``)
+- multi-stage builds: ``FROM ... AS name``, ``FROM <earlier stage>`` and
+  ``COPY --from=<stage>``
+- ``ARG`` and ``ENV`` substitution (``$VAR``, ``${VAR}``, ``${VAR:-default}``,
+  ``${VAR:+value}``); global ``ARG``\\ s (before the first ``FROM``) apply to
+  ``FROM`` lines only, as in Docker
+"""
+import json
+import re
+import shlex
+from typing import Dict, List, Optional, Tuple
+
+# Instructions that add a filesystem layer to the image
+LAYER_INSTRUCTIONS = frozenset({"RUN", "COPY", "ADD"})
+
+_DIRECTIVE = re.compile(r"^#\s*([a-zA-Z][a-zA-Z0-9]*)\s*=\s*(.+?)\s*$")
+_HEREDOC = re.compile(r"<<(-?)([\"']?)([A-Za-z_][A-Za-z0-9_]*)\2")
+_VARIABLE = re.compile(r"\$(?:\{([A-Za-z_][A-Za-z0-9_]*)(?::([-+])([^}]*))?\}|([A-Za-z_][A-Za-z0-9_]*))")
+_FLAG = re.compile(r"--([a-z][a-z-]*)(?:=(\S*))?$")
+
+
+def substitute(text: str, variables: Dict[str, str]) -> str:
+    """``text`` with ``$VAR`` references replaced; unknown variables become empty, as in Docker."""
+    def replace(match):
+        name = match.group(1) or match.group(4)
+        value = variables.get(name)
+        if match.group(2) == "-":
+            return value if value else match.group(3)
+        if match.group(2) == "+":
+            return match.group(3) if value else ""
+        return value or ""
+    return _VARIABLE.sub(replace, text)
+
+
+def _split_flags(arguments: str) -> Tuple[Dict[str, List[str]], str]:
+    """Leading ``--name=value`` options and the rest of the arguments."""
+    flags: Dict[str, List[str]] = {}
+    rest = arguments
+    while rest.startswith("--"):
+        token, _, remainder = rest.partition(" ")
+        match = _FLAG.match(token)
+        if match is None:
+            break
+        flags.setdefault(match.group(1), []).append(match.group(2) or "")
+        rest = remainder.lstrip()
+    return flags, rest
+
+
+class Instruction:
+    """One (logical) instruction."""
+
+    def __init__(self, line: int, end_line: int, keyword: str, arguments: str, heredocs: List[Tuple[str, str]]):
+        self.line = line
+        self.end_line = end_line
+        self.keyword = keyword
+        self.flags, self.arguments = _split_flags(arguments)
+        # [(delimiter, body)]
+        self.heredocs = heredocs
+        self.stage: Optional["Stage"] = None
+
+    @property
+    def creates_layer(self) -> bool:
+        return self.keyword in LAYER_INSTRUCTIONS
+
+    @property
+    def script(self) -> str:
+        """The shell text a ``RUN`` executes, heredoc bodies included."""
+        return "\n".join([self.arguments] + [body for _, body in self.heredocs])
+
+    def sources(self) -> List[str]:
+        """Source paths of a ``COPY``/``ADD`` (everything but the destination)."""
+        if self.heredocs:
+            return []
+        text = self.arguments.strip()
+        if text.startswith("["):
+            try:
+                parts = json.loads(text)
+            except ValueError:
+                parts = []
+        else:
+            try:
+                parts = shlex.split(text)
+            except ValueError:
+                parts = text.split()
+        return parts[:-1]
+
+    def __repr__(self):
+        return f"Instruction({self.line}, {self.keyword} {self.arguments[:40]!r})"
+
+
+class Stage:
+    """A build stage: one ``FROM`` and the instructions up to the next."""
+
+    def __init__(self, index: int, image: str, name: Optional[str], base_stage: Optional["Stage"],
+                 instruction: Instruction):
+        self.index = index
+        self.image = image
+        self.name = name
+        self.base_stage = base_stage
+        self.instructions: List[Instruction] = [instruction]
+        self.args: Dict[str, str] = {}
+        self.env: Dict[str, str] = {}
+
+    @property
+    def label(self) -> str:
+        return self.name or str(self.index)
+
+    def chain(self) -> List["Stage"]:
+        """This stage and the stages it is built ``FROM``, base first."""
+        stages = []
+        stage = self
+        while stage is not None:
+            stages.append(stage)
+            stage = stage.base_stage
+        return stages[::-1]
+
+    def environment(self) -> Dict[str, str]:
+        """``ENV`` values in effect at the end of the stage (inherited from stage bases)."""
+        env: Dict[str, str] = {}
+        for stage in self.chain():
+            env.update(stage.env)
+        return env
+
+    def layers(self) -> int:
+        """Layers the stage adds on top of its base image (stage bases included)."""
+        return sum(1 for stage in self.chain() for instruction in stage.instructions if instruction.creates_layer)
+
+
+class Dockerfile:
+    """A parsed Dockerfile."""
+
+    def __init__(self, path: str, instructions: List[Instruction], escape: str):
+        self.path = path
+        self.instructions = instructions
+        self.escape = escape
+        self.global_args: Dict[str, str] = {}
+        self.stages: List[Stage] = []
+        self._build_stages()
+
+    @classmethod
+    def parse(cls, text: str, path: str = "Dockerfile") -> "Dockerfile":
+        lines = text.splitlines()
+        escape = "\\"
+        # Parser directives: only at the very top, before anything else
+        for line in lines:
+            match = _DIRECTIVE.match(line.strip())
+            if match is None:
+                break
+            if match.group(1).lower() == "escape" and match.group(2) in ("\\", "`"):
+                escape = match.group(2)
+        instructions = []
+        i = 0
+        while i < len(lines):
+            stripped = lines[i].strip()
+            if not stripped or stripped.startswith("#"):
+                i += 1
+                continue
+            start = i
+            parts = []
+            line = lines[i].rstrip()
+            while line.endswith(escape) and i + 1 < len(lines):
+                parts.append(line[:-1])
+                i += 1
+                # Comment and blank lines do not end a continuation
+                while i + 1 < len(lines) and (not lines[i].strip() or lines[i].lstrip().startswith("#")):
+                    i += 1
+                line = lines[i].rstrip()
+            parts.append(line[:-1] if line.endswith(escape) else line)
+            logical = " ".join(part.strip() for part in parts).strip()
+            keyword, _, arguments = logical.partition(" ")
+            keyword = keyword.upper()
+            heredocs = []
+            if keyword in ("RUN", "COPY", "ADD"):
+                for match in _HEREDOC.finditer(arguments):
+                    strip_tabs, delimiter = match.group(1) == "-", match.group(3)
+                    body = []
+                    while i + 1 < len(lines):
+                        i += 1
+                        content = lines[i].lstrip("\t") if strip_tabs else lines[i]
+                        if content.rstrip() == delimiter:
+                            break
+                        body.append(content)
+                    heredocs.append((delimiter, "\n".join(body)))
+            instructions.append(Instruction(start + 1, i + 1, keyword, arguments.strip(), heredocs))
+            i += 1
+        return cls(path, instructions, escape)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Dockerfile":
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return cls.parse(f.read(), path)
+
+    def _build_stages(self):
+        stage = None
+        for instruction in self.instructions:
+            if instruction.keyword == "FROM":
+                stage = self._add_stage(instruction)
+            elif stage is None:
+                if instruction.keyword == "ARG":
+                    self.global_args.update(self._declared(instruction, self.global_args))
+                continue
+            elif instruction.keyword == "ARG":
+                for name, value in self._declared(instruction, {**stage.args, **stage.env}).items():
+                    # A bare ARG re-declares a global ARG's default in the stage
+                    stage.args[name] = value if value else self.global_args.get(name, "")
+            elif instruction.keyword == "ENV":
+                stage.env.update(self._declared(instruction, {**stage.args, **stage.env}))
+            if stage is not None and instruction.keyword != "FROM":
+                instruction.stage = stage
+                stage.instructions.append(instruction)
+
+    @staticmethod
+    def _declared(instruction: Instruction, variables: Dict[str, str]) -> Dict[str, str]:
+        """``NAME=value`` pairs of an ``ARG``/``ENV`` (legacy ``ENV NAME value`` included)."""
+        text = instruction.arguments
+        try:
+            tokens = shlex.split(text)
+        except ValueError:
+            tokens = text.split()
+        if instruction.keyword == "ENV" and tokens and "=" not in tokens[0]:
+            return {tokens[0]: substitute(" ".join(tokens[1:]), variables)}
+        declared = {}
+        for token in tokens:
+            name, _, value = token.partition("=")
+            declared[name] = substitute(value, variables)
+        return declared
+
+    def _add_stage(self, instruction: Instruction) -> Stage:
+        tokens = instruction.arguments.split()
+        image = substitute(tokens[0], self.global_args) if tokens else ""
+        name = tokens[2].lower() if len(tokens) >= 3 and tokens[1].upper() == "AS" else None
+        base = self.stage(image)
+        stage = Stage(len(self.stages), image, name, base, instruction)
+        instruction.stage = stage
+        self.stages.append(stage)
+        return stage
+
+    def stage(self, reference: str) -> Optional[Stage]:
+        """The stage a ``FROM``/``--from`` reference names (by name or index), if any."""
+        reference = reference.lower()
+        for stage in self.stages:
+            if stage.name == reference or str(stage.index) == reference:
+                return stage
+        return None
+
+    @property
+    def final_stage(self) -> Optional[Stage]:
+        return self.stages[-1] if self.stages else None
+
+    def base_images(self) -> List[str]:
+        """External images the build starts from (stage references excluded)."""
+        return [stage.image for stage in self.stages if stage.base_stage is None]
+
+    def resolved_arguments(self, instruction: Instruction) -> str:
+        """Arguments with variables substituted where Docker would substitute them."""
+        if instruction.keyword == "FROM":
+            return substitute(instruction.arguments, self.global_args)
+        stage = instruction.stage
+        if stage is None or instruction.keyword == "RUN":
+            # RUN is expanded by the shell at build time
+            return instruction.arguments
+        return substitute(instruction.arguments, {**stage.args, **stage.env})
+
+
+def is_dockerfile_name(name: str) -> bool:
+    """``Dockerfile``, ``Dockerfile.prod``, ``api.Dockerfile`` and ``Containerfile``."""
+    lowered = name.lower()
+    return (lowered in ("dockerfile", "containerfile") or lowered.startswith("dockerfile.")
+            or lowered.endswith(".dockerfile"))
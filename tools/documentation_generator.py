@@ -8,6 +8,7 @@ import os
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from crewai_tools import BaseTool
+from tools.tool_metrics import instrumented
 
 class DocumentationGeneratorToolSchema(BaseModel):
     """Input for DocumentationGeneratorTool."""
@@ -19,6 +20,7 @@ class DocumentationGeneratorTool(BaseTool):
     description: str = "Generates project documentation of various types."
     args_schema: Type[BaseModel] = DocumentationGeneratorToolSchema
 
+    @instrumented
     def _run(self, **kwargs: Any) -> Any:
         project_path = kwargs.get('project_path')
         doc_type = kwargs.get('doc_type', 'README')
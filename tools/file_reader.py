@@ -8,6 +8,7 @@ import os
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from crewai_tools import BaseTool
+from tools.tool_metrics import instrumented
 
 class FileReaderToolSchema(BaseModel):
     """Input for FileReaderTool."""
@@ -18,6 +19,7 @@ class FileReaderTool(BaseTool):
     description: str = "Reads and analyzes code files for review purposes."
     args_schema: Type[BaseModel] = FileReaderToolSchema
 
+    @instrumented
     def _run(self, **kwargs: Any) -> Any:
         file_path = kwargs.get('file_path')
         if not file_path:
@@ -0,0 +1,157 @@
+"""
+Findings Cache
+==============
+
+Persistent per-file cache of Deployment Checker Tool findings.
+
+An entry is reused when the file's size and mtime are unchanged, which costs
+one ``stat``. When the mtime moved but the size did not (a ``touch``, a
+checkout that rewrote identical content), the content hash decides. As in
+git's racy-clean check, a file modified within a second of being checked is
+always hashed, since a same-size edit in the same mtime tick would otherwise
+go unnoticed. The whole cache is dropped when the rule-set fingerprint
+changes.
+
+Results that are not per file (build-context estimates) are kept under their
+own keys with ``get_value``/``put_value``; validating them is up to the caller.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "crew4ai", "deploy_findings")
+
+# Modifications closer than this to the check time are not trusted by mtime alone
+RACY_WINDOW_NS = 1_000_000_000
+
+
+def default_cache_file(root: str) -> str:
+    """One cache file per checked tree."""
+    key = hashlib.sha1(os.path.realpath(root).encode()).hexdigest()[:16]
+    return os.path.join(DEFAULT_CACHE_DIR, f"{key}.json")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def rules_fingerprint(version: int, sources: Iterable[str], options: Iterable[str] = ()) -> str:
+    """Fingerprint of a rule set: its declared version, the code implementing it
+    and the options that change which checks run."""
+    digest = hashlib.sha256(str(version).encode())
+    for option in options:
+        digest.update(b"\0" + option.encode())
+    for source in sources:
+        try:
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(source.encode())
+    return digest.hexdigest()[:16]
+
+
+class FindingsCache:
+    """``{path: (size, mtime, hash, findings)}`` for one tree and rule set."""
+
+    def __init__(self, cache_file: str, fingerprint: str):
+        self.cache_file = cache_file
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, dict] = {}
+        self._values: Dict[str, Any] = {}
+        self._load()
+        self._seen = set()
+        self._seen_values = set()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (not isinstance(state, dict) or state.get("version") != CACHE_VERSION
+                or state.get("rules") != self.fingerprint):
+            return
+        self._entries = state.get("files", {})
+        self._values = state.get("values", {})
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[List[dict]]:
+        """Cached findings of ``path`` if its content is unchanged."""
+        self._seen.add(path)
+        entry = self._entries.get(path)
+        if entry is None or entry["size"] != stat.st_size:
+            self.misses += 1
+            return None
+        if entry["mtime_ns"] != stat.st_mtime_ns or entry["checked_ns"] - stat.st_mtime_ns < RACY_WINDOW_NS:
+            try:
+                unchanged = file_digest(path) == entry["sha256"]
+            except OSError:
+                unchanged = False
+            if not unchanged:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["checked_ns"] = time.time_ns()
+            self._dirty = True
+        self.hits += 1
+        return entry["findings"]
+
+    def put(self, path: str, stat: os.stat_result, findings: List[dict], digest: Optional[str] = None):
+        """Record ``findings``; ``digest`` is the content hash if the caller already has it."""
+        if digest is None:
+            try:
+                digest = file_digest(path)
+            except OSError:
+                return
+        self._seen.add(path)
+        self._entries[path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "checked_ns": time.time_ns(),
+            "sha256": digest,
+            "findings": findings
+        }
+        self._dirty = True
+
+    def get_value(self, key: str) -> Any:
+        """A value stored with ``put_value`` (``None`` if there is none)."""
+        self._seen_values.add(key)
+        return self._values.get(key)
+
+    def put_value(self, key: str, value: Any):
+        self._seen_values.add(key)
+        self._values[key] = value
+        self._dirty = True
+
+    def save(self):
+        """Write the cache atomically, dropping files and values not used this run."""
+        stale = set(self._entries) - self._seen
+        stale_values = set(self._values) - self._seen_values
+        if not self._dirty and not stale and not stale_values:
+            return
+        for path in stale:
+            del self._entries[path]
+        for key in stale_values:
+            del self._values[key]
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".findings.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_VERSION, "rules": self.fingerprint, "files": self._entries,
+                           "values": self._values}, f)
+            os.replace(tmp_path, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._dirty = False
@@ -0,0 +1,132 @@
+"""
+Log Aggregation
+===============
+
+Constant-memory aggregation of matched log lines.
+
+``SampleStats`` keeps a count, the first/last line numbers seen, and a fixed
+number of sample lines: the first N, the last N and a uniform reservoir sample
+of everything in between. Stats for consecutive sections of a log (parallel
+chunks, incremental scans) can be merged without losing the sampling
+guarantees.
+"""
+import heapq
+import random
+from collections import deque
+from typing import List, Optional
+
+# Long lines are cut so that one pathological line cannot pin megabytes.
+MAX_CONTENT_LENGTH = 1000
+
+
+def clip_content(line: str) -> str:
+    content = line.strip()
+    if len(content) > MAX_CONTENT_LENGTH:
+        content = content[:MAX_CONTENT_LENGTH] + "..."
+    return content
+
+
+class SampleStats:
+    """Count, first/last-seen line numbers and bounded samples for one stream."""
+
+    def __init__(self, first_n: int = 20, last_n: int = 20, reservoir_n: int = 10,
+                 seed: Optional[int] = None):
+        self.first_n = first_n
+        self.last_n = last_n
+        self.reservoir_n = reservoir_n
+        self.count = 0
+        self.first_seen_line: Optional[int] = None
+        self.last_seen_line: Optional[int] = None
+        self.first: List[dict] = []
+        self.last: deque = deque(maxlen=last_n)
+        self.reservoir: List[dict] = []
+        self._rng = random.Random(seed)
+
+    def add(self, item: dict):
+        """Record one item; ``item["line_number"]`` must be increasing."""
+        self.count += 1
+        line_number = item["line_number"]
+        if self.first_seen_line is None:
+            self.first_seen_line = line_number
+        self.last_seen_line = line_number
+
+        if len(self.first) < self.first_n:
+            self.first.append(item)
+            return
+        if self.last_n:
+            self.last.append(item)
+        # Reservoir sampling (algorithm R) over the items past the first N.
+        seen = self.count - self.first_n
+        if len(self.reservoir) < self.reservoir_n:
+            self.reservoir.append(item)
+        else:
+            slot = self._rng.randrange(seen)
+            if slot < self.reservoir_n:
+                self.reservoir[slot] = item
+
+    def merge(self, other: "SampleStats", line_offset: int = 0):
+        """Append the stats of the section that follows this one.
+
+        ``other``'s line numbers are shifted by ``line_offset``.
+        """
+        if not other.count:
+            return
+
+        def shift(item):
+            return dict(item, line_number=item["line_number"] + line_offset)
+
+        # Move the other section's samples into this section's numbering.
+        ordered = [shift(item) for item in other.first]
+        tail = [shift(item) for item in other.last]
+        middle = [shift(item) for item in other.reservoir]
+        other_rest = other.count - len(other.first)
+
+        mine_rest = max(0, self.count - len(self.first))
+        self.count += other.count
+        if self.first_seen_line is None:
+            self.first_seen_line = other.first_seen_line + line_offset
+        self.last_seen_line = other.last_seen_line + line_offset
+
+        # Items from other.first that still fit in our first N stay exact;
+        # the rest join the population the reservoir is drawn from.
+        room = max(0, self.first_n - len(self.first))
+        self.first.extend(ordered[:room])
+        spill = ordered[room:]
+
+        # The last N are the last items of the combined stream.
+        if self.last_n:
+            self.last.extend(spill)
+            self.last.extend(tail)
+
+        # Weighted merge of the two reservoirs (Efraimidis-Spirakis): each
+        # sampled item stands for rest / len(sample) lines of its section,
+        # spilled first-N items stand for themselves.
+        candidates = []
+        for sample, rest in ((self.reservoir, mine_rest), (middle, other_rest), (spill, len(spill))):
+            if sample:
+                weight = max(rest, len(sample)) / len(sample)
+                candidates.extend((self._rng.random() ** (1.0 / weight), item) for item in sample)
+        chosen = heapq.nlargest(self.reservoir_n, candidates, key=lambda pair: pair[0])
+        self.reservoir = sorted((item for _, item in chosen), key=lambda item: item["line_number"])
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "first_seen_line": self.first_seen_line,
+            "last_seen_line": self.last_seen_line,
+            "first": list(self.first),
+            "last": list(self.last),
+            "sample": sorted(self.reservoir, key=lambda item: item["line_number"])
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, first_n: int = 20, last_n: int = 20,
+                  reservoir_n: int = 10) -> "SampleStats":
+        stats = cls(first_n, last_n, reservoir_n)
+        stats.count = data.get("count", 0)
+        stats.first_seen_line = data.get("first_seen_line")
+        stats.last_seen_line = data.get("last_seen_line")
+        stats.first = list(data.get("first", []))[:first_n]
+        stats.last.extend(data.get("last", []))
+        stats.reservoir = list(data.get("sample", []))[:reservoir_n]
+        return stats
@@ -4,72 +4,124 @@ Log Analyzer Tool
 
 A tool for analyzing log files and identifying errors or anomalies.
 """
-import os
-import re
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from crewai_tools import BaseTool
+from tools.diagnostic_bundle import active_bundle
+from tools.log_parallel import scan_file_parallel
+from tools.log_index import scan_indexed
+from tools.log_scanner import DEFAULT_WARNING_PATTERN, LogScanner
+from tools.log_sources import is_compressed, resolve_log_files, scan_file, scan_log_set
+from tools.log_state import LogOffsetStore, scan_incremental
+from tools.log_structured import (StructuredQuery, looks_like_jsonl, scan_structured_file,
+                                  scan_structured_files)
+from tools.tool_metrics import instrumented
 
 class LogAnalyzerToolSchema(BaseModel):
     """Input for LogAnalyzerTool."""
-    log_file_path: str = Field(..., description="Path to the log file to analyze")
+    log_file_path: str = Field(..., description="Path to the log file to analyze; may be a glob (e.g. /var/log/app.log*) and may point to .gz/.bz2/.xz/.zst files")
     error_patterns: list = Field(default=[], description="List of error patterns to search for")
+    parallel: bool = Field(default=False, description="Scan the file in parallel across CPU cores (for very large logs)")
+    workers: int = Field(default=0, description="Number of worker processes in parallel mode (0 = one per CPU core)")
+    mode: str = Field(default="auto", description="'text' (regex patterns), 'structured' (JSON lines with field filters) or 'auto' (structured if the log is JSON lines and no error_patterns are given)")
+    filters: list = Field(default=[], description="Structured mode: field filters such as 'level=error', 'service!=auth', 'latency_ms>=500', 'msg~timeout' (= is an exact match)")
+    group_by: list = Field(default=[], description="Structured mode: fields to count values of, e.g. ['level', 'error.code'] (default: ['level'])")
+    numeric_fields: list = Field(default=[], description="Structured mode: numeric fields to summarise with min/max/mean/p50/p90/p99, e.g. ['latency_ms']")
+    multiline: bool = Field(default=True, description="Group stack traces (Python tracebacks, Java 'at ...' frames) into one event per exception")
+    record_start_pattern: str = Field(default="", description="Regex that matches the first line of every log record; other lines are treated as continuations")
+    include_rotated: bool = Field(default=False, description="Also analyze rotated siblings of the log (app.log.1, app.log.2.gz, ...) in chronological order")
+    incremental: bool = Field(default=False, description="Only scan lines appended since the previous incremental call on this log")
+    state_file: str = Field(default="", description="State file for incremental mode (default: ~/.cache/crew4ai/log_offsets.json)")
+    use_index: bool = Field(default=False, description="Answer the error patterns from an on-disk token index kept next to the log, so repeated queries only read candidate blocks (warnings are not counted in this mode)")
+    index_file: str = Field(default="", description="Index file for use_index (default: .<log name>.idx next to the log)")
 
 class LogAnalyzerTool(BaseTool):
     name: str = "Log Analyzer Tool"
     description: str = "Analyzes log files and identifies errors or anomalies."
     args_schema: Type[BaseModel] = LogAnalyzerToolSchema
 
+    @instrumented
     def _run(self, **kwargs: Any) -> Any:
         log_file_path = kwargs.get('log_file_path')
         error_patterns = kwargs.get('error_patterns', [])
+        parallel = kwargs.get('parallel', False)
+        include_rotated = kwargs.get('include_rotated', False)
+        mode = kwargs.get('mode', 'auto')
+        filters = kwargs.get('filters', [])
+        group_by = kwargs.get('group_by', [])
+        numeric_fields = kwargs.get('numeric_fields', [])
+        multiline = kwargs.get('multiline', True)
+        record_start_pattern = kwargs.get('record_start_pattern', '')
+        workers = kwargs.get('workers', 0)
+        incremental = kwargs.get('incremental', False)
+        state_file = kwargs.get('state_file', '')
+        use_index = kwargs.get('use_index', False)
+        index_file = kwargs.get('index_file', '')
         
         if not log_file_path:
             return "Error: No log file path provided"
         
-        if not os.path.exists(log_file_path):
-            return f"Error: Log file not found at {log_file_path}"
+        bundle = active_bundle()
+        if bundle is not None:
+            # Only the captured tail of each log is available
+            captured = bundle.log_path(log_file_path)
+            if captured is None:
+                return (f"Error: {log_file_path} is not in the diagnostic bundle "
+                        f"(captured logs: {', '.join(bundle.log_files()) or 'none'})")
+            log_file_path, include_rotated, incremental = captured, False, False
         
-        # Default error patterns if none provided
-        if not error_patterns:
-            error_patterns = [
-                r"ERROR",
-                r"CRITICAL",
-                r"FAIL",
-                r"EXCEPTION",
-                r"Traceback",
-                r"Timeout",
-                r"Connection refused",
-                r"Out of memory"
-            ]
+        log_files = resolve_log_files(log_file_path, include_rotated)
+        if not log_files:
+            return f"Error: Log file not found at {log_file_path}"
+        single_plain_file = len(log_files) == 1 and not is_compressed(log_files[0])
         
         try:
-            error_lines = []
-            warning_lines = []
-            with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                for line_num, line in enumerate(file, 1):
-                    # Check for error patterns
-                    for pattern in error_patterns:
-                        if re.search(pattern, line, re.IGNORECASE):
-                            error_lines.append({
-                                "line_number": line_num,
-                                "content": line.strip(),
-                                "pattern_matched": pattern
-                            })
-                    
-                    # Also collect warnings
-                    if re.search(r"WARNING", line, re.IGNORECASE):
-                        warning_lines.append({
-                            "line_number": line_num,
-                            "content": line.strip()
-                        })
+            if mode == 'auto':
+                structured = (not error_patterns and not incremental and not use_index
+                              and looks_like_jsonl(log_files[0]))
+            else:
+                structured = mode == 'structured'
+            if structured:
+                if incremental or use_index:
+                    return "Error: Incremental and indexed modes are not supported for structured logs"
+                query = StructuredQuery(filters, group_by or ['level'], numeric_fields)
+                if single_plain_file:
+                    summary = scan_structured_file(log_files[0], query,
+                                                   (workers or None) if parallel else 1)
+                else:
+                    summary = scan_structured_files(log_files, query, workers or None)
+                return summary.to_dict()
+            
+            # Falls back to the default error patterns if none provided
+            # Warnings are usually everywhere and would defeat the index
+            scanner = LogScanner(error_patterns,
+                                 warning_pattern=None if use_index else DEFAULT_WARNING_PATTERN,
+                                 multiline=multiline, record_start_pattern=record_start_pattern)
+            if use_index:
+                if incremental:
+                    return "Error: use_index cannot be combined with incremental mode"
+                if not single_plain_file:
+                    return "Error: Indexed mode supports a single uncompressed log file"
+                summary, index_info = scan_indexed(log_files[0], scanner, index_file or None,
+                                                   (workers or None) if parallel else 1)
+                return dict(summary.to_dict(), index=index_info)
+            elif incremental:
+                if not single_plain_file:
+                    return "Error: Incremental mode supports a single uncompressed log file"
+                log_file_path = log_files[0]
+                store = LogOffsetStore(state_file or None)
+                summary, scan_info = scan_incremental(log_file_path, scanner, store,
+                                                      parallel, workers or None)
+                return dict(summary.to_dict(), incremental=scan_info)
+            elif not single_plain_file:
+                # Rotated/compressed sets are decompressed file-per-worker
+                summary, files = scan_log_set(log_files, scanner, workers or None)
+                return dict(summary.to_dict(), files=files)
+            elif parallel:
+                summary = scan_file_parallel(log_files[0], scanner, workers or None)
+            else:
+                summary = scan_file(log_files[0], scanner)
             
-            return {
-                "total_lines": line_num,
-                "errors_found": len(error_lines),
-                "warnings_found": len(warning_lines),
-                "error_details": error_lines[:50],  # Limit to first 50 errors
-                "warning_details": warning_lines[:50]  # Limit to first 50 warnings
-            }
+            return summary.to_dict()
         except Exception as e:
             return f"Error analyzing log file: {str(e)}"
\ No newline at end of file
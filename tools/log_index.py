@@ -0,0 +1,400 @@
+"""
+Log Index
+=========
+
+A compact on-disk inverted index mapping the tokens of a log file to the line
+blocks (about 64 KiB each) they occur in, so that repeated queries with
+different patterns only read the candidate blocks instead of the whole log.
+
+Tokens are lowercase ASCII alphanumeric runs; tokens longer than
+``MAX_TOKEN_LENGTH`` are stored truncated with a ``+`` marker. The required
+literal of each pattern is split the same way: its inner tokens must be
+indexed exactly, its outer ones as a suffix, prefix or substring of an indexed
+token, which is resolved by searching the vocabulary. The candidate blocks are
+the union over patterns of the intersection over their tokens; a pattern
+without a usable literal selects every block.
+
+The index is a list of segments, each covering a newline-aligned byte range of
+the log with its own blocks, vocabulary (one newline-separated blob) and
+delta-encoded varint postings, so loading it is a handful of bulk reads.
+Segments of a large log are built in parallel; lines appended later become new
+segments, and once too many small ones pile up at the tail they are re-indexed
+as one. Rotation, truncation or a rewrite of the log (the checks of
+incremental mode) trigger a rebuild. The index is stored next to the log as
+``.<name>.idx``, or in the cache directory when the log directory is not
+writable.
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tools.log_parallel import DEFAULT_CHUNK_SIZE, split_ranges
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+from tools.log_state import (HEAD_FINGERPRINT_BYTES, complete_end, head_fingerprint,
+                             rescan_reason)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "crew4ai", "log_index")
+
+INDEX_MAGIC = b"C4LOGIDX"
+INDEX_VERSION = 1
+
+# Target size of a line block; blocks always end on a newline.
+BLOCK_SIZE = 64 * 1024
+
+# Longer tokens (ids, base64 blobs) are truncated to bound the vocabulary.
+MAX_TOKEN_LENGTH = 40
+
+# Small segments left by appends that are tolerated before re-indexing them.
+MAX_TAIL_SEGMENTS = 8
+
+_TOKEN = re.compile(rb"[a-z0-9]+")
+_TRUNCATED = b"+"
+# Lowercases ASCII letters and turns every non-alphanumeric byte into a space,
+# so that ``translate(...).split()`` yields the same tokens as ``_TOKEN``.
+_TOKEN_TABLE = bytes(c + 32 if 65 <= c <= 90 else c if 48 <= c <= 57 or 97 <= c <= 122 else 32
+                     for c in range(256))
+_ARRAYS = ("block_starts", "block_lines", "token_offsets", "posting_offsets")
+
+
+def default_index_file(log_file_path: str) -> str:
+    """``.<name>.idx`` next to the log, or a per-path file in the cache directory."""
+    real = os.path.realpath(log_file_path)
+    directory, name = os.path.split(real)
+    if os.access(directory, os.W_OK):
+        return os.path.join(directory, f".{name}.idx")
+    digest = hashlib.sha1(real.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(DEFAULT_INDEX_DIR, f"{name}.{digest}.idx")
+
+
+def _key(token: bytes) -> bytes:
+    return token if len(token) <= MAX_TOKEN_LENGTH else token[:MAX_TOKEN_LENGTH] + _TRUNCATED
+
+
+def _append_varint(buf: bytearray, value: int):
+    while value >= 0x80:
+        buf.append(value & 0x7F | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _decode_postings(data: bytes) -> List[int]:
+    blocks, current, value, shift = [], -1, 0, 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            current += value
+            blocks.append(current)
+            value = shift = 0
+    return blocks
+
+
+class _Segment:
+    """Blocks and postings of one newline-aligned byte range of the log."""
+
+    __slots__ = ("start", "end", "line_base", "line_count", "vocab", "postings") + _ARRAYS
+
+    def __init__(self, start: int = 0, end: int = 0):
+        self.start, self.end = start, end
+        # Lines before the segment, and lines inside it
+        self.line_base = self.line_count = 0
+        # Offset and first line (relative to the segment) of every block
+        self.block_starts = array('Q')
+        self.block_lines = array('Q')
+        # Vocabulary blob "\ntoken\ntoken\n" with the offset of each token
+        self.vocab = b"\n"
+        self.token_offsets = array('Q')
+        # Postings of token i are postings[posting_offsets[i]:posting_offsets[i + 1]]
+        self.posting_offsets = array('Q', [0])
+        self.postings = b""
+
+    def freeze(self, postings: Dict[bytes, List[int]]):
+        """Store ``postings`` (token -> ascending block numbers) compactly."""
+        for token in [t for t in postings if len(t) > MAX_TOKEN_LENGTH]:
+            blocks = postings.pop(token)
+            postings[_key(token)] = sorted(set(postings.get(_key(token), ())).union(blocks))
+        vocab, blob = bytearray(b"\n"), bytearray()
+        for token, blocks in postings.items():
+            self.token_offsets.append(len(vocab))
+            vocab += token + b"\n"
+            previous = -1
+            for block in blocks:
+                delta = block - previous
+                if delta < 0x80:
+                    blob.append(delta)
+                else:
+                    _append_varint(blob, delta)
+                previous = block
+            self.posting_offsets.append(len(blob))
+        self.vocab, self.postings = bytes(vocab), bytes(blob)
+
+    def meta(self) -> dict:
+        return dict({name: len(getattr(self, name)) for name in _ARRAYS},
+                    start=self.start, end=self.end, line_base=self.line_base,
+                    line_count=self.line_count, vocab=len(self.vocab),
+                    postings=len(self.postings))
+
+    def write(self, f):
+        for name in _ARRAYS:
+            getattr(self, name).tofile(f)
+        f.write(self.vocab)
+        f.write(self.postings)
+
+    @classmethod
+    def read(cls, f, meta: dict) -> "_Segment":
+        segment = cls(meta["start"], meta["end"])
+        segment.line_base, segment.line_count = meta["line_base"], meta["line_count"]
+        for name in _ARRAYS:
+            values = array('Q')
+            values.frombytes(f.read(meta[name] * values.itemsize))
+            setattr(segment, name, values)
+        segment.vocab = f.read(meta["vocab"])
+        segment.postings = f.read(meta["postings"])
+        return segment
+
+    def _token_ids(self, token: bytes, open_left: bool, open_right: bool) -> set:
+        """Vocabulary entries that can stand for ``token`` in a line."""
+        if not open_left and (not open_right or len(token) > MAX_TOKEN_LENGTH):
+            needles = [b"\n" + _key(token) + b"\n"]
+        elif not open_left:
+            needles = [b"\n" + token]
+        elif not open_right:
+            # Truncated tokens may end with anything.
+            needles = [token + b"\n", _TRUNCATED + b"\n"]
+        else:
+            needles = [token, _TRUNCATED + b"\n"]
+        ids = set()
+        for needle in needles:
+            shift = 1 if needle.startswith(b"\n") else 0
+            pos = self.vocab.find(needle)
+            while pos != -1:
+                ids.add(bisect.bisect_right(self.token_offsets, pos + shift) - 1)
+                pos = self.vocab.find(needle, pos + 1)
+        return ids
+
+    def literal_blocks(self, literal: bytes) -> Optional[set]:
+        """Local blocks that may contain ``literal``; None if it has no tokens."""
+        blocks = None
+        for run in _TOKEN.finditer(literal):
+            found = set()
+            for i in self._token_ids(run.group(), run.start() == 0, run.end() == len(literal)):
+                found.update(_decode_postings(
+                    self.postings[self.posting_offsets[i]:self.posting_offsets[i + 1]]))
+            blocks = found if blocks is None else blocks & found
+            if not blocks:
+                break
+        return blocks
+
+
+def index_range(path: str, start: int, end: int) -> _Segment:
+    """Tokenize the complete lines in [start, end) of ``path`` into a segment."""
+    segment = _Segment(start, end)
+    postings: Dict[bytes, List[int]] = defaultdict(list)
+    block = -1
+    lines = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            data = f.read(min(BLOCK_SIZE, end - pos))
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            block += 1
+            segment.block_starts.append(pos)
+            segment.block_lines.append(lines)
+            pos += len(data)
+            lines += data.count(b"\n")
+            for token in set(data.translate(_TOKEN_TABLE).split()):
+                postings[token].append(block)
+    segment.line_count = lines
+    segment.freeze(postings)
+    return segment
+
+
+def _index_range_task(args) -> _Segment:
+    return index_range(*args)
+
+
+class LogIndex:
+    """Token -> line-block postings of one plain log file."""
+
+    def __init__(self, log_file_path: str, index_file: Optional[str] = None):
+        self.log_file_path = log_file_path
+        self.index_file = index_file or default_index_file(log_file_path)
+        self.meta: dict = {"offset": 0, "line_count": 0}
+        self.segments: List[_Segment] = []
+        self._blocks: Optional[List[Tuple[int, int, int]]] = None
+
+    @property
+    def total_lines(self) -> int:
+        return self.meta["line_count"]
+
+    def _load(self) -> bool:
+        try:
+            with open(self.index_file, 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return False
+                (header_length,) = struct.unpack("<I", f.read(4))
+                meta = json.loads(f.read(header_length))
+                if meta.get("version") != INDEX_VERSION or meta.get("byteorder") != sys.byteorder:
+                    return False
+                segments = [_Segment.read(f, m) for m in meta.pop("segments")]
+        except (OSError, ValueError, KeyError, struct.error):
+            return False
+        self.meta, self.segments = meta, segments
+        return True
+
+    def _save(self):
+        """Write the index, replacing the previous one atomically."""
+        header = json.dumps(dict(self.meta, version=INDEX_VERSION, byteorder=sys.byteorder,
+                                 segments=[s.meta() for s in self.segments])).encode('utf-8')
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".log_index.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                for segment in self.segments:
+                    segment.write(f)
+            os.replace(tmp_path, self.index_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _add_segments(self, start: int, end: int, workers: Optional[int]):
+        workers = workers or os.cpu_count() or 1
+        tasks = [(self.log_file_path, s, e) for s, e in split_ranges(self.log_file_path,
+                                                                       DEFAULT_CHUNK_SIZE, start, end)]
+        if workers == 1 or len(tasks) <= 1:
+            segments = map(_index_range_task, tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                segments = list(pool.map(_index_range_task, tasks))
+        for segment in segments:
+            segment.line_base = self.meta["line_count"]
+            self.meta["line_count"] += segment.line_count
+            self.segments.append(segment)
+
+    def _compact(self, workers: Optional[int]):
+        """Re-index the small segments appended at the tail once there are too many."""
+        tail = 0
+        for segment in reversed(self.segments):
+            if segment.end - segment.start >= DEFAULT_CHUNK_SIZE:
+                break
+            tail += 1
+        if tail > MAX_TAIL_SEGMENTS:
+            first = self.segments[-tail]
+            del self.segments[-tail:]
+            self.meta["line_count"] = first.line_base
+            self._add_segments(first.start, self.meta["offset"], workers)
+
+    def update(self, workers: Optional[int] = 1) -> dict:
+        """Bring the index up to date with the log; rebuild it if the log was rotated."""
+        with open(self.log_file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            reason = rescan_reason(self.meta if self._load() else None, st, f)
+            if reason is not None:
+                self.meta, self.segments = {"offset": 0, "line_count": 0}, []
+            start = self.meta["offset"]
+            end = complete_end(f, start, st.st_size)
+            if end > start or reason is not None:
+                self._add_segments(start, end, workers)
+                head_length = min(end, HEAD_FINGERPRINT_BYTES)
+                self.meta.update(inode=st.st_ino, device=st.st_dev, offset=end,
+                                 head_length=head_length,
+                                 head_hash=head_fingerprint(f, head_length))
+                self._compact(workers)
+                self._save()
+        self._blocks = None
+        return {
+            "index_file": self.index_file,
+            "rebuilt": reason is not None,
+            "rebuild_reason": reason,
+            "bytes_indexed": end - start,
+            "indexed_bytes": end
+        }
+
+    @property
+    def blocks(self) -> List[Tuple[int, int, int]]:
+        """(start, end, first line number) of every block, in file order."""
+        if self._blocks is None:
+            self._blocks = []
+            for segment in self.segments:
+                starts = segment.block_starts
+                for i, start in enumerate(starts):
+                    end = starts[i + 1] if i + 1 < len(starts) else segment.end
+                    self._blocks.append((start, end, segment.line_base + segment.block_lines[i] + 1))
+        return self._blocks
+
+    def candidate_blocks(self, literals: Sequence[Optional[str]]) -> List[int]:
+        """Blocks that may contain a line with any of ``literals`` (None: any line)."""
+        every = list(range(len(self.blocks)))
+        selected = set()
+        for literal in literals:
+            if literal is None:
+                return every
+            text = literal.encode('utf-8').lower()
+            base = 0
+            for segment in self.segments:
+                blocks = segment.literal_blocks(text)
+                if blocks is None:
+                    return every
+                selected.update(base + b for b in blocks)
+                base += len(segment.block_starts)
+        return sorted(selected)
+
+    def iter_lines(self, f, blocks: Sequence[int]):
+        """Text lines of consecutive ``blocks`` read from the open log ``f``."""
+        for block in blocks:
+            start, end, _ = self.blocks[block]
+            f.seek(start)
+            for line in f.read(end - start).decode('utf-8', 'ignore').split("\n")[:-1]:
+                yield line + "\n"
+
+
+def _consecutive_runs(blocks: List[int]) -> List[List[int]]:
+    runs = []
+    for block in blocks:
+        if runs and runs[-1][-1] == block - 1:
+            runs[-1].append(block)
+        else:
+            runs.append([block])
+    return runs
+
+
+def scan_indexed(log_file_path: str, scanner: LogScanner, index_file: Optional[str] = None,
+                 workers: Optional[int] = 1) -> Tuple[ScanSummary, dict]:
+    """Update the index of ``log_file_path`` and scan only its candidate blocks.
+
+    Line numbers and ``total_lines`` are those of the whole indexed file;
+    ``workers`` processes build the index for large amounts of new data.
+    """
+    index = LogIndex(log_file_path, index_file)
+    info = index.update(workers)
+    blocks = index.candidate_blocks(scanner.literals())
+    if scanner.multiline:
+        # A stack trace may continue into the block after a matching line.
+        blocks = sorted(set(blocks) | {b + 1 for b in blocks if b + 1 < len(index.blocks)})
+
+    summary = ScanSummary()
+    scanned = 0
+    with open(log_file_path, 'rb') as f:
+        for run in _consecutive_runs(blocks):
+            summary.total_lines = index.blocks[run[0]][2] - 1
+            scan_lines(scanner, index.iter_lines(f, run), summary)
+            scanned += index.blocks[run[-1]][1] - index.blocks[run[0]][0]
+    summary.total_lines = index.total_lines
+    return summary, dict(info, blocks_total=len(index.blocks), blocks_scanned=len(blocks),
+                         bytes_scanned=scanned)
@@ -0,0 +1,179 @@
+"""
+Multiline Log Events
+====================
+
+Streaming assembly of multiline events such as Python tracebacks and Java
+stack traces.
+
+An event is opened by a line that matched an error pattern. Following lines
+are continuations while they are indented, start with ``at ...``,
+``Caused by:`` or ``... N more``, or name the exception class right after the
+header. For Python tracebacks the first unindented line after the frames is
+the exception line and closes the event. When a start-of-record regex is
+configured, every line not matching it is a continuation instead.
+
+Each event keeps a bounded number of example lines and a running hash of its
+normalized (masked) stack, so memory per open event is constant. Identical
+exceptions are counted together in ``ExceptionGroups``.
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+from tools.log_aggregation import clip_content
+from tools.log_templates import mask_line
+
+# Lines of a stack kept as the example of an exception group.
+MAX_EXAMPLE_LINES = 30
+
+_CONTINUATION = re.compile(r"^(?:[ \t]+\S|at [\w$.<>]+\(|Caused by:|Suppressed:|\.\.\. \d+ (?:more|common frames omitted))")
+_EXCEPTION_LINE = re.compile(r"^[\w$.]*(?:Error|Exception|Throwable|Exit|Interrupt|Fault)\b[^\n]*$")
+_TRACEBACK_HEADER = "Traceback (most recent call last)"
+_CHAINED_TRACEBACK = re.compile(r"^(?:During handling of the above exception|The above exception was the direct cause)")
+
+
+def starts_record(previous: str, line: str, record_start_pattern: Optional[str] = None) -> bool:
+    """True if no event open at ``previous`` can continue into ``line``.
+
+    Splitting a log right before such a line assembles the same events as
+    reading it in one piece.
+    """
+    if record_start_pattern:
+        return re.search(record_start_pattern, line) is not None
+    # After a frame or a traceback header any unindented line may still be
+    # the exception line.
+    if _CONTINUATION.match(previous) or _TRACEBACK_HEADER in previous:
+        return False
+    return not (not line.strip() or _CONTINUATION.match(line) or _CHAINED_TRACEBACK.match(line)
+                or line.startswith(_TRACEBACK_HEADER) or _EXCEPTION_LINE.match(line.rstrip()))
+
+
+class _Event:
+    __slots__ = ("first_line", "last_line", "header", "exception", "lines", "digest",
+                 "line_count", "python")
+
+    def __init__(self, line_number: int, line: str):
+        self.first_line = self.last_line = line_number
+        self.header = clip_content(line)
+        self.exception: Optional[str] = None
+        self.lines: List[str] = [self.header]
+        self.digest = hashlib.blake2b(digest_size=12)
+        self.line_count = 1
+        self.python = _TRACEBACK_HEADER in line
+
+    def append(self, line_number: int, line: str, is_exception_line: bool = False):
+        content = clip_content(line)
+        self.last_line = line_number
+        self.line_count += 1
+        if len(self.lines) < MAX_EXAMPLE_LINES:
+            self.lines.append(content)
+        self.digest.update(mask_line(content).encode('utf-8', 'ignore'))
+        self.digest.update(b"\n")
+        if is_exception_line or (self.exception is None and _EXCEPTION_LINE.match(content)):
+            self.exception = content
+        elif self.python and content.startswith(_TRACEBACK_HEADER):
+            # A chained traceback follows; its exception line is the final one.
+            self.exception = None
+
+
+class ExceptionGroups:
+    """Counts of identical multiline exceptions with one example each."""
+
+    def __init__(self, max_groups: int = 500):
+        self.max_groups = max_groups
+        self.groups: Dict[str, dict] = {}
+        self.evicted_events = 0
+
+    def add_group(self, key: str, group: dict, line_offset: int = 0):
+        existing = self.groups.get(key)
+        if existing is not None:
+            existing["count"] += group["count"]
+            existing["last_seen_line"] = group["last_seen_line"] + line_offset
+            return
+        if len(self.groups) >= self.max_groups:
+            smallest = min(self.groups, key=lambda k: self.groups[k]["count"])
+            self.evicted_events += self.groups.pop(smallest)["count"]
+        self.groups[key] = dict(group,
+                                first_seen_line=group["first_seen_line"] + line_offset,
+                                last_seen_line=group["last_seen_line"] + line_offset)
+
+    def add_event(self, event: _Event):
+        # Python tracebacks start with a constant header; the exception line
+        # and frames identify them. Other events include their masked header.
+        if not event.python:
+            event.digest.update(mask_line(event.header).encode('utf-8', 'ignore'))
+        self.add_group(event.digest.hexdigest(), {
+            "exception": event.exception or event.header,
+            "count": 1,
+            "first_seen_line": event.first_line,
+            "last_seen_line": event.first_line,
+            "stack_lines": event.line_count,
+            "example": event.lines
+        })
+
+    def merge(self, other: "ExceptionGroups", line_offset: int = 0):
+        for key, group in other.groups.items():
+            self.add_group(key, group, line_offset)
+        self.evicted_events += other.evicted_events
+
+    def top(self, limit: Optional[int] = 10) -> List[dict]:
+        ranked = sorted(self.groups.items(), key=lambda item: (-item[1]["count"], item[1]["first_seen_line"]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [dict(group, stack_hash=key) for key, group in ranked]
+
+    @classmethod
+    def from_dicts(cls, groups: List[dict], evicted_events: int = 0) -> "ExceptionGroups":
+        table = cls()
+        for group in groups:
+            group = dict(group)
+            table.groups[group.pop("stack_hash")] = group
+        table.evicted_events = evicted_events
+        return table
+
+
+class MultilineAssembler:
+    """Join continuation lines of an open event and report finished events."""
+
+    def __init__(self, sink: ExceptionGroups, record_start_pattern: Optional[str] = None):
+        self.sink = sink
+        self.record_start = re.compile(record_start_pattern) if record_start_pattern else None
+        self.open_event: Optional[_Event] = None
+
+    def _continuation(self, line: str) -> Optional[str]:
+        """Return "frame" or "exception" for a continuation line, else None."""
+        if self.record_start is not None:
+            return None if self.record_start.search(line) else "frame"
+        if _CONTINUATION.match(line):
+            return "frame"
+        event = self.open_event
+        if event.python:
+            if event.exception is None:
+                # The first unindented line after the frames names the exception.
+                return "exception" if event.line_count > 1 else None
+            if (_CHAINED_TRACEBACK.match(line) or line.startswith(_TRACEBACK_HEADER)
+                    or not line.strip()):
+                return "frame"
+            return None
+        # Java-style: the exception class right below the log header.
+        if event.line_count == 1 and _EXCEPTION_LINE.match(line.rstrip()):
+            return "exception"
+        return None
+
+    def feed(self, line_number: int, line: str, is_error: bool) -> bool:
+        """Process one line; return True if it continued the open event."""
+        if self.open_event is not None:
+            kind = self._continuation(line)
+            if kind is not None:
+                self.open_event.append(line_number, line, kind == "exception")
+                return True
+            self.flush()
+        if is_error:
+            self.open_event = _Event(line_number, line)
+        return False
+
+    def flush(self):
+        """Close the open event; single-line events are not multiline."""
+        event, self.open_event = self.open_event, None
+        if event is not None and event.line_count > 1:
+            self.sink.add_event(event)
@@ -0,0 +1,126 @@
+"""
+Parallel Log Scanning
+=====================
+
+Memory-maps a log file, splits it into newline-aligned byte ranges and scans
+the ranges in a process pool. Per-range summaries are merged in file order, so
+line numbers in the merged result are global. With multiline events on, ranges
+start only where no stack trace can continue, so every event is assembled in
+one range, as in a serial scan. The search for such a line stops after
+``ALIGN_LIMIT`` bytes: an event that runs longer, or a log where
+``record_start_pattern`` is rare, is cut at the plain newline instead of
+being searched serially before any worker starts.
+"""
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from tools.log_multiline import starts_record
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+
+# Ranges are kept well below the file size so that workers stay balanced and
+# each one only touches a bounded window of the mapping at a time.
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Bytes past a chunk's newline boundary searched for a record boundary
+ALIGN_LIMIT = 1024 * 1024
+
+
+def split_ranges(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 start: int = 0, end: Optional[int] = None,
+                 boundary: Optional[Callable[[str, str], bool]] = None,
+                 align_limit: int = ALIGN_LIMIT) -> List[Tuple[int, int]]:
+    """Return [start, end) byte ranges of ``path`` that end on a newline.
+
+    ``start`` must be the beginning of a line; ``end`` defaults to the file size.
+    ``boundary(previous_line, line)`` further restricts where a range may
+    start; ranges grow line by line until it holds, for at most
+    ``align_limit`` bytes.
+    """
+    size = os.path.getsize(path) if end is None else end
+    if size <= start:
+        return []
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < size:
+            target = start + chunk_size
+            if target >= size:
+                stop = size
+            else:
+                newline = mm.find(b"\n", target, size)
+                stop = size if newline == -1 else newline + 1
+                if boundary is not None:
+                    stop = _align(mm, stop, size, boundary, align_limit)
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def _align(mm: mmap.mmap, stop: int, size: int, boundary: Callable[[str, str], bool],
+           limit: int = ALIGN_LIMIT) -> int:
+    """The first line start at or after ``stop`` that ``boundary`` accepts.
+
+    When none is found within ``limit`` bytes, ``stop`` itself.
+    """
+    line_start = stop
+    previous_start = mm.rfind(b"\n", 0, stop - 1) + 1
+    previous = mm[previous_start:stop].decode('utf-8', 'ignore')
+    while line_start < size:
+        if line_start - stop >= limit:
+            return stop
+        newline = mm.find(b"\n", line_start, size)
+        line_end = size if newline == -1 else newline + 1
+        line = mm[line_start:line_end].decode('utf-8', 'ignore')
+        if boundary(previous, line):
+            break
+        previous, line_start = line, line_end
+    return line_start
+
+
+def _iter_range_lines(mm: mmap.mmap, start: int, end: int):
+    mm.seek(start)
+    readline = mm.readline
+    while mm.tell() < end:
+        yield readline().decode('utf-8', 'ignore')
+
+
+def scan_range(path: str, start: int, end: int, scanner: LogScanner) -> ScanSummary:
+    """Scan one byte range; line numbers in the result start at 1."""
+    summary = ScanSummary()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        scan_lines(scanner, _iter_range_lines(mm, start, end), summary)
+    return summary
+
+
+def _scan_range_task(args) -> ScanSummary:
+    return scan_range(*args)
+
+
+def scan_file_parallel(path: str, scanner: LogScanner, workers: Optional[int] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, start: int = 0,
+                       end: Optional[int] = None) -> ScanSummary:
+    """Scan ``path`` across ``workers`` processes (default: one per CPU core).
+
+    ``start``/``end`` restrict the scan to a byte range; line numbers in the
+    result are then relative to ``start``.
+    """
+    workers = workers or os.cpu_count() or 1
+    boundary = None
+    if scanner.multiline:
+        boundary = partial(starts_record, record_start_pattern=scanner.record_start_pattern)
+    ranges = split_ranges(path, chunk_size, start, end, boundary)
+    summary = ScanSummary()
+    tasks = [(path, start, end, scanner) for start, end in ranges]
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            summary.merge(_scan_range_task(task))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        # map() yields in submission order, so merging keeps line numbers global.
+        for chunk_summary in pool.map(_scan_range_task, tasks):
+            summary.merge(chunk_summary)
+    return summary
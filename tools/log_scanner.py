@@ -0,0 +1,325 @@
+"""
+Log Scanner
+===========
+
+A precompiled, single-pass pattern matcher used by the Log Analyzer Tool.
+
+All error patterns plus the warning pattern are compiled once. Every pattern
+contributes a lowercase literal (the whole pattern for plain strings, the
+longest required literal run for regular expressions) to one combined,
+case-sensitive prefilter that runs over the lowercased line. Lines that do not
+hit the prefilter are skipped after a single scan; only the few lines that do
+are resolved against the individual patterns.
+"""
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tools.log_aggregation import SampleStats, clip_content
+from tools.log_multiline import ExceptionGroups, MultilineAssembler
+from tools.log_templates import TemplateMiner
+from tools.log_timeline import Timeline, TimestampParser
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - Python 3.10
+    import sre_parse
+
+DEFAULT_ERROR_PATTERNS = [
+    r"ERROR",
+    r"CRITICAL",
+    r"FAIL",
+    r"EXCEPTION",
+    r"Traceback",
+    r"Timeout",
+    r"Connection refused",
+    r"Out of memory"
+]
+
+DEFAULT_WARNING_PATTERN = r"WARNING"
+
+# Timeline series name used for warning lines
+WARNINGS_SERIES = "warnings"
+
+# Required literals shorter than this are too common to be a useful prefilter.
+MIN_PREFILTER_LITERAL = 3
+
+
+def _literal_info(pattern: str) -> Tuple[Optional[str], bool]:
+    """Return (lowercase required literal, pattern is a plain literal).
+
+    Only ASCII literals are used, so that ``str.lower`` agrees with
+    ``re.IGNORECASE`` and the prefilter can never reject a matching line.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None, False
+
+    runs, current, plain = [], [], True
+    for op, av in parsed:
+        if op == sre_parse.LITERAL and av < 128:
+            current.append(chr(av))
+            continue
+        plain = False
+        if current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+
+    if plain and runs:
+        return runs[0].lower(), True
+    best = max(runs, key=len) if runs else ""
+    if len(best) >= MIN_PREFILTER_LITERAL:
+        return best.lower(), False
+    return None, False
+
+
+class _CompiledPattern:
+    """One user pattern with its prefilter literal and fallback regex."""
+
+    __slots__ = ("pattern", "literal", "regex")
+
+    def __init__(self, pattern: str):
+        literal, plain = _literal_info(pattern)
+        self.pattern = pattern
+        self.literal = literal
+        # Plain literals are matched with ``in`` on the lowercased line.
+        self.regex = None if plain else re.compile(pattern, re.IGNORECASE)
+
+    def matches(self, line: str, lowered: str) -> bool:
+        if self.literal is not None and self.literal not in lowered:
+            return False
+        return self.regex is None or self.regex.search(line) is not None
+
+
+class LogScanner:
+    """Match a set of error patterns and a warning pattern against log lines.
+
+    ``multiline`` and ``record_start_pattern`` control how ``scan_lines``
+    groups stack traces into one event. A ``warning_pattern`` of None
+    disables warning counting.
+    """
+
+    def __init__(self, error_patterns: Sequence[str] = (),
+                 warning_pattern: Optional[str] = DEFAULT_WARNING_PATTERN,
+                 multiline: bool = True, record_start_pattern: Optional[str] = None):
+        self.error_patterns = list(error_patterns) or list(DEFAULT_ERROR_PATTERNS)
+        self.warning_pattern = warning_pattern
+        self.multiline = multiline
+        self.record_start_pattern = record_start_pattern or None
+        self._errors = [_CompiledPattern(p) for p in self.error_patterns]
+        self._warning = _CompiledPattern(warning_pattern) if warning_pattern else None
+
+        compiled = self._compiled()
+        literals = {c.literal for c in compiled if c.literal is not None}
+        # Patterns without a usable literal have to be tried on every line.
+        self._always_check = any(c.literal is None for c in compiled)
+        self._prefilter = None
+        if literals:
+            # Longest first so a literal is never shadowed by its own prefix.
+            alternation = "|".join(
+                re.escape(lit) for lit in sorted(literals, key=len, reverse=True)
+            )
+            self._prefilter = re.compile(alternation)
+
+    def _compiled(self) -> List[_CompiledPattern]:
+        return self._errors + ([self._warning] if self._warning is not None else [])
+
+    def literals(self) -> List[Optional[str]]:
+        """Lowercase literal each pattern requires (None: the pattern has none)."""
+        return [c.literal for c in self._compiled()]
+
+    def fingerprint(self) -> str:
+        """Identify the configuration; results are only comparable for equal ones."""
+        config = json.dumps([self.error_patterns, self.warning_pattern,
+                             self.multiline, self.record_start_pattern])
+        return hashlib.sha1(config.encode('utf-8')).hexdigest()[:16]
+
+    def scan_line(self, line: str) -> Tuple[List[str], bool]:
+        """Return (error patterns matched, is_warning) for one line."""
+        lowered = line.lower()
+        if (not self._always_check and self._prefilter is not None
+                and self._prefilter.search(lowered) is None):
+            return [], False
+        matched = [c.pattern for c in self._errors if c.matches(line, lowered)]
+        return matched, self._warning is not None and self._warning.matches(line, lowered)
+
+
+class ScanSummary:
+    """Constant-memory summary of the matches found while scanning a log."""
+
+    def __init__(self, first_n: int = 20, last_n: int = 20, reservoir_n: int = 10):
+        self.total_lines = 0
+        self.errors = SampleStats(first_n, last_n, reservoir_n)
+        self.warnings = SampleStats(first_n, last_n, reservoir_n)
+        # pattern -> [count, first_seen_line, last_seen_line]
+        self.pattern_counts: Dict[str, list] = {}
+        # Error lines collapsed into signatures with variable fields masked
+        self.signatures = TemplateMiner()
+        # Matches bucketed into time windows by the timestamp on each line
+        self.timestamps = TimestampParser()
+        self.timeline = Timeline()
+        self._last_timestamp: Optional[float] = None
+        # Stack traces assembled into one event and counted by normalized stack
+        self.exceptions = ExceptionGroups()
+
+    @property
+    def errors_found(self) -> int:
+        return self.errors.count
+
+    @property
+    def warnings_found(self) -> int:
+        return self.warnings.count
+
+    def add(self, line_number: int, line: str, matched: List[str], is_warning: bool):
+        """Record the scan result of one matching line."""
+        content = clip_content(line)
+        timestamp = self.timestamps.parse(line)
+        if timestamp is None:
+            # Continuation lines (stack frames etc.) inherit the last timestamp
+            timestamp = self._last_timestamp
+        else:
+            self._last_timestamp = timestamp
+        if timestamp is not None:
+            for pattern in matched:
+                self.timeline.add(pattern, timestamp)
+            if is_warning:
+                self.timeline.add(WARNINGS_SERIES, timestamp)
+        if matched:
+            self.signatures.add(line_number, content)
+        for pattern in matched:
+            counts = self.pattern_counts.get(pattern)
+            if counts is None:
+                self.pattern_counts[pattern] = [1, line_number, line_number]
+            else:
+                counts[0] += 1
+                counts[2] = line_number
+            self.errors.add({
+                "line_number": line_number,
+                "content": content,
+                "pattern_matched": pattern
+            })
+        if is_warning:
+            self.warnings.add({
+                "line_number": line_number,
+                "content": content
+            })
+
+    def merge(self, other: "ScanSummary"):
+        """Append the summary of the log section that follows this one.
+
+        Line numbers in ``other`` are relative to its own section and are
+        shifted by the lines already counted here.
+        """
+        offset = self.total_lines
+        self.errors.merge(other.errors, offset)
+        self.warnings.merge(other.warnings, offset)
+        self.signatures.merge(other.signatures, offset)
+        self.exceptions.merge(other.exceptions, offset)
+        self.timeline.merge(other.timeline)
+        if self.timestamps.format is None:
+            self.timestamps = other.timestamps
+        if other._last_timestamp is not None:
+            self._last_timestamp = other._last_timestamp
+        for pattern, (count, first, last) in other.pattern_counts.items():
+            counts = self.pattern_counts.get(pattern)
+            if counts is None:
+                self.pattern_counts[pattern] = [count, first + offset, last + offset]
+            else:
+                counts[0] += count
+                counts[2] = last + offset
+        self.total_lines += other.total_lines
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScanSummary":
+        """Rebuild a summary from the output of ``to_dict``."""
+        summary = cls()
+        summary.total_lines = data.get("total_lines", 0)
+        for stats, prefix in ((summary.errors, "error"), (summary.warnings, "warning")):
+            samples = data.get(f"{prefix}_samples", {})
+            restored = SampleStats.from_dict(dict(
+                samples,
+                count=data.get(f"{prefix}s_found", 0),
+                first=data.get(f"{prefix}_details", [])
+            ), stats.first_n, stats.last_n, stats.reservoir_n)
+            setattr(summary, f"{prefix}s", restored)
+        summary.pattern_counts = {
+            pattern: [c["count"], c["first_seen_line"], c["last_seen_line"]]
+            for pattern, c in data.get("pattern_counts", {}).items()
+        }
+        signatures = data.get("error_signatures", {})
+        summary.signatures = TemplateMiner.from_dicts(signatures.get("top", []),
+                                                      signatures.get("evicted_lines", 0))
+        exceptions = data.get("exception_groups", {})
+        summary.exceptions = ExceptionGroups.from_dicts(exceptions.get("top", []),
+                                                        exceptions.get("evicted_events", 0))
+        if "timeline_state" in data:
+            summary.timeline = Timeline.from_state(data["timeline_state"])
+        summary.timestamps.use_format(data.get("time_windows", {}).get("timestamp_format"))
+        return summary
+
+    def to_state(self) -> dict:
+        """Like ``to_dict`` but with every signature, for persisting between scans."""
+        return dict(self.to_dict(signature_limit=None, exception_limit=None),
+                    timeline_state=self.timeline.to_state())
+
+    def to_dict(self, signature_limit: Optional[int] = 20,
+                exception_limit: Optional[int] = 10) -> dict:
+        result = {
+            "total_lines": self.total_lines,
+            "errors_found": self.errors.count,
+            "warnings_found": self.warnings.count,
+            "pattern_counts": {
+                pattern: {"count": count, "first_seen_line": first, "last_seen_line": last}
+                for pattern, (count, first, last) in self.pattern_counts.items()
+            }
+        }
+        for stats, prefix in ((self.errors, "error"), (self.warnings, "warning")):
+            data = stats.to_dict()
+            # The first N lines keep the original *_details key.
+            result[f"{prefix}_details"] = data["first"]
+            result[f"{prefix}_samples"] = {
+                "first_seen_line": data["first_seen_line"],
+                "last_seen_line": data["last_seen_line"],
+                "last": data["last"],
+                "sample": data["sample"]
+            }
+        result["error_signatures"] = {
+            "distinct": len(self.signatures),
+            "evicted_lines": self.signatures.evicted_lines,
+            "top": self.signatures.top(signature_limit)
+        }
+        result["exception_groups"] = {
+            "distinct": len(self.exceptions.groups),
+            "evicted_events": self.exceptions.evicted_events,
+            "top": self.exceptions.top(exception_limit)
+        }
+        result["time_windows"] = dict(self.timeline.to_dict(),
+                                      timestamp_format=self.timestamps.format)
+        return result
+
+
+def scan_lines(scanner: LogScanner, lines, summary: ScanSummary) -> ScanSummary:
+    """Scan an iterable of text lines into ``summary``, continuing its numbering."""
+    scan_line = scanner.scan_line
+    add = summary.add
+    assembler = None
+    if scanner.multiline:
+        assembler = MultilineAssembler(summary.exceptions, scanner.record_start_pattern)
+    line_number = summary.total_lines
+    for line_number, line in enumerate(lines, line_number + 1):
+        matched, is_warning = scan_line(line)
+        # Continuation lines belong to the open multiline event, not to the
+        # per-line matches.
+        if (assembler is not None and (matched or assembler.open_event is not None)
+                and assembler.feed(line_number, line, bool(matched))):
+            continue
+        if matched or is_warning:
+            add(line_number, line, matched, is_warning)
+    if assembler is not None:
+        assembler.flush()
+    summary.total_lines = line_number
+    return summary
@@ -0,0 +1,129 @@
+"""
+Log Sources
+===========
+
+Resolves a log specification (a single path, a glob, or a rotation base name
+such as ``app.log`` standing for ``app.log.14.xz`` ... ``app.log.1``,
+``app.log``) into an ordered list of files, and streams plain or compressed
+(.gz, .bz2, .xz/.lzma, .zst) files without unpacking them to disk.
+
+Files of a set are scanned in a process pool, one file per task, and merged
+in chronological order so that line numbers run across the whole set.
+"""
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.lzma', '.zst')
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+_ROTATED = re.compile(r"^(?P<base>.+?)(?:[.-](?P<index>\d+))?(?P<ext>\.(?:gz|bz2|xz|lzma|zst))?$")
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_log(path: str, binary: bool = False) -> io.IOBase:
+    """Open a plain or compressed log file for streaming text (or byte) reads."""
+    if path.endswith('.gz'):
+        raw = gzip.open(path, 'rb')
+    elif path.endswith('.bz2'):
+        raw = bz2.open(path, 'rb')
+    elif path.endswith(('.xz', '.lzma')):
+        raw = lzma.open(path, 'rb')
+    elif path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst logs requires the 'zstandard' package")
+        raw = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    elif binary:
+        return open(path, 'rb')
+    else:
+        return open(path, 'r', encoding='utf-8', errors='ignore')
+    if binary:
+        return raw
+    return io.TextIOWrapper(raw, encoding='utf-8', errors='ignore')
+
+
+def _rotation_key(path: str) -> Optional[Tuple[str, int]]:
+    match = _ROTATED.match(os.path.basename(path))
+    if not match:
+        return None
+    index = match.group('index')
+    if index is not None and len(index) >= 8:
+        # Date-suffixed rotations (logrotate dateext) are ordered by mtime.
+        return None
+    # The live file has no index and is the newest; higher indexes are older.
+    return match.group('base'), -1 if index is None else int(index)
+
+
+def order_chronologically(paths: Sequence[str]) -> List[str]:
+    """Oldest first: by rotation index when the files share a base, else by mtime."""
+    keys = {path: _rotation_key(path) for path in paths}
+    bases = {key[0] for key in keys.values() if key is not None}
+    if len(bases) == 1 and all(key is not None for key in keys.values()):
+        return sorted(paths, key=lambda path: -keys[path][1])
+    return sorted(paths, key=lambda path: (os.path.getmtime(path), path))
+
+
+def resolve_log_files(spec: str, include_rotated: bool = False) -> List[str]:
+    """Expand a path, glob or rotation base name into existing log files."""
+    if _GLOB_CHARS.search(spec):
+        paths = [p for p in glob.glob(spec) if os.path.isfile(p)]
+    elif include_rotated:
+        rotated = glob.glob(glob.escape(spec) + '[.-][0-9]*')
+        paths = [p for p in rotated if os.path.isfile(p)]
+        if os.path.isfile(spec):
+            paths.append(spec)
+    else:
+        paths = [spec] if os.path.isfile(spec) else []
+    return order_chronologically(paths)
+
+
+def scan_file(path: str, scanner: LogScanner) -> ScanSummary:
+    """Scan one plain or compressed file; line numbers start at 1."""
+    with open_log(path) as file:
+        return scan_lines(scanner, file, ScanSummary())
+
+
+def _scan_file_task(args) -> ScanSummary:
+    return scan_file(*args)
+
+
+def scan_log_set(paths: Sequence[str], scanner: LogScanner,
+                 workers: Optional[int] = None) -> Tuple[ScanSummary, List[dict]]:
+    """Scan ``paths`` in order, decompressing separate files in parallel.
+
+    Returns the merged summary and, per file, the global line range it covers.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(path, scanner) for path in paths]
+    summary = ScanSummary()
+    files = []
+
+    def merge(path, file_summary):
+        files.append({"path": path, "first_line": summary.total_lines + 1,
+                      "lines": file_summary.total_lines})
+        summary.merge(file_summary)
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            merge(task[0], _scan_file_task(task))
+        return summary, files
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        # map() yields in submission order, so files are merged chronologically.
+        for path, file_summary in zip(paths, pool.map(_scan_file_task, tasks)):
+            merge(path, file_summary)
+    return summary, files
@@ -0,0 +1,201 @@
+"""
+Incremental Log State
+=====================
+
+Persists, per log file and pattern set, how far the log has been scanned
+(device, inode, byte offset, line count and the cumulative scan summary) so
+that the next scan only reads the bytes appended since.
+
+A replaced inode, a file smaller than the stored offset, or a changed head of
+the file (copytruncate followed by new writes) is treated as log rotation and
+triggers a full rescan. A trailing line without a newline is left for the next
+call, since the writer may still be appending to it.
+
+All logs share one state file. Updates hold an exclusive ``flock`` on a lock
+file next to it while they read, modify and replace it, so concurrent scans
+of different logs keep each other's offsets. Only the most frequent exception
+groups and error signatures are persisted, with shortened examples; the rest
+is counted as evicted.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from tools.log_parallel import scan_file_parallel
+from tools.log_scanner import LogScanner, ScanSummary, scan_lines
+
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "crew4ai", "log_offsets.json")
+
+# Bytes at the start of the log that are hashed to detect rewrites in place.
+HEAD_FINGERPRINT_BYTES = 4096
+
+# Most frequent exception groups / error signatures persisted per log, and
+# the stack lines kept in each persisted exception example.
+STATE_EXCEPTION_GROUPS = 100
+STATE_SIGNATURES = 200
+STATE_EXAMPLE_LINES = 10
+
+STATE_VERSION = 4
+
+
+class LogOffsetStore:
+    """JSON state file mapping a log/pattern key to its last scan position."""
+
+    def __init__(self, state_file: Optional[str] = None):
+        self.state_file = state_file or DEFAULT_STATE_FILE
+
+    def _load(self) -> dict:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            return {}
+        return state.get("logs", {})
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._load().get(key)
+
+    @contextmanager
+    def _locked(self):
+        with open(self.state_file + ".lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def put(self, key: str, entry: dict):
+        """Store ``entry`` under ``key``, replacing the state file atomically."""
+        directory = os.path.dirname(os.path.abspath(self.state_file))
+        os.makedirs(directory, exist_ok=True)
+        # Read under the lock, so entries other scans store meanwhile are kept
+        with self._locked():
+            logs = self._load()
+            logs[key] = entry
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".log_offsets.")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({"version": STATE_VERSION, "logs": logs}, f)
+                os.replace(tmp_path, self.state_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+def state_key(log_file_path: str, scanner: LogScanner) -> str:
+    """Counters are only reusable for the same file and scanner configuration."""
+    return f"{os.path.realpath(log_file_path)}|{scanner.fingerprint()}"
+
+
+def persisted_summary(summary: ScanSummary) -> dict:
+    """``summary.to_state()`` with exception groups and signatures capped."""
+    state = summary.to_state()
+    exceptions = state["exception_groups"]
+    kept = exceptions["top"][:STATE_EXCEPTION_GROUPS]
+    exceptions["evicted_events"] += sum(group["count"] for group in exceptions["top"][len(kept):])
+    exceptions["top"] = [dict(group, example=group["example"][:STATE_EXAMPLE_LINES]) for group in kept]
+    signatures = state["error_signatures"]
+    kept = signatures["top"][:STATE_SIGNATURES]
+    signatures["evicted_lines"] += sum(template["count"] for template in signatures["top"][len(kept):])
+    signatures["top"] = kept
+    return state
+
+
+def head_fingerprint(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def complete_end(f, start: int, size: int) -> int:
+    """Offset just past the last newline in [start, size), or ``start``."""
+    block = 64 * 1024
+    pos = size
+    while pos > start:
+        read_from = max(start, pos - block)
+        f.seek(read_from)
+        newline = f.read(pos - read_from).rfind(b"\n")
+        if newline != -1:
+            return read_from + newline + 1
+        pos = read_from
+    return start
+
+
+def _iter_lines(f, start: int, end: int):
+    remaining = end - start
+    if remaining <= 0:
+        return
+    f.seek(start)
+    for raw in f:
+        yield raw.decode('utf-8', 'ignore')
+        remaining -= len(raw)
+        if remaining <= 0:
+            break
+
+
+def rescan_reason(entry: Optional[dict], st: os.stat_result, f) -> Optional[str]:
+    """Why ``entry`` cannot be continued on the open file ``f``, or None."""
+    if entry is None:
+        return "no previous state"
+    if entry.get("inode") != st.st_ino or entry.get("device") != st.st_dev:
+        return "log file replaced (inode changed)"
+    if st.st_size < entry.get("offset", 0):
+        return "log file truncated"
+    if head_fingerprint(f, entry.get("head_length", 0)) != entry.get("head_hash"):
+        return "log file rewritten"
+    return None
+
+
+def scan_incremental(log_file_path: str, scanner: LogScanner,
+                     store: Optional[LogOffsetStore] = None, parallel: bool = False,
+                     workers: Optional[int] = None) -> Tuple[ScanSummary, dict]:
+    """Scan only the bytes appended since the last call.
+
+    Returns the cumulative summary for the whole file and a dict describing
+    what was scanned this time.
+    """
+    store = store or LogOffsetStore()
+    key = state_key(log_file_path, scanner)
+    entry = store.get(key)
+
+    with open(log_file_path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        reason = rescan_reason(entry, st, f)
+        if reason is None:
+            summary = ScanSummary.from_dict(entry["summary"])
+            start = entry["offset"]
+        else:
+            summary = ScanSummary()
+            start = 0
+        end = complete_end(f, start, st.st_size)
+
+        if parallel:
+            summary.merge(scan_file_parallel(log_file_path, scanner, workers,
+                                             start=start, end=end))
+        else:
+            scan_lines(scanner, _iter_lines(f, start, end), summary)
+
+        head_length = min(end, HEAD_FINGERPRINT_BYTES)
+        store.put(key, {
+            "inode": st.st_ino,
+            "device": st.st_dev,
+            "offset": end,
+            "line_count": summary.total_lines,
+            "head_length": head_length,
+            "head_hash": head_fingerprint(f, head_length),
+            "summary": persisted_summary(summary)
+        })
+
+    return summary, {
+        "full_rescan": reason is not None,
+        "rescan_reason": reason,
+        "scanned_from_byte": start,
+        "bytes_scanned": end - start
+    }
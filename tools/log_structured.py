@@ -0,0 +1,411 @@
+"""
+Structured Log Analysis
+=======================
+
+Field-level filtering and aggregation over JSON-lines logs.
+
+Lines are handled as bytes: a line is only parsed if it starts with ``{`` and
+contains the literal bytes of every string equality filter value, so most
+non-matching lines are rejected without JSON decoding. ``orjson`` is used when
+it is installed and ``json`` otherwise.
+
+Aggregations are bounded and mergeable across parallel chunks: value counts
+for ``group_by`` fields are pruned to the most frequent values, and numeric
+fields are summarised with a relative-error quantile sketch (DDSketch-style
+log buckets) that reports p50/p90/p99.
+"""
+import json
+import math
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from tools.log_aggregation import clip_content
+from tools.log_parallel import DEFAULT_CHUNK_SIZE, split_ranges
+from tools.log_sources import is_compressed, open_log
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Lines looked at when deciding whether a file is JSON lines.
+DETECT_LINES = 20
+
+_FILTER = re.compile(r"^\s*([\w.@\-]+)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$")
+# Characters every JSON encoder writes unescaped
+_VERBATIM = re.compile(r"[A-Za-z0-9_ .,:;@#%=+\-]+")
+_PYTHON_LITERALS = ("True", "False", "None")
+_MISSING = object()
+
+
+def looks_like_jsonl(path: str) -> bool:
+    """True if most of the first non-empty lines of ``path`` are JSON objects."""
+    seen = parsed = 0
+    with open_log(path, binary=True) as f:
+        for raw in f:
+            raw = raw.strip()
+            if not raw:
+                continue
+            seen += 1
+            if raw[:1] == b"{":
+                try:
+                    parsed += isinstance(_loads(raw), dict)
+                except ValueError:
+                    pass
+            if seen >= DETECT_LINES:
+                break
+    return seen > 0 and parsed * 2 > seen
+
+
+def get_field(record: dict, path: str) -> Any:
+    """Look up a dotted field path (``http.status``) in a record."""
+    value = record.get(path, _MISSING)
+    if value is not _MISSING or "." not in path:
+        return value
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return _MISSING
+        value = value.get(part, _MISSING)
+        if value is _MISSING:
+            break
+    return value
+
+
+def _required_bytes(value: str) -> Optional[bytes]:
+    """Bytes a JSON line must contain for a string field to equal ``value``.
+
+    Non-ASCII characters may be written raw or ``\\u``-escaped, so only the
+    longest run of characters every encoder writes verbatim is required.
+    Numbers have many spellings and the Python spellings of booleans and null
+    match JSON ``true``/``false``/``null``, so those values have no such bytes.
+    """
+    if _as_number(value) is not None or value in _PYTHON_LITERALS:
+        return None
+    runs = _VERBATIM.findall(value)
+    return max(runs, key=len).encode('ascii') if runs else None
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class FieldFilter:
+    """One ``field<op>value`` condition, e.g. ``level=error`` or ``latency_ms>=500``."""
+
+    def __init__(self, expression: str):
+        match = _FILTER.match(expression)
+        if not match:
+            raise ValueError(f"Invalid filter expression: {expression!r}")
+        self.field, self.op, self.value = match.groups()
+        self.number = _as_number(self.value)
+        self.regex = re.compile(self.value) if self.op == "~" else None
+        if self.op in (">", ">=", "<", "<=") and self.number is None:
+            raise ValueError(f"Filter {expression!r} compares against a non-number")
+        # Bytes every matching line must contain, for the pre-parse check.
+        self.required = None
+        if self.op == "=" and self.value:
+            self.required = _required_bytes(self.value)
+
+    def matches(self, record: dict) -> bool:
+        value = get_field(record, self.field)
+        if self.op == "!=":
+            return value is _MISSING or not self._equals(value)
+        if value is _MISSING:
+            return False
+        if self.op == "=":
+            return self._equals(value)
+        if self.op == "~":
+            return self.regex.search(str(value)) is not None
+        number = _as_number(value)
+        if number is None:
+            return False
+        if self.op == ">":
+            return number > self.number
+        if self.op == ">=":
+            return number >= self.number
+        if self.op == "<":
+            return number < self.number
+        return number <= self.number
+
+    def _equals(self, value: Any) -> bool:
+        if self.number is not None and not isinstance(value, str):
+            number = _as_number(value)
+            return number is not None and number == self.number
+        if isinstance(value, str):
+            return value == self.value
+        # JSON true/false/null match both their JSON and their Python spelling
+        return json.dumps(value) == self.value or str(value) == self.value
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch with logarithmic buckets."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > 1e-12:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -1e-12:
+            key = math.ceil(math.log(-value) / self._log_gamma)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero += 1
+
+    def merge(self, other: "QuantileSketch"):
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(self.min, -self._bucket_value(key))
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self.max, self._bucket_value(key))
+        return self.max
+
+    def to_dict(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.total / self.count, 4),
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99)
+        }
+
+
+class ValueCounter:
+    """Value counts pruned to the most frequent ``capacity`` values."""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.pruned = False
+
+    def add(self, value: str, count: int = 1):
+        self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        top = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+        self.counts = dict(top)
+        self.pruned = True
+
+    def merge(self, other: "ValueCounter"):
+        for value, count in other.counts.items():
+            self.add(value, count)
+        self.pruned = self.pruned or other.pruned
+
+    def to_dict(self, limit: int = 10) -> dict:
+        top = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return {
+            "distinct": len(self.counts),
+            "approximate": self.pruned,
+            "top": [{"value": value, "count": count} for value, count in top]
+        }
+
+
+class StructuredQuery:
+    """Filters plus the fields to aggregate, applied to JSON-lines records."""
+
+    def __init__(self, filters: Sequence[str] = (), group_by: Sequence[str] = (),
+                 numeric_fields: Sequence[str] = (), max_examples: int = 10):
+        self.filters = [FieldFilter(expression) for expression in filters]
+        self.group_by = list(group_by)
+        self.numeric_fields = list(numeric_fields)
+        self.max_examples = max_examples
+        self.required = [f.required for f in self.filters if f.required]
+
+
+class StructuredSummary:
+    """Mergeable result of running a StructuredQuery over part of a log."""
+
+    def __init__(self, query: StructuredQuery):
+        self.total_lines = 0
+        self.json_lines = 0
+        self.invalid_lines = 0
+        self.matched_lines = 0
+        self.groups = {field: ValueCounter() for field in query.group_by}
+        self.numeric = {field: QuantileSketch() for field in query.numeric_fields}
+        self.examples: List[dict] = []
+        self.max_examples = query.max_examples
+
+    def merge(self, other: "StructuredSummary"):
+        offset = self.total_lines
+        for example in other.examples[:max(0, self.max_examples - len(self.examples))]:
+            self.examples.append(dict(example, line_number=example["line_number"] + offset))
+        self.total_lines += other.total_lines
+        self.json_lines += other.json_lines
+        self.invalid_lines += other.invalid_lines
+        self.matched_lines += other.matched_lines
+        for field, counter in other.groups.items():
+            self.groups[field].merge(counter)
+        for field, sketch in other.numeric.items():
+            self.numeric[field].merge(sketch)
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": "structured",
+            "total_lines": self.total_lines,
+            "json_lines": self.json_lines,
+            "invalid_lines": self.invalid_lines,
+            "matched_lines": self.matched_lines,
+            "group_by": {field: counter.to_dict() for field, counter in self.groups.items()},
+            "numeric_fields": {field: sketch.to_dict() for field, sketch in self.numeric.items()},
+            "examples": self.examples
+        }
+
+
+def scan_records(query: StructuredQuery, lines, summary: StructuredSummary) -> StructuredSummary:
+    """Run ``query`` over an iterable of raw byte lines."""
+    required = query.required
+    filters = query.filters
+    line_number = summary.total_lines
+    for line_number, raw in enumerate(lines, line_number + 1):
+        if raw[:1] != b"{":
+            stripped = raw.lstrip()
+            if stripped[:1] != b"{":
+                if stripped:
+                    summary.invalid_lines += 1
+                continue
+        # Cheap byte check before paying for the JSON decode.
+        if required and not all(needle in raw for needle in required):
+            summary.json_lines += 1
+            continue
+        try:
+            record = _loads(raw)
+        except ValueError:
+            summary.invalid_lines += 1
+            continue
+        summary.json_lines += 1
+        if not isinstance(record, dict) or not all(f.matches(record) for f in filters):
+            continue
+
+        summary.matched_lines += 1
+        for field, counter in summary.groups.items():
+            value = get_field(record, field)
+            if value is not _MISSING:
+                counter.add(value if isinstance(value, str) else json.dumps(value))
+        for field, sketch in summary.numeric.items():
+            number = _as_number(get_field(record, field))
+            if number is not None and math.isfinite(number):
+                sketch.add(number)
+        if len(summary.examples) < summary.max_examples:
+            summary.examples.append({
+                "line_number": line_number,
+                "content": clip_content(raw.decode('utf-8', 'ignore'))
+            })
+    summary.total_lines = line_number
+    return summary
+
+
+def _iter_range(mm: mmap.mmap, start: int, end: int):
+    mm.seek(start)
+    readline = mm.readline
+    while mm.tell() < end:
+        yield readline()
+
+
+def scan_structured_range(path: str, start: int, end: int,
+                          query: StructuredQuery) -> StructuredSummary:
+    summary = StructuredSummary(query)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        scan_records(query, _iter_range(mm, start, end), summary)
+    return summary
+
+
+def _scan_structured_task(args) -> StructuredSummary:
+    return scan_structured_range(*args)
+
+
+def _scan_structured_stream(path: str, query: StructuredQuery) -> StructuredSummary:
+    with open_log(path, binary=True) as f:
+        return scan_records(query, f, StructuredSummary(query))
+
+
+def _scan_structured_stream_task(args) -> StructuredSummary:
+    return _scan_structured_stream(*args)
+
+
+def scan_structured_files(paths: Sequence[str], query: StructuredQuery,
+                          workers: Optional[int] = None) -> StructuredSummary:
+    """Run ``query`` over a rotated/compressed set, one file per worker, in order."""
+    workers = workers or os.cpu_count() or 1
+    summary = StructuredSummary(query)
+    tasks = [(path, query) for path in paths]
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            summary.merge(_scan_structured_stream_task(task))
+        return summary
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for file_summary in pool.map(_scan_structured_stream_task, tasks):
+            summary.merge(file_summary)
+    return summary
+
+
+def scan_structured_file(path: str, query: StructuredQuery, workers: Optional[int] = 1,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> StructuredSummary:
+    """Run ``query`` over a JSON-lines file, in parallel when ``workers`` > 1."""
+    workers = workers or os.cpu_count() or 1
+    if is_compressed(path) or workers == 1:
+        return _scan_structured_stream(path, query)
+    summary = StructuredSummary(query)
+    if os.path.getsize(path) == 0:
+        return summary
+
+    tasks = [(path, start, end, query) for start, end in split_ranges(path, chunk_size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for chunk_summary in pool.map(_scan_structured_task, tasks):
+            summary.merge(chunk_summary)
+    return summary
@@ -0,0 +1,170 @@
+"""
+Log Template Miner
+==================
+
+An online, Drain-style log template miner used to collapse repeated log lines
+into signatures.
+
+Each line is first masked: timestamps, UUIDs, IP addresses, hex values and
+numbers are replaced by placeholders in a single regex pass. The masked tokens
+are then grouped by token count and first token, and inside a group a line
+joins the most similar template if enough positions agree; differing positions
+become ``<*>``. The template table is bounded: when it overflows, the least
+frequent templates are evicted in a batch and their lines are only counted.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+WILDCARD = "<*>"
+
+_MASKS = [
+    ("TS", r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"),
+    ("UUID", r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d{1,5})?\b"),
+    ("HEX", r"\b0[xX][0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"),
+    ("NUM", r"(?<!\w)[-+]?\d+(?:\.\d+)?"),
+]
+_MASK_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in _MASKS))
+_PLACEHOLDERS = {name: f"<{name}>" for name, _ in _MASKS}
+
+
+def mask_line(line: str) -> str:
+    """Replace variable fields (timestamps, ids, addresses, numbers) by placeholders."""
+    return _MASK_RE.sub(lambda m: _PLACEHOLDERS[m.lastgroup], line)
+
+
+class _Cluster:
+    __slots__ = ("tokens", "count", "first_seen_line", "last_seen_line", "example")
+
+    def __init__(self, tokens: List[str], count: int, first_seen_line: int,
+                 last_seen_line: int, example: str):
+        self.tokens = tokens
+        self.count = count
+        self.first_seen_line = first_seen_line
+        self.last_seen_line = last_seen_line
+        self.example = example
+
+    def similarity(self, tokens: List[str]) -> float:
+        same = sum(1 for mine, theirs in zip(self.tokens, tokens)
+                   if mine == theirs or mine == WILDCARD)
+        return same / len(tokens)
+
+    def absorb(self, tokens: List[str]):
+        for i, (mine, theirs) in enumerate(zip(self.tokens, tokens)):
+            if mine != theirs and mine != WILDCARD:
+                self.tokens[i] = WILDCARD
+
+    def to_dict(self) -> dict:
+        return {
+            "template": " ".join(self.tokens),
+            "count": self.count,
+            "first_seen_line": self.first_seen_line,
+            "last_seen_line": self.last_seen_line,
+            "example": self.example
+        }
+
+
+class TemplateMiner:
+    """Group log lines into templates with counts and one example each."""
+
+    def __init__(self, similarity_threshold: float = 0.5, max_templates: int = 1000,
+                 max_group_size: int = 100):
+        self.similarity_threshold = similarity_threshold
+        self.max_templates = max_templates
+        self.max_group_size = max_group_size
+        # (token count, first token) -> clusters, newest last
+        self._groups: Dict[Tuple[int, str], List[_Cluster]] = {}
+        self._size = 0
+        self.evicted_lines = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, line_number: int, line: str, count: int = 1):
+        """Add one line (or a pre-aggregated template with ``count``)."""
+        tokens = mask_line(line).split()
+        if not tokens:
+            return
+        self._add_tokens(tokens, count, line_number, line_number, line)
+
+    def _add_tokens(self, tokens: List[str], count: int, first_seen_line: int,
+                    last_seen_line: int, example: str):
+        key = (len(tokens), tokens[0])
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = []
+
+        best, best_similarity = None, self.similarity_threshold
+        for cluster in reversed(group):
+            similarity = cluster.similarity(tokens)
+            if similarity >= best_similarity:
+                best, best_similarity = cluster, similarity
+                if similarity == 1.0:
+                    break
+
+        if best is not None:
+            best.absorb(tokens)
+            best.count += count
+            best.first_seen_line = min(best.first_seen_line, first_seen_line)
+            best.last_seen_line = max(best.last_seen_line, last_seen_line)
+            return
+
+        group.append(_Cluster(list(tokens), count, first_seen_line, last_seen_line, example))
+        self._size += 1
+        if len(group) > self.max_group_size:
+            self._evict(group, len(group) - self.max_group_size)
+        if self._size > self.max_templates:
+            self._evict_global()
+
+    def _evict(self, group: List[_Cluster], n: int):
+        group.sort(key=lambda cluster: cluster.count, reverse=True)
+        for cluster in group[-n:]:
+            self.evicted_lines += cluster.count
+        del group[-n:]
+        self._size -= n
+
+    def _evict_global(self):
+        """Drop the least frequent tenth of the table in one batch."""
+        clusters = [c for group in self._groups.values() for c in group]
+        clusters.sort(key=lambda cluster: cluster.count)
+        doomed = {id(c) for c in clusters[:max(1, self.max_templates // 10)]}
+        for key in list(self._groups):
+            group = self._groups[key]
+            kept = [c for c in group if id(c) not in doomed]
+            for c in group:
+                if id(c) in doomed:
+                    self.evicted_lines += c.count
+            if kept:
+                self._groups[key] = kept
+            else:
+                del self._groups[key]
+        self._size = sum(len(group) for group in self._groups.values())
+
+    def merge(self, other: "TemplateMiner", line_offset: int = 0):
+        """Fold the templates of the section that follows this one into this miner."""
+        for cluster in other.clusters():
+            self._add_tokens(list(cluster.tokens), cluster.count,
+                             cluster.first_seen_line + line_offset,
+                             cluster.last_seen_line + line_offset, cluster.example)
+        self.evicted_lines += other.evicted_lines
+
+    def clusters(self) -> List[_Cluster]:
+        return [c for group in self._groups.values() for c in group]
+
+    def top(self, limit: Optional[int] = 20) -> List[dict]:
+        clusters = sorted(self.clusters(), key=lambda c: (-c.count, c.first_seen_line))
+        if limit is not None:
+            clusters = clusters[:limit]
+        return [c.to_dict() for c in clusters]
+
+    @classmethod
+    def from_dicts(cls, templates: List[dict], evicted_lines: int = 0) -> "TemplateMiner":
+        """Rebuild a miner from the output of ``top``."""
+        miner = cls()
+        for t in templates:
+            tokens = t["template"].split()
+            if tokens:
+                miner._add_tokens(tokens, t["count"], t["first_seen_line"],
+                                  t["last_seen_line"], t["example"])
+        miner.evicted_lines = evicted_lines
+        return miner
@@ -0,0 +1,242 @@
+"""
+Log Timeline
+============
+
+Timestamp extraction and time-window histograms for log matches.
+
+``TimestampParser`` knows a fixed set of precompiled formats (ISO 8601,
+syslog, nginx/apache access logs, epoch seconds/milliseconds) and locks onto
+the one that matches the first lines of the log, so that every later line is
+tried against a single regex.
+
+``Timeline`` buckets per-series counts into fixed-width windows stored in
+``array`` objects. When a series would span more than ``max_windows`` windows
+the width is doubled and neighbouring windows are folded together, so memory
+stays bounded for any time range. Spike detection compares each window with
+the rolling mean and deviation of the windows before it.
+"""
+import calendar
+import math
+import re
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+_MONTHS = {name: i for i, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
+_FORMATS = [
+    ("nginx", re.compile(
+        r"\[(\d{2})/([A-Z][a-z]{2})/(\d{4}):(\d{2}):(\d{2}):(\d{2}) ([+-]\d{4})\]")),
+    ("iso8601", re.compile(
+        r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d+))?(Z|[+-]\d{2}:?\d{2})?")),
+    ("syslog", re.compile(r"^([A-Z][a-z]{2}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})")),
+    ("epoch", re.compile(r"^\[?(\d{10}|\d{13})(?:\.(\d+))?\b")),
+]
+
+# Number of lines a format has to match before the parser locks onto it.
+DETECT_LINES = 5
+
+
+def _offset_seconds(tz: Optional[str]) -> int:
+    if not tz or tz == "Z":
+        return 0
+    sign = -1 if tz[0] == "-" else 1
+    digits = tz[1:].replace(":", "")
+    return sign * (int(digits[:2]) * 3600 + int(digits[2:4]) * 60)
+
+
+class TimestampParser:
+    """Extract epoch seconds from log lines, auto-detecting the format."""
+
+    def __init__(self):
+        self.format: Optional[str] = None
+        self._regex = None
+        self._hits = {name: 0 for name, _ in _FORMATS}
+        self._day_cache: Dict[tuple, int] = {}
+        self._year = time.gmtime().tm_year
+
+    def _day_start(self, year: int, month: int, day: int) -> int:
+        key = (year, month, day)
+        start = self._day_cache.get(key)
+        if start is None:
+            start = self._day_cache[key] = calendar.timegm((year, month, day, 0, 0, 0))
+        return start
+
+    def _convert(self, name: str, g: tuple) -> float:
+        if name == "iso8601":
+            seconds = (self._day_start(int(g[0]), int(g[1]), int(g[2]))
+                       + int(g[3]) * 3600 + int(g[4]) * 60 + int(g[5]))
+            if g[6]:
+                seconds += float("0." + g[6])
+            return seconds - _offset_seconds(g[7])
+        if name == "nginx":
+            seconds = (self._day_start(int(g[2]), _MONTHS.get(g[1], 1), int(g[0]))
+                       + int(g[3]) * 3600 + int(g[4]) * 60 + int(g[5]))
+            return seconds - _offset_seconds(g[6])
+        if name == "syslog":
+            # Syslog carries no year or zone; assume the current year in UTC.
+            return (self._day_start(self._year, _MONTHS.get(g[0], 1), int(g[1]))
+                    + int(g[2]) * 3600 + int(g[3]) * 60 + int(g[4]))
+        value = int(g[0])
+        return value / 1000.0 if len(g[0]) == 13 else float(value)
+
+    def use_format(self, name: Optional[str]):
+        """Lock onto a known format, e.g. one detected in an earlier scan."""
+        regexes = dict(_FORMATS)
+        if name in regexes:
+            self.format, self._regex = name, regexes[name]
+
+    def parse(self, line: str) -> Optional[float]:
+        """Return the timestamp of ``line`` in epoch seconds, or None."""
+        if self._regex is not None:
+            match = self._regex.search(line)
+            if match is None:
+                return None
+            try:
+                return self._convert(self.format, match.groups())
+            except (ValueError, OverflowError):
+                return None
+        for name, regex in _FORMATS:
+            match = regex.search(line)
+            if match:
+                try:
+                    value = self._convert(name, match.groups())
+                except (ValueError, OverflowError):
+                    continue
+                self._hits[name] += 1
+                if self._hits[name] >= DETECT_LINES:
+                    self.format, self._regex = name, regex
+                return value
+        return None
+
+
+class Timeline:
+    """Per-series counts in fixed-width, array-backed time windows."""
+
+    def __init__(self, window_seconds: int = 10, max_windows: int = 8640):
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        # series -> (index of the first window, counts)
+        self._series: Dict[str, list] = {}
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    def add(self, series: str, timestamp: float, count: int = 1):
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+        self._add_window(series, int(timestamp // self.window_seconds), count)
+
+    def _add_window(self, series: str, index: int, count: int):
+        entry = self._series.get(series)
+        if entry is None:
+            self._series[series] = [index, array('L', [count])]
+            return
+        start, counts = entry
+        # Coarsen before growing, so that an outlier timestamp (a line dated
+        # 1970, a misdetected epoch) never allocates more than max_windows.
+        while max(index, start + len(counts) - 1) - min(index, start) >= self.max_windows:
+            self._coarsen()
+            index //= 2
+            start, counts = entry
+        if index < start:
+            counts[0:0] = array('L', bytes(counts.itemsize * (start - index)))
+            entry[0] = start = index
+        offset = index - start
+        if offset >= len(counts):
+            counts.extend(array('L', bytes(counts.itemsize * (offset + 1 - len(counts)))))
+        counts[offset] += count
+
+    def _coarsen(self):
+        """Double the window width, folding neighbouring windows together."""
+        for entry in self._series.values():
+            start, counts = entry
+            new_start = start // 2
+            folded = array('L', bytes(counts.itemsize * ((start + len(counts) - 1) // 2 - new_start + 1)))
+            for offset, value in enumerate(counts):
+                if value:
+                    folded[(start + offset) // 2 - new_start] += value
+            entry[0], entry[1] = new_start, folded
+        self.window_seconds *= 2
+        if any(len(counts) > self.max_windows for _, counts in self._series.values()):
+            self._coarsen()
+
+    def merge(self, other: "Timeline"):
+        while other.window_seconds > self.window_seconds:
+            self._coarsen()
+        for series, (start, counts) in other._series.items():
+            for offset, value in enumerate(counts):
+                if value:
+                    # Re-read the width each time: adding may coarsen this timeline.
+                    index = (start + offset) * other.window_seconds // self.window_seconds
+                    self._add_window(series, index, value)
+        for timestamp in (other.first_timestamp, other.last_timestamp):
+            if timestamp is not None:
+                if self.first_timestamp is None or timestamp < self.first_timestamp:
+                    self.first_timestamp = timestamp
+                if self.last_timestamp is None or timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+
+    def anomalies(self, baseline_windows: int = 30, threshold: float = 3.0,
+                  min_count: int = 5, limit: int = 10) -> List[dict]:
+        """Windows whose count is ``threshold`` deviations above the rolling baseline."""
+        found = []
+        for series, (start, counts) in self._series.items():
+            total = total_sq = 0.0
+            for offset, value in enumerate(counts):
+                n = min(offset, baseline_windows)
+                if n and value >= min_count:
+                    mean = total / n
+                    deviation = math.sqrt(max(0.0, total_sq / n - mean * mean))
+                    # Poisson floor so a perfectly flat baseline does not divide by 0.
+                    score = (value - mean) / max(deviation, math.sqrt(mean), 1.0)
+                    if score >= threshold:
+                        found.append((score, series, start + offset, value, mean))
+                total += value
+                total_sq += value * value
+                if offset >= baseline_windows:
+                    old = counts[offset - baseline_windows]
+                    total -= old
+                    total_sq -= old * old
+        found.sort(reverse=True)
+        return [{
+            "series": series,
+            "window_start": _iso(index * self.window_seconds),
+            "count": value,
+            "baseline_mean": round(mean, 2),
+            "score": round(score, 2)
+        } for score, series, index, value, mean in found[:limit]]
+
+    def to_dict(self) -> dict:
+        return {
+            "window_seconds": self.window_seconds,
+            "first_timestamp": _iso(self.first_timestamp),
+            "last_timestamp": _iso(self.last_timestamp),
+            "anomalous_windows": self.anomalies()
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "window_seconds": self.window_seconds,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "series": {name: [start, counts.tolist()] for name, (start, counts) in self._series.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Timeline":
+        timeline = cls(state.get("window_seconds", 10))
+        timeline.first_timestamp = state.get("first_timestamp")
+        timeline.last_timestamp = state.get("last_timestamp")
+        timeline._series = {name: [start, array('L', counts)]
+                            for name, (start, counts) in state.get("series", {}).items()}
+        return timeline
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,187 @@
+"""
+Metrics Exporter
+================
+
+Serves the metrics sampler's latest values and the tools' own call metrics in
+Prometheus/OpenMetrics text format, either from a local HTTP endpoint or as a
+node_exporter textfile-collector file.
+
+Sampler series become gauges: ``disk_dev.sda.read_iops`` is exported as
+``crew4ai_disk_dev_read_iops{device="sda"}`` and ``net_dev.eth0.*`` series get
+an ``interface`` label. Rendering is cached and only repeated when a new
+sample was taken or a tool call was recorded, so frequent scrapes cost a
+dictionary lookup.
+"""
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from tools.metrics_sampler import MetricsSampler, get_sampler
+from tools.tool_metrics import LATENCY_BUCKETS, ToolMetrics, tool_metrics
+
+PREFIX = "crew4ai_"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9464
+
+DEFAULT_TEXTFILE_INTERVAL = 15.0
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Per-device series and the label their device name becomes
+_DEVICE_LABELS = {"disk_dev.": "device", "net_dev.": "interface"}
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(name: str) -> str:
+    return PREFIX + _INVALID_NAME_CHARS.sub("_", name)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def _sampler_families(values: Dict[str, float]) -> Dict[str, List[Tuple[str, float]]]:
+    """Group series into metric families of ``(labels, value)`` samples."""
+    families: Dict[str, List[Tuple[str, float]]] = {}
+    for name, value in sorted(values.items()):
+        labels = ""
+        for prefix, label in _DEVICE_LABELS.items():
+            if name.startswith(prefix):
+                device, field = name[len(prefix):].rsplit(".", 1)
+                name = prefix + field
+                labels = f'{label}="{_label_value(device)}"'
+                break
+        families.setdefault(_metric_name(name), []).append((labels, value))
+    return families
+
+
+def render(values: Dict[str, float], tools: list, openmetrics: bool = True) -> str:
+    """Exposition text for sampler ``values`` and ``ToolMetrics.snapshot()`` rows."""
+    lines = []
+    for family, samples in _sampler_families(values).items():
+        lines.append(f"# TYPE {family} gauge")
+        for labels, value in samples:
+            lines.append(f"{family}{{{labels}}} {_format_value(value)}" if labels
+                         else f"{family} {_format_value(value)}")
+
+    if tools:
+        # OpenMetrics names the counter family without the _total suffix
+        for counter, column, help_text in (("tool_calls", 1, "Tool calls"),
+                                           ("tool_errors", 2, "Tool calls that failed")):
+            family = PREFIX + counter
+            lines.append(f"# HELP {family if openmetrics else family + '_total'} {help_text}.")
+            lines.append(f"# TYPE {family if openmetrics else family + '_total'} counter")
+            for row in tools:
+                lines.append(f'{family}_total{{tool="{_label_value(row[0])}"}} {row[column]}')
+        family = PREFIX + "tool_latency_seconds"
+        lines.append(f"# HELP {family} Tool call latency.")
+        lines.append(f"# TYPE {family} histogram")
+        for tool, calls, _, buckets, latency_sum in tools:
+            tool = _label_value(tool)
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{family}_bucket{{tool="{tool}",le="{le}"}} {count}')
+            lines.append(f'{family}_count{{tool="{tool}"}} {calls}')
+            lines.append(f'{family}_sum{{tool="{tool}"}} {latency_sum!r}')
+
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Renders the exposition text, re-rendering only when the inputs changed."""
+
+    def __init__(self, sampler: Optional[MetricsSampler] = None, tools: Optional[ToolMetrics] = None):
+        self._sampler = sampler
+        self.tools = tools if tools is not None else tool_metrics
+        self._cache: Dict[bool, Tuple[tuple, bytes]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sampler(self) -> MetricsSampler:
+        return self._sampler if self._sampler is not None else get_sampler()
+
+    def render(self, openmetrics: bool = True) -> bytes:
+        sampler = self.sampler
+        key = (sampler.last_sample_time(), self.tools.version)
+        with self._lock:
+            cached = self._cache.get(openmetrics)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            body = render(sampler.latest(), self.tools.snapshot(), openmetrics).encode()
+            self._cache[openmetrics] = (key, body)
+            return body
+
+    def write_textfile(self, path: str):
+        """Atomically write the textfile-collector file (Prometheus text format)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.render(openmetrics=False))
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class _Handler(BaseHTTPRequestHandler):
+    exporter: MetricsExporter = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.exporter.render(openmetrics)
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown the crew's own output
+        pass
+
+
+def start_http_server(port: int = DEFAULT_PORT, host: str = DEFAULT_HOST,
+                      exporter: Optional[MetricsExporter] = None) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread; returns the server (``shutdown()`` stops it)."""
+    handler = type("MetricsHandler", (_Handler,), {"exporter": exporter or MetricsExporter()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+def start_textfile_writer(path: str, interval: float = DEFAULT_TEXTFILE_INTERVAL,
+                          exporter: Optional[MetricsExporter] = None) -> threading.Event:
+    """Rewrite ``path`` every ``interval`` seconds; set the returned event to stop."""
+    exporter = exporter or MetricsExporter()
+    stopped = threading.Event()
+
+    def loop():
+        while True:
+            try:
+                exporter.write_textfile(path)
+            except OSError:
+                # The next round retries, e.g. once the directory exists
+                pass
+            if stopped.wait(interval):
+                break
+
+    threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+    return stopped
@@ -0,0 +1,473 @@
+"""
+Metrics Sampler
+===============
+
+A background thread that samples system metrics at a fixed interval into
+fixed-size, ``array``-backed ring buffers, so that the System Monitor Tool
+can answer from the latest sample without blocking and report trends
+(min/max/avg/p95) over recent windows.
+
+Each collector returns a flat ``{series name: value}`` dict; counters are
+turned into per-second rates from the delta to the previous sample. Per-device
+series are named ``disk_dev.<disk>.<field>`` and ``net_dev.<nic>.<field>``;
+the current cgroup's series are named ``cgroup.<field>``. Cumulative counters
+are also reported as ``totals.<name>``; only their latest values are kept, so
+a snapshot needs no extra reads of the same sources. A series that has
+been missing for a whole buffer (a removed veth interface or disk) is
+dropped. Every sample is also fed to an online anomaly detector.
+The sampler is a process-wide singleton started lazily by ``get_sampler``.
+"""
+import math
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+from tools.anomaly_detector import AnomalyDetector
+from tools.cgroup_metrics import cgroup_path, cgroup_series, read_cgroup
+
+DEFAULT_INTERVAL = 1.0
+
+# Ten minutes of history at the default interval.
+DEFAULT_CAPACITY = 600
+
+# The first sample after the baseline comes quickly so the first caller does
+# not wait a full interval.
+FIRST_SAMPLE_DELAY = 0.1
+
+# Collector values under this prefix are cumulative counters: the latest one
+# is kept, without history or anomaly detection.
+TOTALS_PREFIX = "totals."
+
+Collector = Callable[[float], Dict[str, float]]
+
+
+class RingBuffer:
+    """Fixed-capacity float series; the oldest value is overwritten when full."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = array('d', [math.nan]) * capacity
+        self._next = 0
+        self._size = 0
+        # Consecutive NaN values at the end
+        self.missing = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self.missing = self.missing + 1 if math.isnan(value) else 0
+
+    def latest(self) -> float:
+        return self._data[self._next - 1] if self._size else math.nan
+
+    def last(self, n: int) -> List[float]:
+        """The last ``n`` values, oldest first."""
+        n = min(n, self._size)
+        if n <= 0:
+            return []
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].tolist()
+        return (self._data[start:] + self._data[:self._next]).tolist()
+
+
+class CounterRates:
+    """Per-second rates of monotonically increasing counters."""
+
+    def __init__(self):
+        self._previous: Dict[str, float] = {}
+        self._time: Optional[float] = None
+
+    def update(self, counters: Dict[str, float], now: float) -> Dict[str, float]:
+        rates = {}
+        if self._time is not None and now > self._time:
+            elapsed = now - self._time
+            for name, value in counters.items():
+                previous = self._previous.get(name)
+                # A counter that went backwards was reset; skip one sample.
+                if previous is not None and value >= previous:
+                    rates[name] = (value - previous) / elapsed
+        self._previous, self._time = counters, now
+        return rates
+
+
+class _CpuCollector:
+    def __init__(self):
+        self._previous = None
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        times = psutil.cpu_times()
+        # Guest time is already included in user/nice time.
+        total = sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+        iowait = getattr(times, 'iowait', 0.0)
+        idle = times.idle + iowait
+        values = {}
+        if hasattr(os, 'getloadavg'):
+            values["cpu.load1"] = os.getloadavg()[0]
+        if self._previous is not None:
+            elapsed = total - self._previous[0]
+            if elapsed > 0:
+                values["cpu.percent"] = 100.0 * max(0.0, elapsed - (idle - self._previous[1])) / elapsed
+                values["cpu.iowait_percent"] = 100.0 * max(0.0, iowait - self._previous[2]) / elapsed
+        self._previous = (total, idle, iowait)
+        return values
+
+
+def _collect_memory(now: float) -> Dict[str, float]:
+    memory = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    return {
+        "memory.percent": memory.percent,
+        "memory.total_bytes": memory.total,
+        "memory.available_bytes": memory.available,
+        "memory.used_bytes": memory.used,
+        "memory.free_bytes": memory.free,
+        "swap.percent": swap.percent,
+        "swap.total_bytes": swap.total,
+        "swap.used_bytes": swap.used,
+        "swap.free_bytes": swap.free
+    }
+
+
+class _DiskTotalsCollector:
+    def __init__(self):
+        self._rates = CounterRates()
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        io = psutil.disk_io_counters()
+        if io is None:
+            return {}
+        return dict(self._rates.update({
+            "disk.read_iops": io.read_count,
+            "disk.write_iops": io.write_count,
+            "disk.read_bytes_per_sec": io.read_bytes,
+            "disk.write_bytes_per_sec": io.write_bytes
+        }, now), **{
+            TOTALS_PREFIX + "disk.read_count": io.read_count,
+            TOTALS_PREFIX + "disk.write_count": io.write_count,
+            TOTALS_PREFIX + "disk.read_bytes": io.read_bytes,
+            TOTALS_PREFIX + "disk.write_bytes": io.write_bytes
+        })
+
+
+class _NetTotalsCollector:
+    def __init__(self):
+        self._rates = CounterRates()
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        io = psutil.net_io_counters()
+        if io is None:
+            return {}
+        return dict(self._rates.update({
+            "net.bytes_sent_per_sec": io.bytes_sent,
+            "net.bytes_recv_per_sec": io.bytes_recv,
+            "net.packets_sent_per_sec": io.packets_sent,
+            "net.packets_recv_per_sec": io.packets_recv,
+            "net.errors_per_sec": io.errin + io.errout,
+            "net.drops_per_sec": io.dropin + io.dropout
+        }, now), **{
+            TOTALS_PREFIX + "net.bytes_sent": io.bytes_sent,
+            TOTALS_PREFIX + "net.bytes_recv": io.bytes_recv,
+            TOTALS_PREFIX + "net.packets_sent": io.packets_sent,
+            TOTALS_PREFIX + "net.packets_recv": io.packets_recv
+        })
+
+
+# Virtual block devices that never carry interesting IO
+_SKIPPED_DISKS = ("loop", "ram", "zram")
+_SECTOR_SIZE = 512
+
+
+def _disk_counters() -> Dict[str, Dict[str, float]]:
+    """Cumulative IO counters per block device, with times in milliseconds."""
+    disks = {}
+    try:
+        with open("/proc/diskstats", "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 14 or fields[2].startswith(_SKIPPED_DISKS):
+                    continue
+                reads, writes = int(fields[3]), int(fields[7])
+                if reads + writes == 0:
+                    continue
+                disks[fields[2]] = {
+                    "reads": reads, "writes": writes,
+                    "read_bytes": int(fields[5]) * _SECTOR_SIZE,
+                    "write_bytes": int(fields[9]) * _SECTOR_SIZE,
+                    "io_time": int(fields[6]) + int(fields[10]),
+                    "busy_time": int(fields[12]),
+                    # Weighted time spent in the queue: its rate is the average queue size
+                    "queue_time": int(fields[13])
+                }
+        return disks
+    except OSError:
+        pass
+    # Other platforms: what psutil exposes (no queue time)
+    for name, io in (psutil.disk_io_counters(perdisk=True) or {}).items():
+        if name.startswith(_SKIPPED_DISKS) or io.read_count + io.write_count == 0:
+            continue
+        disks[name] = {
+            "reads": io.read_count, "writes": io.write_count,
+            "read_bytes": io.read_bytes, "write_bytes": io.write_bytes,
+            "io_time": io.read_time + io.write_time
+        }
+        if hasattr(io, 'busy_time'):
+            disks[name]["busy_time"] = io.busy_time
+    return disks
+
+
+class _PerDiskCollector:
+    """IOPS, throughput, latency, utilization and queue size of every disk."""
+
+    def __init__(self):
+        self._rates = CounterRates()
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        disks = _disk_counters()
+        counters = {(name, field): value
+                    for name, fields in disks.items() for field, value in fields.items()}
+        rates = self._rates.update(counters, now)
+        values = {}
+        for name in disks:
+            rate = {field: rates[name, field] for field in disks[name] if (name, field) in rates}
+            if "reads" not in rate:
+                continue
+            prefix = f"disk_dev.{name}."
+            ios = rate["reads"] + rate["writes"]
+            values[prefix + "read_iops"] = rate["reads"]
+            values[prefix + "write_iops"] = rate["writes"]
+            values[prefix + "read_bytes_per_sec"] = rate["read_bytes"]
+            values[prefix + "write_bytes_per_sec"] = rate["write_bytes"]
+            values[prefix + "await_ms"] = rate["io_time"] / ios if ios else 0.0
+            if "busy_time" in rate:
+                # Busy milliseconds per second, as a percentage
+                values[prefix + "utilization_percent"] = min(100.0, rate["busy_time"] / 10.0)
+            if "queue_time" in rate:
+                values[prefix + "avg_queue_size"] = rate["queue_time"] / 1000.0
+        return values
+
+
+class _PerNicCollector:
+    """Traffic, packet, error and drop rates of every network interface."""
+
+    def __init__(self):
+        self._rates = CounterRates()
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        counters = {}
+        for nic, io in psutil.net_io_counters(pernic=True).items():
+            if nic == "lo":
+                continue
+            prefix = f"net_dev.{nic}."
+            counters.update({
+                prefix + "bytes_sent_per_sec": io.bytes_sent,
+                prefix + "bytes_recv_per_sec": io.bytes_recv,
+                prefix + "packets_sent_per_sec": io.packets_sent,
+                prefix + "packets_recv_per_sec": io.packets_recv,
+                prefix + "errors_in_per_sec": io.errin,
+                prefix + "errors_out_per_sec": io.errout,
+                prefix + "drops_in_per_sec": io.dropin,
+                prefix + "drops_out_per_sec": io.dropout
+            })
+        return self._rates.update(counters, now)
+
+
+class _CgroupCollector:
+    """Limits, throttling and pressure of the cgroup (v2) this process runs in."""
+
+    def __init__(self):
+        self._rates = CounterRates()
+        try:
+            self._path = cgroup_path()
+        except (OSError, ValueError):
+            self._path = None
+
+    def __call__(self, now: float) -> Dict[str, float]:
+        if self._path is None:
+            return {}
+        gauges, counters = read_cgroup(self._path)
+        return cgroup_series(gauges, self._rates.update(counters, now))
+
+
+def default_collectors() -> List[Collector]:
+    return [_CpuCollector(), _collect_memory, _DiskTotalsCollector(), _NetTotalsCollector(),
+            _PerDiskCollector(), _PerNicCollector(), _CgroupCollector()]
+
+
+def group_by_device(values: Dict[str, float], prefix: str) -> Dict[str, Dict[str, float]]:
+    """Split ``<prefix><device>.<field>`` series into {device: {field: value}}."""
+    devices: Dict[str, Dict[str, float]] = {}
+    for name, value in values.items():
+        if name.startswith(prefix):
+            device, field = name[len(prefix):].rsplit(".", 1)
+            devices.setdefault(device, {})[field] = round(value, 2)
+    return devices
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class MetricsSampler:
+    """Samples ``collectors`` every ``interval`` seconds into ring buffers."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY,
+                 collectors: Optional[List[Collector]] = None):
+        self.interval = interval
+        self.capacity = capacity
+        self.collectors = collectors if collectors is not None else default_collectors()
+        self.pid = os.getpid()
+        self._times = RingBuffer(capacity)
+        self._series: Dict[str, RingBuffer] = {}
+        self._totals: Dict[str, float] = {}
+        self.detector = AnomalyDetector()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _loop(self):
+        # The baseline sample only primes counters; it yields no rates yet.
+        self._collect(time.monotonic())
+        next_time = time.monotonic() + FIRST_SAMPLE_DELAY
+        while not self._stopped.wait(max(0.0, next_time - time.monotonic())):
+            self.sample()
+            next_time = max(next_time + self.interval, time.monotonic())
+
+    def _collect(self, now: float) -> Dict[str, float]:
+        values = {}
+        for collector in self.collectors:
+            try:
+                values.update(collector(now))
+            except (OSError, psutil.Error):
+                # A source that is unavailable here must not stop the sampler.
+                continue
+        return values
+
+    def sample(self):
+        """Take one sample now and append it to the ring buffers."""
+        values = self._collect(time.monotonic())
+        totals = {name: values.pop(name) for name in [name for name in values if name.startswith(TOTALS_PREFIX)]}
+        with self._lock:
+            self._totals = totals
+            now = time.time()
+            self._times.append(now)
+            for name, value in values.items():
+                if name not in self._series:
+                    self._series[name] = RingBuffer(self.capacity)
+            gone = []
+            for name, ring in self._series.items():
+                ring.append(values.get(name, math.nan))
+                if ring.missing >= self.capacity:
+                    gone.append(name)
+            for name in gone:
+                del self._series[name]
+            self.detector.update(now, values)
+            self.detector.remove(gone)
+        self._ready.set()
+
+    def wait_ready(self, timeout: float = 2.0) -> bool:
+        return self._ready.wait(timeout)
+
+    def latest(self, prefix: str = "", totals: bool = False) -> Dict[str, float]:
+        """Latest value of every series whose name starts with ``prefix``.
+
+        With ``totals`` the cumulative counters of the same sample are included.
+        """
+        self.wait_ready()
+        with self._lock:
+            values = {name: ring.latest() for name, ring in self._series.items()
+                      if name.startswith(prefix) and not math.isnan(ring.latest())}
+            if totals:
+                values.update((name, value) for name, value in self._totals.items()
+                              if name[len(TOTALS_PREFIX):].startswith(prefix))
+            return values
+
+    def last_sample_time(self) -> Optional[float]:
+        """Epoch time of the latest sample (changes whenever a sample is taken)."""
+        with self._lock:
+            return self._times.latest() if len(self._times) else None
+
+    def sampled_at(self) -> Optional[str]:
+        timestamp = self.last_sample_time()
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def window(self, seconds: float) -> int:
+        """Number of samples taken in the last ``seconds``."""
+        times = self._times.last(self.capacity)
+        if not times:
+            return 0
+        since = times[-1] - seconds
+        n = 0
+        for timestamp in reversed(times):
+            if timestamp < since:
+                break
+            n += 1
+        return n
+
+    def series(self, name: str, seconds: float) -> List[float]:
+        """Values of one series over the last ``seconds``, oldest first (NaN = missing)."""
+        with self._lock:
+            ring = self._series.get(name)
+            return [] if ring is None else ring.last(self.window(seconds))
+
+    def stats(self, prefix: str = "", seconds: float = 60) -> Dict[str, dict]:
+        """min/max/avg/p95 of every series starting with ``prefix`` over the last ``seconds``."""
+        self.wait_ready()
+        result = {}
+        with self._lock:
+            n = self.window(seconds)
+            for name, ring in self._series.items():
+                if not name.startswith(prefix):
+                    continue
+                values = sorted(v for v in ring.last(n) if not math.isnan(v))
+                if values:
+                    result[name] = {
+                        "min": round(values[0], 2),
+                        "max": round(values[-1], 2),
+                        "avg": round(sum(values) / len(values), 2),
+                        "p95": round(_percentile(values, 0.95), 2),
+                        "samples": len(values)
+                    }
+        return result
+
+    def anomalies(self, prefix: str = "", seconds: float = 0, limit: int = 20) -> List[dict]:
+        """Anomalies of series starting with ``prefix`` in the last ``seconds`` (0 = all kept)."""
+        with self._lock:
+            since = time.time() - seconds if seconds else None
+            return self.detector.anomalies(prefix, since, limit)
+
+
+_sampler: Optional[MetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> MetricsSampler:
+    """Return the process-wide sampler, starting it on first use (and after a fork)."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or _sampler.pid != os.getpid():
+            _sampler = MetricsSampler()
+            _sampler.start()
+        return _sampler
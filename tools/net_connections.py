@@ -0,0 +1,149 @@
+"""
+Connection Summary
+==================
+
+Counts sockets by TCP state, listening port and remote peer without building
+an object per socket.
+
+On Linux ``/proc/net/{tcp,tcp6,udp,udp6}`` is read in large chunks and each
+chunk is parsed by a single regex pass whose fields go straight into
+``Counter`` objects; addresses are only decoded for the few peers that are
+reported. Elsewhere the summary falls back to ``psutil.net_connections``.
+"""
+import os
+import re
+import socket
+import struct
+import time
+from collections import Counter
+from operator import itemgetter
+from typing import Dict
+
+import psutil
+
+PROC_NET = "/proc/net"
+READ_CHUNK = 4 * 1024 * 1024
+
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2", "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT",
+    "09": "LAST_ACK", "0A": "LISTEN", "0B": "CLOSING", "0C": "NEW_SYN_RECV"
+}
+_LISTEN = b"0A"
+
+# local port, remote address, state. Deliberately unanchored: the only colon in
+# a socket line followed by exactly four hex digits is the local port's, and
+# letting the regex engine skip to it is about twice as fast as matching "sl".
+_SOCKET_LINE = re.compile(rb":(\w{4}) (\w+):\w{4} (\w\w) ")
+
+# Remote addresses of unconnected/listening sockets
+_ANY_ADDRESSES = {b"00000000", b"0" * 32}
+
+
+def _scan_proc_file(path: str, port_states: Counter, peers: Counter) -> int:
+    """Count ``(local port, state)`` pairs and remote addresses in one /proc/net table."""
+    total = 0
+    with open(path, 'rb') as f:
+        rest = b""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            chunk = rest + chunk
+            cut = chunk.rfind(b"\n") + 1
+            rest = chunk[cut:]
+            rows = _SOCKET_LINE.findall(chunk, 0, cut)
+            total += len(rows)
+            # Both updates run in C; listening sockets only add the
+            # all-zero remote address, which is dropped afterwards.
+            port_states.update(map(itemgetter(0, 2), rows))
+            peers.update(map(itemgetter(1), rows))
+    return total
+
+
+def _decode_address(hex_address: bytes) -> str:
+    """/proc/net prints addresses as host-endian 32-bit words."""
+    words = [int(hex_address[i:i + 8], 16) for i in range(0, len(hex_address), 8)]
+    packed = b"".join(struct.pack("=I", word) for word in words)
+    if len(packed) == 4:
+        return socket.inet_ntop(socket.AF_INET, packed)
+    if packed[:12] == b"\0" * 10 + b"\xff\xff":
+        return socket.inet_ntop(socket.AF_INET, packed[12:])
+    return socket.inet_ntop(socket.AF_INET6, packed)
+
+
+def _summary(tcp_total: int, udp_total: int, states: Dict[str, int],
+             listening: Dict[int, int], established_by_port: Counter,
+             peers: Counter, top: int, source: str, started: float) -> dict:
+    ports = sorted(listening, key=lambda port: -established_by_port.get(port, 0))
+    return {
+        "source": source,
+        "total": tcp_total + udp_total,
+        "tcp": {"total": tcp_total, "states": dict(sorted(states.items(), key=lambda s: -s[1]))},
+        "udp": {"total": udp_total},
+        "listening_ports": [
+            {"port": port, "listeners": listening[port], "connections": established_by_port.get(port, 0)}
+            for port in ports[:top]
+        ],
+        "top_remote_peers": [{"address": address, "connections": count}
+                             for address, count in peers.most_common(top)],
+        "elapsed_seconds": round(time.monotonic() - started, 3)
+    }
+
+
+def _summarize_proc(top: int, started: float) -> dict:
+    port_states, peers = Counter(), Counter()
+    tcp_total = 0
+    for name in ("tcp", "tcp6"):
+        path = os.path.join(PROC_NET, name)
+        if os.path.exists(path):
+            tcp_total += _scan_proc_file(path, port_states, peers)
+    udp_total = 0
+    for name in ("udp", "udp6"):
+        path = os.path.join(PROC_NET, name)
+        if os.path.exists(path):
+            # UDP states and peers are not meaningful; only count the sockets.
+            udp_total += _scan_proc_file(path, Counter(), Counter())
+
+    states, listening, local_ports = Counter(), Counter(), Counter()
+    for (port, state), count in port_states.items():
+        states[TCP_STATES.get(state.decode(), state.decode())] += count
+        if state == _LISTEN:
+            listening[int(port, 16)] += count
+        else:
+            local_ports[int(port, 16)] += count
+
+    for address in _ANY_ADDRESSES:
+        peers.pop(address, None)
+    decoded_peers = Counter()
+    for address, count in peers.most_common(top * 2):
+        # v4-mapped IPv6 peers and plain IPv4 peers are the same host.
+        decoded_peers[_decode_address(address)] += count
+    return _summary(tcp_total, udp_total, dict(states), dict(listening), local_ports,
+                    decoded_peers, top, "proc", started)
+
+
+def _summarize_psutil(top: int, started: float) -> dict:
+    states, listening, local_ports, peers = Counter(), Counter(), Counter(), Counter()
+    tcp_total = udp_total = 0
+    for conn in psutil.net_connections(kind='inet'):
+        if conn.type != socket.SOCK_STREAM:
+            udp_total += 1
+            continue
+        tcp_total += 1
+        states[conn.status] += 1
+        if conn.status == psutil.CONN_LISTEN:
+            listening[conn.laddr.port] += 1
+        elif conn.raddr:
+            local_ports[conn.laddr.port] += 1
+            peers[conn.raddr.ip] += 1
+    return _summary(tcp_total, udp_total, dict(states), dict(listening), local_ports,
+                    peers, top, "psutil", started)
+
+
+def connection_summary(top: int = 10) -> dict:
+    """Socket counts by TCP state, listening port and the ``top`` remote peers."""
+    started = time.monotonic()
+    if os.path.exists(os.path.join(PROC_NET, "tcp")):
+        return _summarize_proc(top, started)
+    return _summarize_psutil(top, started)
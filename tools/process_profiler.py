@@ -0,0 +1,127 @@
+"""
+Process Profiler
+================
+
+Two-sample, top-N process profiling for the System Monitor Tool.
+
+Every process is read twice, ``window`` seconds apart, in one ``oneshot``
+pass each; CPU usage, IO throughput and context-switch rates are derived from
+the deltas, so they reflect the window rather than the process lifetime. The
+top N rows by any column are picked with a heap. Both passes share a fixed
+time budget: on hosts with thousands of processes a pass stops at its
+deadline and the result is marked as truncated instead of running long.
+"""
+import heapq
+import time
+from typing import Dict, Optional, Tuple
+
+import psutil
+
+DEFAULT_WINDOW = 0.5
+DEFAULT_TIME_BUDGET = 3.0
+
+_ATTRS = ['name', 'create_time', 'cpu_times', 'memory_info', 'io_counters',
+          'num_threads', 'num_fds', 'num_ctx_switches']
+
+SORT_COLUMNS = (
+    "cpu_percent", "rss_bytes", "rss_growth_bytes", "io_read_bytes_per_sec",
+    "io_write_bytes_per_sec", "num_threads", "num_fds", "ctx_switches_per_sec"
+)
+
+
+def _read(proc: psutil.Process) -> Optional[dict]:
+    try:
+        return proc.as_dict(_ATTRS, ad_value=None)
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+
+
+def _first_pass(deadline: float) -> Tuple[Dict[int, tuple], bool]:
+    samples = {}
+    for proc in psutil.process_iter():
+        if time.monotonic() > deadline:
+            return samples, True
+        info = _read(proc)
+        if info is not None:
+            samples[proc.pid] = (proc, info, time.monotonic())
+    return samples, False
+
+
+def _rate(before, after, field: str, elapsed: float) -> Optional[float]:
+    if before is None or after is None:
+        return None
+    return max(0, getattr(after, field) - getattr(before, field)) / elapsed
+
+
+def _row(pid: int, before: dict, after: dict, elapsed: float, total_memory: int) -> dict:
+    cpu = None
+    if before['cpu_times'] is not None and after['cpu_times'] is not None:
+        used = ((after['cpu_times'].user + after['cpu_times'].system)
+                - (before['cpu_times'].user + before['cpu_times'].system))
+        cpu = round(100.0 * max(0.0, used) / elapsed, 1)
+    rss = after['memory_info'].rss if after['memory_info'] is not None else None
+    growth = None
+    if rss is not None and before['memory_info'] is not None:
+        growth = rss - before['memory_info'].rss
+    ctx = None
+    if before['num_ctx_switches'] is not None and after['num_ctx_switches'] is not None:
+        ctx = (_rate(before['num_ctx_switches'], after['num_ctx_switches'], 'voluntary', elapsed)
+               + _rate(before['num_ctx_switches'], after['num_ctx_switches'], 'involuntary', elapsed))
+    read_rate = _rate(before['io_counters'], after['io_counters'], 'read_bytes', elapsed)
+    write_rate = _rate(before['io_counters'], after['io_counters'], 'write_bytes', elapsed)
+    return {
+        "pid": pid,
+        "name": after['name'],
+        "cpu_percent": cpu,
+        "memory_percent": round(100.0 * rss / total_memory, 2) if rss is not None else None,
+        "rss_bytes": rss,
+        "rss_growth_bytes": growth,
+        "io_read_bytes_per_sec": round(read_rate) if read_rate is not None else None,
+        "io_write_bytes_per_sec": round(write_rate) if write_rate is not None else None,
+        "num_threads": after['num_threads'],
+        "num_fds": after['num_fds'],
+        "ctx_switches_per_sec": round(ctx, 1) if ctx is not None else None
+    }
+
+
+def profile_processes(top_n: int = 10, sort_by: str = "cpu_percent",
+                      window: float = DEFAULT_WINDOW,
+                      time_budget: float = DEFAULT_TIME_BUDGET) -> dict:
+    """Sample all processes twice and return the top ``top_n`` by ``sort_by``.
+
+    Columns the caller may not read (e.g. IO counters of other users'
+    processes) are None and sort last.
+    """
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort_by}' (expected one of {', '.join(SORT_COLUMNS)})")
+    start = time.monotonic()
+    # Each pass gets half of the budget that remains after the window.
+    pass_budget = max(0.0, time_budget - window) / 2
+    samples, truncated = _first_pass(start + pass_budget)
+    # Both passes walk the processes in the same order, so every process is
+    # read again about one window after its first read.
+    time.sleep(max(0.0, window - (time.monotonic() - start)))
+
+    total_memory = psutil.virtual_memory().total
+    deadline = time.monotonic() + pass_budget
+    rows = []
+    for pid, (proc, before, read_at) in samples.items():
+        if time.monotonic() > deadline:
+            truncated = True
+            break
+        after = _read(proc)
+        # A different create time means the pid was reused in between.
+        if after is None or after['create_time'] != before['create_time']:
+            continue
+        elapsed = max(1e-6, time.monotonic() - read_at)
+        rows.append(_row(pid, before, after, elapsed, total_memory))
+
+    top = heapq.nlargest(top_n, rows, key=lambda row: (row[sort_by] is not None, row[sort_by] or 0))
+    return {
+        "sort_by": sort_by,
+        "window_seconds": window,
+        "processes_sampled": len(rows),
+        "truncated": truncated,
+        "elapsed_seconds": round(time.monotonic() - start, 3),
+        "top": top
+    }
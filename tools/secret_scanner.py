@@ -0,0 +1,263 @@
+"""
+Secret Scanner
+==============
+
+Finds hardcoded credentials in every text file of a deployment tree for the
+Deployment Checker Tool.
+
+Scanning is two-staged, like the literal prefilters of grep-like tools.
+Every signature declares the literals one of its matches must contain
+(``AKIA``, ``-----BEGIN``, ``passw``); a chunk is lowercased once and the
+anchors are located with ``bytes.find``, which runs at memchr speed. Only the
+lines holding an anchor are handed to the full matcher: all signatures as
+alternatives of one compiled regex, whose ``lastgroup`` tells which one
+matched. Most lines of most files never reach a regex.
+
+Signatures with a recognisable format (cloud keys, tokens, private keys) are
+reported as they are. Generic ``password = ...`` assignments are only
+reported when the value looks random: its Shannon entropy must reach
+``MIN_GENERIC_ENTROPY`` bits per character and it must not be a placeholder
+or a reference (``${DB_PASSWORD}``, ``secretKeyRef``, ``changeme``).
+
+Files are read in fixed-size chunks that end at line boundaries, so memory
+stays bounded on large files. Binary files are skipped after sniffing their
+first bytes for NUL (git's heuristic). Larger sets of files are scanned in a
+process pool, in batches, and come back in input order. Matched values are
+never returned in full.
+"""
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def _spellings(*pairs: Tuple[str, str]) -> Tuple[bytes, ...]:
+    """``apikey``, ``api_key``, ``api-key`` and ``api.key`` for ``("api", "key")``."""
+    return tuple(f"{a}{sep}{b}".encode() for a, b in pairs for sep in ("", "_", "-", "."))
+
+
+# (id, description, regex, anchors): every match contains one of the
+# (lowercase) anchors. Known formats first, generic assignments last.
+SIGNATURES = (
+    ("private-key", "Private key",
+     rb"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----", (b"-----begin",)),
+    ("aws-access-key", "AWS access key ID", rb"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", (b"akia", b"asia")),
+    ("github-token", "GitHub token", rb"\b(?:gh[pousr]_[A-Za-z0-9]{36,255}|github_pat_[A-Za-z0-9_]{60,255})\b",
+     (b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_", b"github_pat_")),
+    ("gitlab-token", "GitLab token", rb"\bglpat-[A-Za-z0-9_-]{20}\b", (b"glpat-",)),
+    ("slack-token", "Slack token", rb"\bxox[abposr]-[A-Za-z0-9-]{10,}", (b"xox",)),
+    ("slack-webhook", "Slack webhook URL", rb"https://hooks\.slack\.com/services/[A-Za-z0-9/]{20,}",
+     (b"hooks.slack.com",)),
+    ("google-api-key", "Google API key", rb"\bAIza[0-9A-Za-z_-]{35}\b", (b"aiza",)),
+    ("stripe-key", "Stripe secret key", rb"\b[sr]k_live_[0-9A-Za-z]{20,}\b", (b"k_live_",)),
+    ("openai-key", "OpenAI API key", rb"\bsk-(?:proj-)?[A-Za-z0-9_-]{20,}T3BlbkFJ[A-Za-z0-9_-]{20,}\b", (b"t3blbkfj",)),
+    ("jwt", "JSON Web Token", rb"\beyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}", (b"eyj",)),
+    ("url-credentials", "Credentials in URL",
+     rb"\b[a-z][a-z0-9+.-]*://[^\s:/@\"']{1,64}:(?P<url_password>[^\s:/@\"']{6,128})@", (b"://",)),
+    ("generic-secret", "Secret assigned to",
+     rb"(?i)(?P<generic_key>(?:passw(?:or)?d|secret|token|api[_.-]?key|access[_.-]?key|private[_.-]?key"
+     rb"|client[_.-]?secret|auth[_.-]?key|credentials?)[\w.-]*)[\"']?\s*(?::|=|:=|=>)\s*[\"']?"
+     rb"(?P<generic_value>[^\s\"'`,;]{8,256})",
+     (b"passw", b"secret", b"token", b"credential")
+     + _spellings(("api", "key"), ("access", "key"), ("private", "key"), ("auth", "key"))),
+)
+
+# Generic assignments below this many bits per character look like words or
+# placeholders; random keys and passwords score 3.5 and more
+MIN_GENERIC_ENTROPY = 3.0
+
+PLACEHOLDER = re.compile(
+    r"(?i)^(?:\$|\{\{|<|%\(|\[\[)|[()]|^(?:true|false|null|none|nil|undefined)$"
+    r"|changeme|example|placeholder|dummy|redacted|your[_-]|xxxx|\*\*\*"
+    r"|secretkeyref|valuefrom|keyref|\.(?:ya?ml|json|pem|crt|key|txt)$|^\.{0,2}/[\w./-]*$")
+
+# Keys that name, point to or describe a secret rather than hold one
+REFERENCE_KEY = re.compile(
+    r"(?i)(?:name|ref|file|path|dir|type|length|len|size|field|policy|mode|format|version|enabled|ttl|timeout"
+    r"|count|expiry|expires|expiration)$")
+
+# Extensions that are never worth opening
+BINARY_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".webp", ".bmp", ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz",
+    ".7z", ".jar", ".war", ".whl", ".so", ".dll", ".dylib", ".exe", ".bin", ".o", ".a", ".pyc", ".class",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov", ".avi", ".sqlite", ".db", ".parquet"
+})
+
+SNIFF_BYTES = 8000
+CHUNK_BYTES = 1 << 20
+# Only the end of a line longer than this is carried into the next chunk
+MAX_CARRY_BYTES = 64 * 1024
+MAX_FILE_BYTES = 16 * 1024 * 1024
+
+MIN_PARALLEL_FILES = 64
+# Files handed to the pool at a time; bounds the results held in memory
+BATCH_FILES = 4096
+
+
+def _group(sig_id: str, regex: bytes) -> bytes:
+    """``regex`` as a named alternative; a leading ``(?i)`` is scoped to it."""
+    if regex.startswith(b"(?i)"):
+        regex = b"(?i:" + regex[4:] + b")"
+    return b"(?P<%s>%s)" % (sig_id.replace("-", "_").encode(), regex)
+
+
+_PATTERN = re.compile(b"|".join(_group(sig_id, regex) for sig_id, _, regex, _ in SIGNATURES))
+# Known formats only, for values of generic assignments (the leftmost match wins,
+# so ``aws_access_key_id = AKIA...`` matches as an assignment first)
+_KNOWN_PATTERN = re.compile(b"|".join(_group(sig_id, regex) for sig_id, _, regex, _ in SIGNATURES
+                                      if sig_id != "generic-secret"))
+_SIGNATURES = {sig_id.replace("-", "_"): (sig_id, description) for sig_id, description, _, _ in SIGNATURES}
+# (anchor, bit of every signature it belongs to)
+_ANCHORS = tuple(sorted({anchor: sum(1 << i for i, (*_, anchors) in enumerate(SIGNATURES) if anchor in anchors)
+                         for *_, anchors in SIGNATURES for anchor in anchors}.items()))
+_KEY_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.-")
+
+
+@lru_cache(maxsize=None)
+def _matcher(signatures: int) -> re.Pattern:
+    """The combined regex of the signatures whose bits are set."""
+    return re.compile(b"|".join(_group(sig_id, regex) for i, (sig_id, _, regex, _) in enumerate(SIGNATURES)
+                                if signatures >> i & 1))
+
+
+# (path, findings, sha256 of the content or None when not read in full)
+ScanResult = Tuple[str, List[dict], Optional[str]]
+
+
+def shannon_entropy(value: str) -> float:
+    """Bits per character."""
+    if not value:
+        return 0.0
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+
+def _redact(value: str) -> str:
+    return value[:4] + "*" * min(8, max(3, len(value) - 4))
+
+
+def is_binary(head: bytes) -> bool:
+    return b"\0" in head[:SNIFF_BYTES]
+
+
+def scannable(name: str, size: int, max_file_bytes: int = MAX_FILE_BYTES) -> bool:
+    """Cheap pre-checks on a directory entry before the file is opened."""
+    return 0 < size <= max_file_bytes and os.path.splitext(name)[1].lower() not in BINARY_EXTENSIONS
+
+
+def _candidate_lines(data: bytes) -> List[Tuple[int, int, int]]:
+    """Sorted ``(start, end, signatures)`` of the lines of ``data`` holding an anchor."""
+    lowered = data.lower()
+    spans: Dict[int, List[int]] = {}
+    for anchor, signatures in _ANCHORS:
+        found = lowered.find(anchor)
+        while found != -1:
+            start = lowered.rfind(b"\n", 0, found) + 1
+            span = spans.get(start)
+            if span is None:
+                end = lowered.find(b"\n", found)
+                span = spans[start] = [len(lowered) if end == -1 else end, 0]
+            span[1] |= signatures
+            found = lowered.find(anchor, span[0])
+    return [(start, end, signatures) for start, (end, signatures) in sorted(spans.items())]
+
+
+def _scan_chunk(data: bytes, first_line: int, path: str, findings: List[dict]):
+    line, position = first_line, 0
+    for start, end, signatures in _candidate_lines(data):
+        line += data.count(b"\n", position, start)
+        position = start
+        # Only the signatures anchored on this line
+        for match in _matcher(signatures).finditer(data, start, end):
+            _add_finding(match, data, start, line, path, findings)
+
+
+def _add_finding(match: re.Match, data: bytes, line_start: int, line: int, path: str, findings: List[dict]):
+    """Append the finding for ``match`` unless it is a placeholder or reference."""
+    group = match.lastgroup
+    if group == "generic_secret":
+        known = _KNOWN_PATTERN.search(match.group("generic_value"))
+        if known is not None:
+            match, group = known, known.lastgroup
+    sig_id, description = _SIGNATURES[group]
+    if group == "generic_secret":
+        value = match.group("generic_value").decode("utf-8", "replace")
+        entropy = shannon_entropy(value)
+        # The match starts at the keyword; the key may begin before it (DB_PASSWORD)
+        key_start = match.start("generic_key")
+        while key_start > line_start and data[key_start - 1] in _KEY_BYTES:
+            key_start -= 1
+        key = data[key_start:match.end("generic_key")].decode("utf-8", "replace")
+        if entropy < MIN_GENERIC_ENTROPY or PLACEHOLDER.search(value) or REFERENCE_KEY.search(key):
+            return
+        description = f"{description} {key}"
+    elif group == "url_credentials":
+        value = match.group("url_password").decode("utf-8", "replace")
+        if PLACEHOLDER.search(value):
+            return
+        entropy = shannon_entropy(value)
+    else:
+        value = match.group(group).decode("utf-8", "replace")
+        entropy = shannon_entropy(value)
+    findings.append({
+        "type": "Hardcoded Secret",
+        "file": path,
+        "line": line,
+        "description": f"{description}: {_redact(value)}",
+        "rule": f"secret-{sig_id}",
+        "entropy": round(entropy, 2)
+    })
+
+
+def scan_file(path: str) -> ScanResult:
+    """Secrets in one file; binary and unreadable files have none."""
+    findings: List[dict] = []
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(CHUNK_BYTES)
+            if is_binary(data):
+                return path, findings, None
+            carry, line = b"", 1
+            while data:
+                digest.update(data)
+                data = carry + data
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    # No newline yet: keep (the end of) the line for the next chunk
+                    carry = data[-MAX_CARRY_BYTES:]
+                else:
+                    _scan_chunk(data[:end], line, path, findings)
+                    line += data.count(b"\n", 0, end)
+                    carry = data[end:][-MAX_CARRY_BYTES:]
+                data = f.read(CHUNK_BYTES)
+            if carry:
+                _scan_chunk(carry, line, path, findings)
+    except OSError:
+        return path, findings, None
+    return path, findings, digest.hexdigest()
+
+
+def _scan_batch(paths: Sequence[str]) -> List[ScanResult]:
+    return [scan_file(path) for path in paths]
+
+
+def scan_files(paths: Sequence[str], workers: Optional[int] = None) -> Iterator[ScanResult]:
+    """Scan ``paths`` across ``workers`` processes (default: one per CPU core), in order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < MIN_PARALLEL_FILES:
+        for path in paths:
+            yield scan_file(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(paths), BATCH_FILES):
+            batch = paths[start:start + BATCH_FILES]
+            # Several files per task amortise the pickling overhead of small files
+            size = max(1, len(batch) // (workers * 4))
+            chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+            for results in pool.map(_scan_batch, chunks):
+                yield from results
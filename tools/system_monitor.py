@@ -6,95 +6,276 @@ A tool for monitoring system resources and analyzing performance metrics.
 """
 import psutil
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from crewai_tools import BaseTool
 
+from tools.cgroup_metrics import cgroup_metrics, cgroup_path, current_cgroup, group_cgroup_series
+from tools.diagnostic_bundle import DiagnosticBundle, active_bundle
+from tools.metrics_sampler import TOTALS_PREFIX, get_sampler, group_by_device
+from tools.net_connections import connection_summary
+from tools.process_profiler import SORT_COLUMNS, profile_processes
+from tools.tool_metrics import instrumented
+
+METRICS = ('cpu', 'memory', 'disk', 'network', 'processes', 'cgroup', 'anomalies')
+
+# Sampled series (by name prefix) summarised for each metric
+TREND_SERIES = {
+    'cpu': ('cpu.',),
+    'memory': ('memory.', 'swap.'),
+    'disk': ('disk.', 'disk_dev.'),
+    'network': ('net.', 'net_dev.'),
+    'cgroup': ('cgroup.',)
+}
+
+
+def _rounded(values: dict, prefix: str = "") -> dict:
+    return {name: round(value, 2) for name, value in values.items() if name.startswith(prefix)}
+
+
+def _round_sampled(latest: dict, name: str):
+    value = latest.get(name)
+    return None if value is None else round(value, 1)
+
+
+def _sampled(latest: dict, fields: dict) -> dict:
+    """``{key: integer value of the sampled series}``, for series present in ``latest``."""
+    return {key: int(latest[name]) for key, name in fields.items() if name in latest}
+
+
+def _disk_devices(latest: dict) -> dict:
+    """Per-disk rates from the latest sample, busiest device first."""
+    devices = group_by_device(latest, 'disk_dev.')
+    return dict(sorted(devices.items(), key=lambda item: -item[1].get('utilization_percent', 0)))
+
+
+def _filesystems() -> list:
+    """Usage of every mounted (physical) filesystem."""
+    filesystems = []
+    for partition in psutil.disk_partitions():
+        try:
+            usage = psutil.disk_usage(partition.mountpoint)
+        except OSError:
+            continue
+        filesystems.append({
+            "mountpoint": partition.mountpoint,
+            "device": partition.device,
+            "fstype": partition.fstype,
+            "total": usage.total,
+            "used": usage.used,
+            "free": usage.free,
+            "percent": usage.percent
+        })
+    return filesystems
+
+
+def _interfaces(latest: dict) -> dict:
+    """Per-NIC rates from the latest sample, with link utilization when the speed is known."""
+    interfaces = group_by_device(latest, 'net_dev.')
+    for nic, stats in psutil.net_if_stats().items():
+        rates = interfaces.get(nic)
+        if rates is None:
+            continue
+        rates["is_up"] = stats.isup
+        if stats.speed > 0:
+            busiest = max(rates.get("bytes_sent_per_sec", 0), rates.get("bytes_recv_per_sec", 0))
+            rates["utilization_percent"] = round(busiest * 8 / (stats.speed * 1e6) * 100, 2)
+    return interfaces
+
+
 class SystemMonitorToolSchema(BaseModel):
     """Input for SystemMonitorTool."""
-    metric: str = Field(..., description="Metric to monitor (cpu, memory, disk, network, processes)")
+    metric: str = Field(..., description="Metric to monitor (cpu, memory, disk, network, processes, cgroup, anomalies, or all)")
+    metrics: list = Field(default=[], description="Several metrics to collect in one call, e.g. ['cpu', 'disk'] (overrides metric)")
+    top_n: int = Field(default=10, description="Number of processes (or anomalies) returned by the processes (or anomalies) metric")
+    sort_by: str = Field(default="cpu_percent", description=f"Column the processes metric is ranked by ({', '.join(SORT_COLUMNS)})")
+    cgroup: str = Field(default="", description="cgroup v2 path for the cgroup metric, relative to the hierarchy root (default: this process's cgroup)")
+    window_seconds: int = Field(default=0, description="Also return min/max/avg/p95 of the sampled series over the last N seconds (0 = latest sample only)")
+
 
 class SystemMonitorTool(BaseTool):
     name: str = "System Monitor Tool"
     description: str = "Monitors system resources and analyzes performance metrics."
     args_schema: Type[BaseModel] = SystemMonitorToolSchema
 
+    @instrumented
     def _run(self, **kwargs: Any) -> Any:
         metric = kwargs.get('metric', 'cpu')
+        metrics = kwargs.get('metrics') or []
+        window_seconds = kwargs.get('window_seconds', 0)
         
         try:
-            if metric == 'cpu':
-                cpu_percent = psutil.cpu_percent(interval=1)
-                cpu_count = psutil.cpu_count()
-                cpu_stats = psutil.cpu_stats()
-                return {
-                    "cpu_percent": cpu_percent,
-                    "cpu_count": cpu_count,
-                    "cpu_stats": {
-                        "ctx_switches": cpu_stats.ctx_switches,
-                        "interrupts": cpu_stats.interrupts,
-                        "soft_interrupts": cpu_stats.soft_interrupts,
-                        "syscalls": cpu_stats.syscalls
-                    }
-                }
-            elif metric == 'memory':
-                memory = psutil.virtual_memory()
-                swap = psutil.swap_memory()
-                return {
-                    "virtual_memory": {
-                        "total": memory.total,
-                        "available": memory.available,
-                        "percent": memory.percent,
-                        "used": memory.used,
-                        "free": memory.free
-                    },
-                    "swap_memory": {
-                        "total": swap.total,
-                        "used": swap.used,
-                        "free": swap.free,
-                        "percent": swap.percent
-                    }
-                }
-            elif metric == 'disk':
-                disk_usage = psutil.disk_usage('/')
-                disk_io = psutil.disk_io_counters()
-                return {
-                    "disk_usage": {
-                        "total": disk_usage.total,
-                        "used": disk_usage.used,
-                        "free": disk_usage.free,
-                        "percent": disk_usage.percent
-                    },
-                    "disk_io": {
-                        "read_count": disk_io.read_count,
-                        "write_count": disk_io.write_count,
-                        "read_bytes": disk_io.read_bytes,
-                        "write_bytes": disk_io.write_bytes
-                    }
-                }
-            elif metric == 'network':
-                net_io = psutil.net_io_counters()
-                net_connections = len(psutil.net_connections())
-                return {
-                    "network_io": {
-                        "bytes_sent": net_io.bytes_sent,
-                        "bytes_recv": net_io.bytes_recv,
-                        "packets_sent": net_io.packets_sent,
-                        "packets_recv": net_io.packets_recv
-                    },
-                    "connections": net_connections
-                }
-            elif metric == 'processes':
-                processes = []
-                for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                    try:
-                        processes.append(proc.info)
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        pass
-                # Sort by CPU usage and return top 10
-                processes.sort(key=lambda x: x['cpu_percent'] if x['cpu_percent'] is not None else 0, reverse=True)
-                return processes[:10]
-            else:
-                return f"Unknown metric: {metric}"
+            bundle = active_bundle()
+            if bundle is not None:
+                return self._from_bundle(bundle, metrics or [metric], window_seconds)
+            if metrics or metric == 'all' or ',' in metric:
+                if not metrics:
+                    metrics = METRICS if metric == 'all' else [m.strip() for m in metric.split(',')]
+                return self._snapshot_many(metrics, kwargs)
+            result = self._snapshot(metric, kwargs, get_sampler().latest(totals=True))
+            if window_seconds and metric in TREND_SERIES:
+                result["trend"] = self._trend([metric], window_seconds)
+            return result
         except Exception as e:
-            return f"Error monitoring system: {str(e)}"
\ No newline at end of file
+            return f"Error monitoring system: {str(e)}"
+
+    def _from_bundle(self, bundle: DiagnosticBundle, metrics: list, window_seconds: int) -> Any:
+        """Answer from a captured diagnostic bundle instead of the live host."""
+        if metrics == ['all']:
+            metrics = list(METRICS)
+        elif len(metrics) == 1:
+            metrics = [m.strip() for m in metrics[0].split(',')]
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            return f"Unknown metric: {', '.join(unknown)}"
+        result = {"captured_at": bundle.manifest["captured_at"], "hostname": bundle.manifest["hostname"]}
+        for metric in metrics:
+            section = bundle.metric(metric)
+            result[metric] = section if section is not None else "Error: not captured in the bundle"
+        captured_trend = bundle.metric("trend")
+        if window_seconds and captured_trend:
+            # Trends cover the window before the capture, whatever was asked for
+            prefixes = tuple(prefix for metric in metrics for prefix in TREND_SERIES.get(metric, ()))
+            result["trend"] = {name: stats for name, stats in captured_trend.items()
+                               if name == "window_seconds" or name.startswith(prefixes)}
+        return result
+
+    def _snapshot_many(self, metrics: list, options: dict) -> Any:
+        """Collect several metrics in one pass over shared sources."""
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            return f"Unknown metric: {', '.join(unknown)}"
+        started = time.monotonic()
+        # One locked read of every sampled series serves all sections
+        latest = get_sampler().latest(totals=True)
+        sections = {}
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # The process profiler mostly sleeps between its two passes;
+            # the other sections are read in the meantime
+            processes = pool.submit(self._section, 'processes', options, latest) if 'processes' in metrics else None
+            for metric in metrics:
+                if metric != 'processes':
+                    sections[metric] = self._section(metric, options, latest)
+            if processes is not None:
+                sections['processes'] = processes.result()
+        result = {metric: sections[metric] for metric in metrics}
+        window_seconds = options.get('window_seconds', 0)
+        if window_seconds:
+            result["trend"] = self._trend(metrics, window_seconds)
+        result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return result
+
+    def _section(self, metric: str, options: dict, latest: dict) -> Any:
+        # One failing section should not hide the others
+        try:
+            return self._snapshot(metric, options, latest)
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def _trend(self, metrics: list, window_seconds: int) -> dict:
+        # Trends come from the background sampler's ring buffers
+        sampler = get_sampler()
+        trend = {"window_seconds": window_seconds}
+        for metric in metrics:
+            for prefix in TREND_SERIES.get(metric, ()):
+                trend.update(sampler.stats(prefix, window_seconds))
+        return trend
+
+    def _snapshot(self, metric: str, options: dict, latest: dict) -> Any:
+        if metric == 'cpu':
+            # The latest background sample replaces a blocking 1s measurement
+            sampler = get_sampler()
+            cpu_count = psutil.cpu_count()
+            cpu_stats = psutil.cpu_stats()
+            return {
+                # None until the sampler has taken a reading
+                "cpu_percent": _round_sampled(latest, "cpu.percent"),
+                "iowait_percent": _round_sampled(latest, "cpu.iowait_percent"),
+                "load_average_1m": latest.get("cpu.load1"),
+                "sampled_at": sampler.sampled_at(),
+                "cpu_count": cpu_count,
+                "cpu_stats": {
+                    "ctx_switches": cpu_stats.ctx_switches,
+                    "interrupts": cpu_stats.interrupts,
+                    "soft_interrupts": cpu_stats.soft_interrupts,
+                    "syscalls": cpu_stats.syscalls
+                }
+            }
+        elif metric == 'memory':
+            # Read by the background sampler along with the other series
+            return {
+                "virtual_memory": dict(_sampled(latest, {
+                    "total": "memory.total_bytes",
+                    "available": "memory.available_bytes",
+                    "used": "memory.used_bytes",
+                    "free": "memory.free_bytes"
+                }), percent=latest.get("memory.percent")),
+                "swap_memory": dict(_sampled(latest, {
+                    "total": "swap.total_bytes",
+                    "used": "swap.used_bytes",
+                    "free": "swap.free_bytes"
+                }), percent=latest.get("swap.percent"))
+            }
+        elif metric == 'disk':
+            filesystems = _filesystems()
+            root = next((fs for fs in filesystems if fs["mountpoint"] == '/'), None)
+            if root is None:
+                usage = psutil.disk_usage('/')
+                root = {"total": usage.total, "used": usage.used, "free": usage.free, "percent": usage.percent}
+            return {
+                "disk_usage": {
+                    "total": root["total"],
+                    "used": root["used"],
+                    "free": root["free"],
+                    "percent": root["percent"]
+                },
+                "disk_io": _sampled(latest, {
+                    "read_count": TOTALS_PREFIX + "disk.read_count",
+                    "write_count": TOTALS_PREFIX + "disk.write_count",
+                    "read_bytes": TOTALS_PREFIX + "disk.read_bytes",
+                    "write_bytes": TOTALS_PREFIX + "disk.write_bytes"
+                }),
+                "disk_io_rates": _rounded(latest, 'disk.'),
+                "devices": _disk_devices(latest),
+                "filesystems": filesystems
+            }
+        elif metric == 'network':
+            connections = connection_summary(options.get('top_n', 10))
+            return {
+                "network_io": _sampled(latest, {
+                    "bytes_sent": TOTALS_PREFIX + "net.bytes_sent",
+                    "bytes_recv": TOTALS_PREFIX + "net.bytes_recv",
+                    "packets_sent": TOTALS_PREFIX + "net.packets_sent",
+                    "packets_recv": TOTALS_PREFIX + "net.packets_recv"
+                }),
+                "network_rates": _rounded(latest, 'net.'),
+                "interfaces": _interfaces(latest),
+                "connections": connections["total"],
+                "connection_summary": connections
+            }
+        elif metric == 'processes':
+            # Two samples over a short window give real per-process rates
+            return profile_processes(options.get('top_n', 10), options.get('sort_by', 'cpu_percent'))
+        elif metric == 'cgroup':
+            name = options.get('cgroup')
+            if name:
+                # Other cgroups are not sampled in the background
+                return cgroup_metrics(name)
+            return dict({"cgroup": current_cgroup(), "path": cgroup_path(),
+                         "sampled_at": get_sampler().sampled_at()},
+                        **group_cgroup_series(latest))
+        elif metric == 'anomalies':
+            # Ranked deviations from each sampled series' learned baseline
+            sampler = get_sampler()
+            detector = sampler.detector
+            return {
+                "series_monitored": len(detector.names),
+                "samples": detector.samples,
+                "learning": detector.samples < detector.warmup,
+                "anomalies": sampler.anomalies(seconds=options.get('window_seconds', 0),
+                                               limit=options.get('top_n', 10))
+            }
+        else:
+            return f"Unknown metric: {metric}"
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Tool Metrics
+============
+
+Call counters and latency histograms of the crew's own tools.
+
+Decorating a tool's ``_run`` with ``instrumented`` records every call under
+the tool's name: one call, its latency in a fixed-bucket histogram, and an
+error when the tool raised or returned an ``Error...`` string (the tools
+report failures as strings). The metrics exporter serves the registry next
+to the sampler's system metrics.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Upper bounds in seconds, from a cached lookup to a full log scan
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "buckets", "latency_sum")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        # One slot per bucket plus +Inf; counts are not cumulative here
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+
+
+class ToolMetrics:
+    """Thread-safe registry of per-tool call counts and latencies."""
+
+    def __init__(self):
+        self._tools: Dict[str, _ToolStats] = {}
+        self._lock = threading.Lock()
+        # Bumped on every change so exporters can tell when to re-render
+        self.version = 0
+
+    def record(self, tool: str, seconds: float, error: bool = False):
+        with self._lock:
+            stats = self._tools.get(tool)
+            if stats is None:
+                stats = self._tools[tool] = _ToolStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.latency_sum += seconds
+            self.version += 1
+
+    def snapshot(self) -> List[Tuple[str, int, int, List[int], float]]:
+        """``(tool, calls, errors, cumulative bucket counts, latency sum)`` per tool."""
+        with self._lock:
+            rows = []
+            for tool, stats in sorted(self._tools.items()):
+                cumulative, total = [], 0
+                for count in stats.buckets:
+                    total += count
+                    cumulative.append(total)
+                rows.append((tool, stats.calls, stats.errors, cumulative, stats.latency_sum))
+            return rows
+
+
+tool_metrics = ToolMetrics()
+
+
+def instrumented(run):
+    """Decorator for ``BaseTool._run`` that records the call in ``tool_metrics``."""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        error = True
+        try:
+            result = run(self, *args, **kwargs)
+            error = isinstance(result, str) and result.startswith("Error")
+            return result
+        finally:
+            tool_metrics.record(self.name, time.perf_counter() - started, error)
+    return wrapper
@@ -0,0 +1,160 @@
+"""
+Tree Walker
+===========
+
+One ``os.scandir`` traversal of a project tree for the Deployment Checker
+Tool, shared by all of its checks.
+
+Directories that can only hold dependencies, caches or VCS data are pruned
+before they are entered: a default skip list, plus dependency and build
+output directories (``dist``, ``vendor``, ``target``...) that ``.gitignore``
+files (at any level) or the root ``.dockerignore`` exclude. Other ignored
+directories are still visited, and ignore rules never skip files: what
+people keep out of git (``.env``, ``secrets/``, ``.aws/``) is exactly what
+is worth checking.
+"""
+import os
+import re
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea", ".terraform", ".gradle",
+    "bower_components", ".next", ".cache"
+})
+
+# Dependency and build output directories, pruned when an ignore file excludes
+# them; other ignored directories may hold secrets and are still checked.
+GENERATED_DIRS = frozenset({
+    "dist", "build", "_build", "out", "target", "vendor", "third_party", "site-packages", ".eggs",
+    "coverage", "htmlcov", "bin", "obj", "jspm_packages", "Pods", "DerivedData"
+})
+
+
+def _translate(pattern: str) -> str:
+    """Regex source for a gitignore-style glob."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("(?:/.*)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            parts.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """Patterns of one ignore file, relative to the directory it lives in."""
+
+    def __init__(self, lines: List[str], always_anchored: bool = False):
+        # (regex, negated, directories only, matched against the basename)
+        self.rules: List[Tuple[re.Pattern, bool, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.strip("/") if always_anchored else line.rstrip("/")
+            if not line:
+                continue
+            # gitignore: a pattern without an inner slash matches at any depth
+            basename = not always_anchored and "/" not in line
+            self.rules.append((re.compile(_translate(line.lstrip("/")) + r"\Z"), negated, dir_only, basename))
+
+    @classmethod
+    def from_file(cls, path: str, always_anchored: bool = False) -> Optional["IgnoreRules"]:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                rules = cls(f.readlines(), always_anchored)
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no rule applies."""
+        result = None
+        name = rel_path.rsplit("/", 1)[-1]
+        for regex, negated, dir_only, basename in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(name if basename else rel_path):
+                result = not negated
+        return result
+
+
+def walk(root: str, use_ignore_files: bool = True,
+         skip_dirs: frozenset = DEFAULT_SKIP_DIRS) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield ``(path relative to root, DirEntry)`` for every file and directory kept.
+
+    Directories are yielded before their contents; symlinked directories are
+    not followed.
+    """
+    root_rules = []
+    if use_ignore_files:
+        dockerignore = IgnoreRules.from_file(os.path.join(root, ".dockerignore"), always_anchored=True)
+        if dockerignore is not None:
+            root_rules.append(("", dockerignore))
+    # Depth-first with an explicit stack of (directory, relative path, rules in scope)
+    stack = [(root, "", root_rules)]
+    while stack:
+        directory, rel_dir, rules = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        if use_ignore_files and any(entry.name == ".gitignore" for entry in entries):
+            gitignore = IgnoreRules.from_file(os.path.join(directory, ".gitignore"))
+            if gitignore is not None:
+                rules = rules + [(rel_dir, gitignore)]
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name in skip_dirs:
+                    continue
+                if _generated(entry.name) and _ignored(rules, rel_path):
+                    continue
+                subdirs.append((entry.path, rel_path, rules))
+            yield rel_path, entry
+        # Reversed so that directories are visited in name order
+        stack.extend(reversed(subdirs))
+
+
+def _generated(name: str) -> bool:
+    return name in GENERATED_DIRS or name.endswith(".egg-info")
+
+
+def _ignored(rules: list, rel_path: str) -> bool:
+    ignored = False
+    for base, ignore in rules:
+        path = rel_path[len(base) + 1:] if base else rel_path
+        verdict = ignore.match(path, True)
+        if verdict is not None:
+            ignored = verdict
+    return ignored